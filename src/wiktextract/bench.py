@@ -0,0 +1,305 @@
+# Benchmark of page extraction per edition (python -m wiktextract.bench).
+#
+# For each edition, the test dump (tests/test-pages-articles.xml.bz2) is
+# loaded in a temporary database, and ``parse_page()`` is timed for each of
+# its main namespace pages and for the test pages tests/*.txt.  Every
+# edition runs in a new process, so that its peak RSS is its own and the
+# caches of one extractor don't help another.  Loading the dump before the
+# timed parsing can take more memory than parsing the pages, so the growth
+# of the RSS during the timed parsing is also reported, as the memory of
+# the extractor itself.  The results are written as
+# JSON and can be compared with the results of an earlier run (the
+# baseline): a metric that is more than the threshold worse is reported as
+# a regression, and the exit status is then 1.
+#
+# The test pages are from the English Wiktionary, so for the other editions
+# the numbers measure how their extractors handle foreign pages; they are
+# meant for spotting changes, not for comparing editions.
+
+import argparse
+import json
+import math
+import multiprocessing
+import sys
+import tempfile
+import time
+from importlib.resources import files
+from pathlib import Path
+from typing import Any
+
+from wikitextprocessor import Wtp
+from wikitextprocessor.dumpparser import analyze_and_overwrite_pages
+
+from .config import WiktionaryConfig
+from .page import parse_page
+from .template_override import template_override_fns
+from .thesaurus import close_thesaurus_db
+from .wiktionary import parse_wiktionary
+from .worker_pool import current_rss, peak_rss
+from .wxr_context import WiktextractContext
+from .wxr_logging import logger
+
+EDITIONS = (
+    "en",
+    "fr",
+    "de",
+    "es",
+    "zh",
+    "ja",
+    "ko",
+    "nl",
+    "pl",
+    "ru",
+    "simple",
+)
+
+# Metrics compared with the baseline and whether larger values are better
+COMPARED_METRICS = (
+    ("pages_per_second", True),
+    ("p50_ms", False),
+    ("p99_ms", False),
+    ("peak_rss_bytes", False),
+    ("rss_growth_bytes", False),
+)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    """Returns the ``p``th percentile of ``sorted_values`` (nearest
+    rank)."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(p / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def read_test_page(path: Path) -> tuple[str, str]:
+    """Reads a test page whose first line may be "TITLE: <title>"."""
+    text = path.read_text(encoding="utf-8")
+    first_line, _, rest = text.partition("\n")
+    if first_line.startswith("TITLE: "):
+        return first_line[7:].strip(), rest
+    return path.stem, text
+
+
+def bench_edition(
+    lang_code: str, dump_path: Path | None, page_paths: list[Path], repeat: int
+) -> dict[str, Any]:
+    """Times ``parse_page()`` for the pages of ``dump_path`` and the files
+    ``page_paths`` with the extractor of edition ``lang_code``."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conf = WiktionaryConfig(
+            dump_file_lang_code=lang_code, capture_language_codes=None
+        )
+        wtp = Wtp(
+            db_path=Path(tmp_dir) / "bench.db",
+            lang_code=lang_code,
+            template_override_funcs=template_override_fns,
+            extension_tags=conf.allowed_html_tags,
+            quiet=True,
+        )
+        wxr = WiktextractContext(wtp, conf)
+        try:
+            override_path = (
+                files("wiktextract")
+                / "data"
+                / "overrides"
+                / f"{lang_code}.json"
+            )
+            overrides = (
+                [Path(str(override_path))] if override_path.is_file() else None
+            )
+            pages = []
+            if dump_path is not None:
+                namespace_ids = {
+                    wtp.NAMESPACE_DATA.get(name, {}).get("id", 0)
+                    for name in conf.save_ns_names
+                }
+                parse_wiktionary(
+                    wxr,
+                    str(dump_path),
+                    None,
+                    True,
+                    namespace_ids,
+                    None,
+                    False,
+                    overrides,
+                )
+                for page in wtp.get_all_pages([0], False, "wikitext"):
+                    if page.body is not None:
+                        pages.append((page.title, page.body))
+            elif overrides is not None:
+                analyze_and_overwrite_pages(
+                    wtp, overrides, False, not conf.analyze_templates
+                )
+            for path in page_paths:
+                pages.append(read_test_page(path))
+
+            durations = []
+            num_entries = 0
+            num_exceptions = 0
+            start_rss = current_rss()
+            start_t = time.perf_counter()
+            for _ in range(repeat):
+                for title, text in pages:
+                    page_t = time.perf_counter()
+                    try:
+                        num_entries += len(parse_page(wxr, title, text))
+                    except Exception:
+                        num_exceptions += 1
+                    durations.append(time.perf_counter() - page_t)
+            total = time.perf_counter() - start_t
+            rss_growth = current_rss() - start_rss
+        finally:
+            wtp.close_db_conn()
+            close_thesaurus_db(wxr.thesaurus_db_path, wxr.thesaurus_db_conn)  # type: ignore[arg-type]
+    durations.sort()
+    return {
+        "pages": len(durations),
+        "entries": num_entries,
+        "exceptions": num_exceptions,
+        "seconds": total,
+        "pages_per_second": len(durations) / total if total > 0 else 0.0,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+        "peak_rss_bytes": peak_rss(),
+        "rss_growth_bytes": rss_growth,
+    }
+
+
+def run_benchmarks(
+    editions: list[str],
+    dump_path: Path | None,
+    page_paths: list[Path],
+    repeat: int,
+) -> dict[str, dict[str, Any]]:
+    """Runs ``bench_edition()`` for each edition in a new process."""
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    for lang_code in editions:
+        logger.info(f"Benchmarking the {lang_code} extractor")
+        with ctx.Pool(1) as pool:
+            results[lang_code] = pool.apply(
+                bench_edition, (lang_code, dump_path, page_paths, repeat)
+            )
+        logger.info(
+            "{}: {:.1f} pages/s, p50 {:.1f} ms, p99 {:.1f} ms".format(
+                lang_code,
+                results[lang_code]["pages_per_second"],
+                results[lang_code]["p50_ms"],
+                results[lang_code]["p99_ms"],
+            )
+        )
+    return results
+
+
+def compare_results(
+    results: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+) -> list[str]:
+    """Returns a description of each metric in ``results`` that is more
+    than ``threshold`` (a fraction) worse than in ``baseline``.  Editions
+    and metrics missing from the baseline are not compared."""
+    regressions = []
+    for lang_code, result in results.items():
+        base = baseline.get(lang_code)
+        if base is None:
+            continue
+        for metric, larger_is_better in COMPARED_METRICS:
+            old = base.get(metric)
+            new = result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if larger_is_better:
+                change = -change
+            if change > threshold:
+                regressions.append(
+                    "{}: {} {:.4g} -> {:.4g} ({:+.1%})".format(
+                        lang_code, metric, old, new, (new - old) / old
+                    )
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the extraction of pages per edition"
+    )
+    parser.add_argument(
+        "--editions",
+        type=str,
+        default=",".join(EDITIONS),
+        help="Comma-separated edition codes (default: all)",
+    )
+    parser.add_argument(
+        "--dump",
+        type=str,
+        default="tests/test-pages-articles.xml.bz2",
+        help="Dump file whose main namespace pages are parsed "
+        "(default tests/test-pages-articles.xml.bz2, empty for none)",
+    )
+    parser.add_argument(
+        "--pages-dir",
+        type=str,
+        default="tests",
+        help="Directory of *.txt test pages to parse (default tests, empty "
+        "for none)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Parse the pages N times",
+    )
+    parser.add_argument(
+        "--out", type=str, default=None, help="Write the results to this file"
+    )
+    parser.add_argument(
+        "--baseline",
+        type=str,
+        default=None,
+        help="Compare with the results of an earlier run (its --out file)",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Fraction by which a metric may be worse than the baseline "
+        "(default 0.1)",
+    )
+    args = parser.parse_args()
+    if args.repeat < 1:
+        print("--repeat must be at least 1")
+        sys.exit(1)
+
+    editions = [x.strip() for x in args.editions.split(",") if x.strip()]
+    dump_path = Path(args.dump) if args.dump else None
+    page_paths = (
+        sorted(Path(args.pages_dir).glob("*.txt")) if args.pages_dir else []
+    )
+    results = run_benchmarks(editions, dump_path, page_paths, args.repeat)
+    report: dict[str, Any] = {"editions": results}
+    regressions = []
+    if args.baseline is not None:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(
+            results, baseline["editions"], args.threshold
+        )
+        report["regressions"] = regressions
+        for regression in regressions:
+            logger.warning(f"Regression: {regression}")
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out is not None:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
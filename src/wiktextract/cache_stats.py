@@ -0,0 +1,166 @@
+# Statistics of the functools caches of the extractors
+# (wiktwords --cache-stats).
+#
+# The caches are per worker process, so their sizes can only be tuned by
+# looking at all workers together.  After every page, each worker returns
+# the ``cache_info()`` counters of the registered caches that have been
+# imported with the page's results; every N pages it also estimates their
+# memory use, which takes longer.  The parent process keeps the latest
+# counters of each worker, so the totals also include workers that have
+# been replaced, and reports hit rates, evictions and memory per cache.
+#
+# lru_cache doesn't count evictions, but each miss adds an entry and
+# entries are only removed by evictions (the caches are never cleared), so
+# evictions = misses - current size.
+
+import gc
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any
+
+from .wxr_logging import logger
+
+# Caches whose statistics are collected, as (module, function)
+REGISTERED_CACHES = (
+    ("wiktextract.extractor.en.form_descriptions", "decode_tags"),
+    ("wiktextract.extractor.en.form_descriptions", "classify_desc"),
+    ("wiktextract.extractor.en.inflection", "extract_cell_content"),
+    ("wiktextract.extractor.en.inflection", "parse_title"),
+)
+
+
+def registered_caches() -> dict[str, Any]:
+    """Returns the registered caches whose module has been imported, by
+    function name."""
+    caches = {}
+    for module_name, func_name in REGISTERED_CACHES:
+        module = sys.modules.get(module_name)
+        func = getattr(module, func_name, None)
+        if func is not None and hasattr(func, "cache_info"):
+            caches[func_name] = func
+    return caches
+
+
+def deep_size(obj: Any, seen: set[int]) -> int:
+    """Returns the size of ``obj`` and the containers and strings in it
+    that are not in ``seen``."""
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += deep_size(k, seen) + deep_size(v, seen)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for x in obj:
+            size += deep_size(x, seen)
+    return size
+
+
+def cache_bytes(func: Any) -> int:
+    """Estimates the memory used by the entries of an lru_cache: its dict
+    and the arguments and results it refers to."""
+    # The C implementation of lru_cache exposes its dict, keys and results
+    # only to the garbage collector
+    seen: set[int] = set()
+    size = 0
+    for obj in gc.get_referents(func):
+        # Leave out the wrapped function and the types of the objects
+        if not callable(obj):
+            size += deep_size(obj, seen)
+    return size
+
+
+class CacheReporter:
+    """Collects the statistics of the registered caches in a worker
+    process, with their memory use every ``bytes_every`` pages."""
+
+    __slots__ = ("bytes_every", "num_pages")
+
+    def __init__(self, bytes_every: int):
+        self.bytes_every = bytes_every
+        self.num_pages = 0
+
+    def end_page(self) -> dict[str, Any]:
+        self.num_pages += 1
+        caches = registered_caches()
+        report: dict[str, Any] = {
+            "pid": os.getpid(),
+            "caches": {
+                name: tuple(func.cache_info()) for name, func in caches.items()
+            },
+        }
+        if self.num_pages % self.bytes_every == 0:
+            report["bytes"] = {
+                name: cache_bytes(func) for name, func in caches.items()
+            }
+        return report
+
+
+class CacheStats:
+    """Aggregates the cache statistics reported by the worker processes."""
+
+    def __init__(self) -> None:
+        # pid -> name -> (hits, misses, maxsize, currsize)
+        self.counters: dict[int, dict[str, tuple]] = {}
+        # pid -> name -> estimated bytes
+        self.bytes: dict[int, dict[str, int]] = {}
+
+    def add(self, report: dict[str, Any]) -> None:
+        pid = report["pid"]
+        self.counters[pid] = report["caches"]
+        if "bytes" in report:
+            self.bytes[pid] = report["bytes"]
+
+    def totals(self) -> dict[str, dict[str, Any]]:
+        """Returns the statistics of each cache summed over the workers."""
+        totals: dict[str, dict[str, Any]] = {}
+        for pid, caches in self.counters.items():
+            for name, (hits, misses, maxsize, currsize) in caches.items():
+                t = totals.setdefault(
+                    name,
+                    {
+                        "workers": 0,
+                        "maxsize": maxsize,
+                        "hits": 0,
+                        "misses": 0,
+                        "evictions": 0,
+                        "entries": 0,
+                        "full_workers": 0,
+                        "bytes": 0,
+                    },
+                )
+                t["workers"] += 1
+                t["hits"] += hits
+                t["misses"] += misses
+                t["evictions"] += misses - currsize
+                t["entries"] += currsize
+                if maxsize is not None and currsize >= maxsize:
+                    t["full_workers"] += 1
+                t["bytes"] += self.bytes.get(pid, {}).get(name, 0)
+        for t in totals.values():
+            calls = t["hits"] + t["misses"]
+            t["hit_rate"] = t["hits"] / calls if calls > 0 else 0.0
+        return totals
+
+    def write(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as f:
+            json.dump(self.totals(), f, indent=2, sort_keys=True)
+
+    def log_report(self) -> None:
+        for name, t in sorted(self.totals().items()):
+            logger.info(
+                "Cache {}: hit rate {:.1%}, {} evictions, {} entries in {} "
+                "workers (maxsize {}, full in {}), ~{:.1f} MiB".format(
+                    name,
+                    t["hit_rate"],
+                    t["evictions"],
+                    t["entries"],
+                    t["workers"],
+                    t["maxsize"],
+                    t["full_workers"],
+                    t["bytes"] / 2**20,
+                )
+            )
@@ -0,0 +1,215 @@
+# Checkpoints for resuming an interrupted second phase.
+#
+# A checkpoint is a sqlite database recording the ids of the pages whose
+# data has been written to the output file, the size of the output file at
+# that point, the error messages and the (word, lang_code, pos) keys needed
+# for emitting thesaurus words.  Everything is saved in one transaction
+# after the output file has been flushed to disk, so the checkpoint always
+# describes a consistent state.  When resuming, the output file is truncated
+# to the saved size, which drops the data of pages that were written after
+# the last checkpoint; those pages are processed again.  With
+# --error-stream or --diagnostics-summary, the state of the message sink is
+# saved instead of the messages (see error_sink.py).
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import TextIO
+
+from .config import WiktionaryConfig
+from .error_sink import MessageSink
+from .wxr_logging import logger
+
+# Message lists of WiktionaryConfig saved in checkpoints
+MESSAGE_KINDS = ("errors", "warnings", "debugs")
+
+
+class Checkpoint:
+    """Records the progress of the second phase in the sqlite database
+    ``db_path``.  The parent process calls ``add_page()`` for every finished
+    page and ``maybe_save()`` after it, which saves a checkpoint every
+    ``interval`` seconds."""
+
+    def __init__(self, db_path: Path, interval: float = 300.0):
+        self.db_path = db_path
+        self.interval = interval
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS done (
+            page_id INTEGER PRIMARY KEY
+            );
+
+            CREATE TABLE IF NOT EXISTS emitted (
+            word TEXT,
+            lang_code TEXT,
+            pos TEXT,
+            PRIMARY KEY(word, lang_code, pos)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS messages (
+            kind TEXT,  -- errors, warnings, debugs
+            data TEXT  -- JSON
+            );
+
+            CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value
+            );
+            """
+        )
+        # Pages finished since the last checkpoint as (seq, page_id).  With
+        # ordered output, only the pages before the reorder buffer's next
+        # sequence number have been written.
+        self.pending_pages: list[tuple[int, int]] = []
+        self.pending_keys: set[tuple[str, str, str]] = set()
+        # Number of messages of each kind already saved
+        self.saved_messages = dict.fromkeys(MESSAGE_KINDS, 0)
+        self.last_save_time = time.time()
+
+    def clear(self) -> None:
+        """Removes the saved progress, used when starting a new run."""
+        with self.conn:
+            for table in ("done", "emitted", "messages", "state"):
+                self.conn.execute(f"DELETE FROM {table}")
+
+    def num_done_pages(self) -> int:
+        for (r,) in self.conn.execute("SELECT count(*) FROM done"):
+            return r
+        return 0
+
+    def done_pages(self) -> bytearray:
+        """Returns a table with a non-zero byte at the index of each done
+        page id.  Page ids are sqlite rowids, so this takes much less memory
+        than a set of millions of ints."""
+        done = bytearray()
+        for (page_id,) in self.conn.execute(
+            "SELECT page_id FROM done ORDER BY page_id DESC LIMIT 1"
+        ):
+            done = bytearray(page_id + 1)
+        for (page_id,) in self.conn.execute("SELECT page_id FROM done"):
+            done[page_id] = 1
+        return done
+
+    def restore(
+        self,
+        config: WiktionaryConfig,
+        emitted: set[tuple[str, str, str]],
+        out_f: TextIO,
+        error_sink: MessageSink | None = None,
+    ) -> None:
+        """Restores the messages and emitted keys of the last checkpoint and
+        truncates the output file to the size it had then."""
+        state = dict(self.conn.execute("SELECT key, value FROM state"))
+        offset = state.get("out_offset", 0)
+        out_f.flush()
+        size = os.fstat(out_f.fileno()).st_size
+        if size < offset:
+            raise RuntimeError(
+                f"Output file has {size} bytes, but the checkpoint "
+                f"{self.db_path} was saved after {offset} bytes"
+            )
+        out_f.truncate(offset)
+        out_f.seek(offset)
+        if error_sink is not None:
+            sink_state = state.get("error_sink")
+            error_sink.restore_checkpoint_state(
+                json.loads(sink_state) if sink_state is not None else None
+            )
+        for kind in MESSAGE_KINDS:
+            messages = getattr(config, kind)
+            for (data,) in self.conn.execute(
+                "SELECT data FROM messages WHERE kind = ? ORDER BY rowid",
+                (kind,),
+            ):
+                messages.append(json.loads(data))
+            self.saved_messages[kind] = len(messages)
+        emitted.update(
+            self.conn.execute("SELECT word, lang_code, pos FROM emitted")
+        )
+        logger.info(
+            f"Resuming from checkpoint {self.db_path}: "
+            f"{self.num_done_pages()} pages done, "
+            f"output truncated to {offset} bytes"
+        )
+
+    def add_page(
+        self, seq: int, page_id: int, keys: list[tuple[str, str, str]]
+    ) -> None:
+        self.pending_pages.append((seq, page_id))
+        self.pending_keys.update(keys)
+
+    def maybe_save(
+        self,
+        config: WiktionaryConfig,
+        out_f: TextIO,
+        next_seq: int | None = None,
+        error_sink: MessageSink | None = None,
+    ) -> None:
+        if time.time() - self.last_save_time >= self.interval:
+            self.save(config, out_f, next_seq, error_sink)
+
+    def save(
+        self,
+        config: WiktionaryConfig,
+        out_f: TextIO,
+        next_seq: int | None = None,
+        error_sink: MessageSink | None = None,
+    ) -> None:
+        """Saves a checkpoint.  Only pages with a sequence number below
+        ``next_seq`` (if given) are recorded as done."""
+        start_t = time.time()
+        out_f.flush()
+        os.fsync(out_f.fileno())
+        offset = out_f.tell()
+        if error_sink is not None:
+            error_sink.drain(config)
+        if next_seq is None:
+            done, self.pending_pages = self.pending_pages, []
+        else:
+            done = [x for x in self.pending_pages if x[0] < next_seq]
+            self.pending_pages = [
+                x for x in self.pending_pages if x[0] >= next_seq
+            ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO done (page_id) VALUES(?)",
+                ((page_id,) for _, page_id in done),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO emitted (word, lang_code, pos) "
+                "VALUES(?, ?, ?)",
+                self.pending_keys,
+            )
+            for kind in MESSAGE_KINDS:
+                messages = getattr(config, kind)
+                self.conn.executemany(
+                    "INSERT INTO messages (kind, data) VALUES(?, ?)",
+                    (
+                        (kind, json.dumps(msg, ensure_ascii=False))
+                        for msg in messages[self.saved_messages[kind] :]
+                    ),
+                )
+                self.saved_messages[kind] = len(messages)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO state (key, value) "
+                "VALUES('out_offset', ?)",
+                (offset,),
+            )
+            if error_sink is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO state (key, value) "
+                    "VALUES('error_sink', ?)",
+                    (json.dumps(error_sink.checkpoint_state()),),
+                )
+        self.pending_keys.clear()
+        self.last_save_time = time.time()
+        logger.info(
+            f"Saved checkpoint in {self.last_save_time - start_t:.1f}s: "
+            f"{len(done)} more pages done, output {offset} bytes"
+        )
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,157 @@
+# Compressed output files.  When the name of the --out file ends with .gz,
+# .bz2, .xz or .zst, the output is compressed while it is written instead of
+# in another pass over the file afterwards.
+#
+# Compression runs in a background thread behind a bounded queue, so the
+# main loop only waits for it when the compressor falls behind by more than
+# the queue size.  The zlib, bz2, lzma and zstandard compressors release the
+# GIL, so compression runs in parallel with the main loop.  The thread is
+# started when the first chunk is written, so that the file can be opened
+# before the worker processes are forked (see preload.py).
+
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+from pathlib import Path
+from typing import IO, TextIO
+
+# Text is buffered and given to the compression thread in chunks of about
+# this many characters
+CHUNK_SIZE = 1024 * 1024
+# Maximum number of chunks waiting to be compressed
+QUEUE_SIZE = 16
+
+
+def open_gzip(path: str | Path, mode: str, **kwargs) -> IO:
+    # The default level 9 is several times slower than 6 for a slightly
+    # smaller file
+    return gzip.open(path, mode, compresslevel=6, **kwargs)
+
+
+def open_zstd(path: str | Path, mode: str, **kwargs) -> IO:
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            ".zst files require the zstandard package "
+            '(pip install "wiktextract[zstd]")'
+        )
+    return zstandard.open(path, mode, **kwargs)
+
+
+# Functions that open a compressed file in mode "wb" or "rt"
+COMPRESSORS = {
+    ".gz": open_gzip,
+    ".bz2": bz2.open,
+    ".xz": lzma.open,
+    ".zst": open_zstd,
+}
+
+
+def compression_suffix(path: str | Path) -> str | None:
+    """Returns the suffix of ``path`` if it names a compressed file."""
+    suffix = Path(path).suffix
+    if suffix in COMPRESSORS:
+        return suffix
+    return None
+
+
+class CompressedWriter:
+    """Text file that compresses what is written to it in a background
+    thread.  Errors of the thread are raised by the next call to
+    ``write()``, ``flush()`` or ``close()``."""
+
+    def __init__(self, path: str | Path, suffix: str):
+        self.compressed_f = COMPRESSORS[suffix](path, "wb")
+        self.buffer: list[str] = []
+        self.buffer_size = 0
+        self.queue: queue.Queue[bytes | None] = queue.Queue(QUEUE_SIZE)
+        self.error: BaseException | None = None
+        self.closed = False
+        self.thread: threading.Thread | None = None
+
+    def compress(self) -> None:
+        while True:
+            chunk = self.queue.get()
+            try:
+                if chunk is None:
+                    return
+                if self.error is None:
+                    self.compressed_f.write(chunk)
+            except BaseException as e:
+                # Chunks are still taken from the queue so that the main
+                # thread doesn't block before it sees the error
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def check_error(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+    def put_buffer(self) -> None:
+        if self.buffer:
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.compress, name="compressed-writer", daemon=True
+                )
+                self.thread.start()
+            self.queue.put("".join(self.buffer).encode("utf-8"))
+            self.buffer = []
+            self.buffer_size = 0
+
+    def write(self, text: str) -> int:
+        self.check_error()
+        self.buffer.append(text)
+        self.buffer_size += len(text)
+        if self.buffer_size >= CHUNK_SIZE:
+            self.put_buffer()
+        return len(text)
+
+    def flush(self) -> None:
+        """Waits until everything written so far has been compressed."""
+        self.put_buffer()
+        self.queue.join()
+        self.check_error()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.put_buffer()
+            if self.thread is not None:
+                self.queue.put(None)
+                self.thread.join()
+            self.check_error()
+        finally:
+            self.compressed_f.close()
+
+    def __enter__(self) -> "CompressedWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> None:
+        self.close()
+
+
+def open_output(
+    path: str | Path, compressed_path: str | Path | None = None
+) -> TextIO:
+    """Opens the output file ``path`` for writing.  The output is
+    compressed if ``compressed_path`` (by default ``path``) names a
+    compressed file, so that a temporary file can be compressed based on
+    the name it will be renamed to."""
+    suffix = compression_suffix(compressed_path or path)
+    if suffix is None:
+        return open(path, "w", buffering=1024 * 1024, encoding="utf-8")
+    return CompressedWriter(path, suffix)  # type: ignore[return-value]
+
+
+def open_input(path: str | Path) -> TextIO:
+    """Opens a file written with ``open_output()`` for reading."""
+    suffix = compression_suffix(path)
+    if suffix is None:
+        return open(path, encoding="utf-8")
+    return COMPRESSORS[suffix](path, "rt", encoding="utf-8")
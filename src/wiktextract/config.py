@@ -6,6 +6,7 @@
 import collections
 import json
 from importlib.resources import files
+from pathlib import Path
 from typing import (
     Iterable,
     Optional,
@@ -64,6 +65,39 @@ class WiktionaryConfig:
         "save_ns_names",
         "extract_ns_names",
         "allowed_html_tags",
+        "hung_page_warning_seconds",
+        "hung_page_kill_seconds",
+        "out_shards_dir",
+        "ordered_output",
+        "max_buffered_bytes",
+        "page_order",
+        "batch_pages",
+        "checkpoint_path",
+        "checkpoint_interval",
+        "resume",
+        "shard",
+        "shard_manifest_path",
+        "job_queue_path",
+        "job_worker",
+        "job_size",
+        "job_lease_seconds",
+        "job_poll_seconds",
+        "worker_max_pages",
+        "worker_max_rss",
+        "timing_stats_path",
+        "profile_dir",
+        "profile_every",
+        "memory_profile_dir",
+        "memory_profile_pages",
+        "metrics_textfile_path",
+        "metrics_port",
+        "metrics_interval",
+        "validate_every",
+        "cache_stats_path",
+        "cache_stats_pages",
+        "bundle_dir",
+        "bundle_seconds",
+        "preload_extractor",
     )
 
     def __init__(
@@ -128,6 +162,77 @@ class WiktionaryConfig:
         # these are extracted namespaces
         self.extract_ns_names = ["Main"]
         self.allowed_html_tags: dict[str, HTMLTagData] = {}
+        # pages taking longer than this are reported by the watchdog, and
+        # their worker process is killed if the kill limit is not None
+        self.hung_page_warning_seconds = 100.0
+        self.hung_page_kill_seconds: Optional[float] = None
+        # if set, worker processes write their output to files in this
+        # directory
+        self.out_shards_dir: Optional[Path] = None
+        # write output in page title order, buffering at most about
+        # max_buffered_bytes of out-of-order output
+        self.ordered_output = False
+        self.max_buffered_bytes = 256 * 1024 * 1024
+        # order in which pages are given to worker processes: "title" or
+        # "size" (largest first)
+        self.page_order = "title"
+        # send batches of page ids to worker processes, which read the pages
+        # from the database themselves
+        self.batch_pages = False
+        # progress of the second phase is saved in this sqlite file every
+        # checkpoint_interval seconds; with resume, the run continues from
+        # the last checkpoint (requires batch_pages)
+        self.checkpoint_path: Optional[Path] = None
+        self.checkpoint_interval = 300.0
+        self.resume = False
+        # (i, N): process only the i:th of N shards of the pages and write
+        # the emitted keys to the manifest instead of emitting thesaurus
+        # words (see shards.py)
+        self.shard: Optional[tuple[int, int]] = None
+        self.shard_manifest_path: Optional[Path] = None
+        # sqlite job queue shared by the coordinator, which publishes the
+        # pages as jobs of job_size pages and merges the output, and any
+        # number of worker processes (job_worker) that lease jobs for
+        # job_lease_seconds at a time (see job_queue.py)
+        self.job_queue_path: Optional[Path] = None
+        self.job_worker = False
+        self.job_size = 1000
+        self.job_lease_seconds = 600.0
+        self.job_poll_seconds = 5.0
+        # worker processes are replaced after processing this many pages or
+        # when their resident set size exceeds this many bytes
+        self.worker_max_pages: Optional[int] = None
+        self.worker_max_rss: Optional[int] = None
+        # page timings are saved in this sqlite file (see page_timing.py)
+        self.timing_stats_path: Optional[Path] = None
+        # worker processes save profiles of every profile_every'th task in
+        # this directory (see worker_profile.py)
+        self.profile_dir: Optional[Path] = None
+        self.profile_every = 1
+        # worker processes write memory reports every memory_profile_pages
+        # pages in this directory (see memory_profile.py)
+        self.memory_profile_dir: Optional[Path] = None
+        self.memory_profile_pages = 1000
+        # live metrics of the second phase (see metrics.py)
+        self.metrics_textfile_path: Optional[Path] = None
+        self.metrics_port: Optional[int] = None
+        self.metrics_interval = 15.0
+        # worker processes check every validate_every'th extracted entry,
+        # or none if 0 (see validation.py)
+        self.validate_every = 1
+        # statistics of the extractors' caches are written to this file;
+        # workers estimate the caches' memory every cache_stats_pages pages
+        # (see cache_stats.py)
+        self.cache_stats_path: Optional[Path] = None
+        self.cache_stats_pages = 1000
+        # bundles of pages that take longer than bundle_seconds, raise an
+        # exception or kill their worker are written in this directory
+        # (see page_bundles.py)
+        self.bundle_dir: Optional[Path] = None
+        self.bundle_seconds = 60.0
+        # the main process imports the extractor and freezes its objects
+        # before the worker processes are forked (see preload.py)
+        self.preload_extractor = True
         self.load_edition_settings()
 
     def merge_return(self, ret: CollatedErrorReturnData):
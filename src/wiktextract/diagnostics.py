@@ -0,0 +1,114 @@
+# Aggregated diagnostics (wiktwords --diagnostics-summary).
+#
+# Most messages are the same few hundred sortids repeated millions of times,
+# so instead of keeping every message, the summary counts the messages of
+# each (kind, sortid) in total and by language and keeps a few examples of
+# each, chosen by reservoir sampling so that every message has the same
+# chance of being an example.  Memory use and the size of the summary do
+# not grow with the size of the dump.
+
+import json
+import random
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+from .error_sink import MESSAGE_KINDS, MessageSink
+from .wxr_logging import logger
+
+# Fields of the messages kept in the examples
+EXAMPLE_FIELDS = ("msg", "title", "section", "subsection")
+
+
+class SortidStats:
+    __slots__ = ("count", "languages", "examples")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.languages: dict[str, int] = {}
+        self.examples: list[dict] = []
+
+
+class DiagnosticsSummary(MessageSink):
+    """Counts messages by (kind, sortid) and keeps up to ``num_examples``
+    random examples of each.  The summary is written to ``path`` as JSON
+    by ``close()``."""
+
+    def __init__(self, path: Path, num_examples: int = 5):
+        self.path = path
+        self.num_examples = num_examples
+        self.stats: dict[tuple[str, str], SortidStats] = {}
+        # Seeded, so that the same run gives the same examples
+        self.rng = random.Random(0)
+
+    def add(self, kind: str, messages: Iterable[dict]) -> None:
+        for msg in messages:
+            key = kind, msg.get("called_from") or ""
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = SortidStats()
+            stats.count += 1
+            # The section of a page is its language
+            lang = msg.get("section") or ""
+            stats.languages[lang] = stats.languages.get(lang, 0) + 1
+            if len(stats.examples) < self.num_examples:
+                stats.examples.append(self.example(msg))
+            else:
+                i = self.rng.randrange(stats.count)
+                if i < self.num_examples:
+                    stats.examples[i] = self.example(msg)
+
+    @staticmethod
+    def example(msg: dict) -> dict:
+        return {field: msg.get(field) for field in EXAMPLE_FIELDS}
+
+    def summary(self) -> dict[str, list[dict]]:
+        """Returns the sortids of each kind of message, most frequent
+        first."""
+        summary: dict[str, list[dict]] = {kind: [] for kind in MESSAGE_KINDS}
+        for (kind, sortid), stats in sorted(
+            self.stats.items(), key=lambda x: (-x[1].count, x[0])
+        ):
+            summary[kind].append(
+                {
+                    "sortid": sortid,
+                    "count": stats.count,
+                    "languages": dict(
+                        sorted(
+                            stats.languages.items(),
+                            key=lambda x: (-x[1], x[0]),
+                        )
+                    ),
+                    "examples": stats.examples,
+                }
+            )
+        return summary
+
+    def checkpoint_state(self) -> Any:
+        return [
+            [kind, sortid, stats.count, stats.languages, stats.examples]
+            for (kind, sortid), stats in self.stats.items()
+        ]
+
+    def restore_checkpoint_state(self, state: Any) -> None:
+        self.stats = {}
+        for kind, sortid, count, languages, examples in state or []:
+            stats = self.stats[kind, sortid] = SortidStats()
+            stats.count = count
+            stats.languages = languages
+            stats.examples = examples
+
+    def close(self) -> None:
+        summary = self.summary()
+        with self.path.open("w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=1)
+        for kind, sortids in summary.items():
+            if not sortids:
+                continue
+            logger.info(
+                f"{sum(x['count'] for x in sortids)} {kind} from "
+                f"{len(sortids)} sortids, most frequent:"
+            )
+            for x in sortids[:10]:
+                logger.info(f"  {x['count']:9d}  {x['sortid']}")
+        logger.info(f"Diagnostics summary written to {self.path}")
@@ -0,0 +1,195 @@
+# Streaming the error, warning and debug messages of a run to disk
+# (wiktwords --error-stream).
+#
+# Without it, the parent process keeps all messages in the lists of
+# WiktionaryConfig until the end of the run, which takes gigabytes of memory
+# and drops messages beyond the caps in ``WiktionaryConfig.merge_return()``.
+# The sink moves the messages from those lists to a JSONL file as results
+# arrive, one message per line with its kind ("errors", "warnings" or
+# "debugs") in the "kind" field.  The file is rotated to "<path>.1",
+# "<path>.2", ... when it grows larger than a given size.
+# ``finalize_error_stream()`` converts the stream to the format of the file
+# written with --errors.
+#
+# ``MessageSink`` is the interface used by the second phase, also
+# implemented by ``DiagnosticsSummary`` (wiktwords --diagnostics-summary).
+
+import argparse
+import json
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+from .config import WiktionaryConfig
+from .wxr_logging import logger
+
+MESSAGE_KINDS = ("errors", "warnings", "debugs")
+
+
+def error_stream_part_path(path: Path, part: int) -> Path:
+    if part == 0:
+        return path
+    return path.with_name(f"{path.name}.{part}")
+
+
+def error_stream_paths(path: Path) -> list[Path]:
+    """Returns the files of the stream ``path`` in the order they were
+    written."""
+    paths = []
+    part = 0
+    while True:
+        part_path = error_stream_part_path(path, part)
+        if not part_path.exists():
+            return paths
+        paths.append(part_path)
+        part += 1
+
+
+class MessageSink(ABC):
+    """Takes the messages collected in ``WiktionaryConfig`` in the parent
+    process."""
+
+    @abstractmethod
+    def add(self, kind: str, messages: Iterable[dict]) -> None: ...
+
+    def drain(self, config: WiktionaryConfig) -> None:
+        """Moves the messages collected in ``config`` to the sink."""
+        for kind in MESSAGE_KINDS:
+            messages = getattr(config, kind)
+            if messages:
+                self.add(kind, messages)
+                messages.clear()
+
+    @abstractmethod
+    def checkpoint_state(self) -> Any:
+        """Returns the state of the sink as a JSON value, saved in
+        checkpoints."""
+
+    @abstractmethod
+    def restore_checkpoint_state(self, state: Any) -> None:
+        """Restores the state returned by ``checkpoint_state()``, or the
+        initial state if ``state`` is None."""
+
+    def close(self) -> None:
+        pass
+
+
+class ErrorSink(MessageSink):
+    """Appends messages to the error stream ``path``.  With
+    ``append=False``, the files of an earlier stream are removed."""
+
+    def __init__(
+        self, path: Path, max_bytes: int | None = None, append: bool = False
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        paths = error_stream_paths(path)
+        if not append:
+            for part_path in paths:
+                part_path.unlink()
+            paths = []
+        self.part = max(len(paths) - 1, 0)
+        self.f = error_stream_part_path(path, self.part).open(
+            "a", encoding="utf-8"
+        )
+        self.counts = dict.fromkeys(MESSAGE_KINDS, 0)
+
+    def add(self, kind: str, messages: Iterable[dict]) -> None:
+        if self.max_bytes is not None and self.f.tell() >= self.max_bytes:
+            self.rotate()
+        for msg in messages:
+            self.f.write(
+                json.dumps({"kind": kind, **msg}, ensure_ascii=False) + "\n"
+            )
+            self.counts[kind] += 1
+
+    def rotate(self) -> None:
+        self.f.close()
+        self.part += 1
+        self.f = error_stream_part_path(self.path, self.part).open(
+            "w", encoding="utf-8"
+        )
+
+    def position(self) -> tuple[int, int]:
+        """Returns the current (file number, offset), which can be given to
+        ``truncate()``."""
+        self.f.flush()
+        return self.part, self.f.tell()
+
+    def checkpoint_state(self) -> Any:
+        return self.position()
+
+    def restore_checkpoint_state(self, state: Any) -> None:
+        part, offset = state or (0, 0)
+        self.truncate(part, offset)
+
+    def truncate(self, part: int, offset: int) -> None:
+        """Removes the messages added after ``position()`` returned (part,
+        offset)."""
+        self.f.close()
+        for part_path in error_stream_paths(self.path)[part + 1 :]:
+            part_path.unlink()
+        self.part = part
+        part_path = error_stream_part_path(self.path, part)
+        part_path.touch()
+        # Truncated before it is opened, so that the file position of the
+        # new file object is at the new end of the file
+        os.truncate(part_path, offset)
+        self.f = part_path.open("a", encoding="utf-8")
+
+    def flush(self) -> None:
+        self.f.flush()
+
+    def close(self) -> None:
+        self.f.close()
+        if any(self.counts.values()):
+            logger.info(
+                "Error stream {}: {} errors, {} warnings, {} debugs".format(
+                    self.path, *self.counts.values()
+                )
+            )
+
+
+def read_error_stream(path: Path) -> Iterator[tuple[str, dict]]:
+    """Yields (kind, message) for each message in the stream ``path``."""
+    for part_path in error_stream_paths(path):
+        with part_path.open(encoding="utf-8") as f:
+            for line in f:
+                msg = json.loads(line)
+                yield msg.pop("kind"), msg
+
+
+def finalize_error_stream(path: Path, errors_path: Path) -> None:
+    """Writes the messages of the stream ``path`` to ``errors_path`` in the
+    format of ``wiktwords --errors``, without loading them all in memory.
+    The stream is read once for each kind of message."""
+    with errors_path.open("w", encoding="utf-8") as f:
+        # Keys in the order of json.dump(..., sort_keys=True)
+        for i, kind in enumerate(sorted(MESSAGE_KINDS)):
+            f.write(("{" if i == 0 else "], ") + json.dumps(kind) + ": [")
+            first = True
+            for msg_kind, msg in read_error_stream(path):
+                if msg_kind != kind:
+                    continue
+                if not first:
+                    f.write(", ")
+                f.write(json.dumps(msg, sort_keys=True))
+                first = False
+        f.write("]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert a file written with wiktwords --error-stream "
+        "to the format of wiktwords --errors"
+    )
+    parser.add_argument("error_stream", help="File given to --error-stream")
+    parser.add_argument("errors", help="Output file")
+    args = parser.parse_args()
+    finalize_error_stream(Path(args.error_stream), Path(args.errors))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# Words of the NLTK Brown corpus, on which the English vocabulary in
+# english_words.py is based.
+#
+# They are read from data/en/brown_words.txt.gz, a gzipped list of one word
+# per line that is created with tools/freeze_brown_words.py ("make
+# brown_words") and shipped with the package, so that the corpus (which may
+# have to be downloaded) is not needed when extracting.  Without the file,
+# the words are read from the corpus of NLTK.
+
+import gzip
+from pathlib import Path
+
+from ...wxr_logging import logger
+
+BROWN_WORDS_PATH = (
+    Path(__file__).resolve().parents[2] / "data" / "en" / "brown_words.txt.gz"
+)
+
+
+def read_brown_words(path: Path) -> set[str]:
+    with gzip.open(path, "rt", encoding="utf-8", newline="\n") as f:
+        return set(word for word in f.read().splitlines() if word)
+
+
+def corpus_brown_words() -> set[str]:
+    """Returns the words of the Brown corpus of NLTK, which is downloaded
+    if it isn't installed."""
+    import nltk  # type: ignore[import-untyped]
+    from nltk.corpus import brown  # type: ignore[import-untyped]
+
+    try:
+        nltk.data.find("corpora/brown.zip")
+    except LookupError:
+        nltk.download("brown", quiet=True)
+    return set(brown.words())
+
+
+def load_brown_words() -> set[str]:
+    try:
+        return read_brown_words(BROWN_WORDS_PATH)
+    except FileNotFoundError:
+        logger.warning(
+            f"{BROWN_WORDS_PATH} not found, reading the Brown corpus from "
+            'NLTK instead (run "make brown_words" to create it)'
+        )
+        return corpus_brown_words()
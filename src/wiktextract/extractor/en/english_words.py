@@ -4,19 +4,14 @@
 # and exclude some words.  These will likely need to be tweaked semi-frequently
 # to add support for unrecognized sense descriptions.
 #
+# The words of the Brown corpus are read from a data file if it exists (see
+# brown_words.py), so that the corpus isn't needed when extracting.
+#
 # Copyright (c) 2020-2022 Tatu Ylonen.  See file LICENSE and https://ylonen.org
 
-import nltk  # type: ignore[import-untyped]
-from nltk.corpus import brown  # type: ignore[import-untyped]
-
+from .brown_words import load_brown_words
 from .form_descriptions_known_firsts import known_firsts  # w/ our additions
 
-# Download Brown corpus if not already downloaded
-try:
-    nltk.data.find("corpora/brown.zip")
-except LookupError:
-    nltk.download("brown", quiet=True)
-
 # English words added to the default set from Brown corpus.  Multi-word
 # expressions separated by spaces can also be added but must match the whole
 # text (they can be used when we don't want to add the components).
@@ -1944,7 +1939,7 @@ not_english_words = not_english_words_1 | potentially_english_words
 # Construct a set of (most) English words.  Multi-word expressions where we
 # do not want to include the components can also be put here space-separated.
 english_words = (
-    set(brown.words())
+    load_brown_words()
     | known_firsts
     |
     # XXX the second words of species names add too much garbage
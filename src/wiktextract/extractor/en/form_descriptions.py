@@ -16,9 +16,9 @@ from typing import (
 )
 
 import Levenshtein
-from nltk import TweetTokenizer  # type:ignore[import-untyped]
 
 from ...datautils import data_append, data_extend, split_at_comma_semi
+from ...lazy_tables import en_tables
 from ...tags import (
     alt_of_tags,
     form_of_tags,
@@ -37,13 +37,6 @@ from ...tags import (
 )
 from ...topics import topic_generalize_map, valid_topics
 from ...wxr_context import WiktextractContext
-from .english_words import (
-    english_words,
-    not_english_words,
-    potentially_english_words,
-)
-from .form_descriptions_known_firsts import known_firsts
-from .taxondata import known_species
 from .type_utils import (
     AltOf,
     FormData,
@@ -54,8 +47,15 @@ from .type_utils import (
     WordData,
 )
 
-# Tokenizer for classify_desc()
-tokenizer = TweetTokenizer()
+
+@functools.cache
+def get_tokenizer() -> Any:
+    """Returns the tokenizer for classify_desc().  NLTK is imported on first
+    use, as it takes long to import."""
+    from nltk import TweetTokenizer  # type:ignore[import-untyped]
+
+    return TweetTokenizer()
+
 
 # These are ignored as the value of a related form in form head.
 IGNORED_RELATED: set[str] = set(
@@ -3238,6 +3238,13 @@ def classify_desc(
         ):
             return "tags"
 
+    # The vocabularies are loaded on first use (see lazy_tables.py)
+    known_species = en_tables.known_species
+    known_firsts = en_tables.known_firsts
+    english_words = en_tables.english_words
+    not_english_words = en_tables.not_english_words
+    potentially_english_words = en_tables.potentially_english_words
+
     # Check if it looks like the taxonomic name of a species
     if desc in known_species:
         return "taxonomic"
@@ -3269,7 +3276,7 @@ def classify_desc(
         desc1 = re.sub(
             tokenizer_fixup_re, lambda m: tokenizer_fixup_map[m.group(0)], desc
         )
-        tokens = tokenizer.tokenize(desc1)
+        tokens = get_tokenizer().tokenize(desc1)
         if not tokens:
             return "other"
         lst_bool = list(
@@ -15,6 +15,7 @@ from wikitextprocessor import MAGIC_FIRST, NodeKind, WikiNode
 
 from ...clean import clean_value
 from ...datautils import data_append, freeze, split_at_comma_semi
+from ...lazy_tables import en_tables
 from ...tags import valid_tags
 from ...wxr_context import WiktextractContext
 from .form_descriptions import (
@@ -23,9 +24,7 @@ from .form_descriptions import (
     distw,
     parse_head_final_tags,
 )
-from .inflectiondata import infl_map, infl_start_map, infl_start_re
 from .lang_specific_configs import get_lang_conf, lang_specific_tags
-from .table_headers_heuristics_data import LANGUAGES_WITH_CELLS_AS_HEADERS
 from .type_utils import FormData
 
 # --debug-text-cell WORD
@@ -802,12 +801,12 @@ def expand_header(
     for text in parts:
         if not text:
             continue
-        if text in infl_map:
-            v = infl_map[text]  # list or string
+        if text in en_tables.infl_map:
+            v = en_tables.infl_map[text]  # list or string
         else:
-            m = re.match(infl_start_re, text)
+            m = re.match(en_tables.infl_start_re, text)
             if m is not None:
-                v = infl_start_map[m.group(1)]
+                v = en_tables.infl_start_map[m.group(1)]
                 # print("INFL_START {} -> {}".format(text, v))
             elif re.match(r"Notes", text):
                 # Ignored header
@@ -824,8 +823,8 @@ def expand_header(
                 continue
             # Try without final parenthesized part
             text_without_parens = re.sub(r"[,/]?\s+\([^)]*\)\s*$", "", text)
-            if text_without_parens in infl_map:
-                v = infl_map[text_without_parens]
+            if text_without_parens in en_tables.infl_map:
+                v = en_tables.infl_map[text_without_parens]
             elif m is None:
                 if not silent:
                     wxr.wtp.debug(
@@ -866,7 +865,9 @@ def expand_header(
             if not isinstance(v, dict):
                 wxr.wtp.debug(
                     "inflection table: internal: "
-                    "UNIMPLEMENTED INFL_MAP VALUE: {}".format(infl_map[text]),
+                    "UNIMPLEMENTED INFL_MAP VALUE: {}".format(
+                        en_tables.infl_map[text]
+                    ),
                     sortid="inflection/767",
                 )
                 tagset = [()]
@@ -2214,7 +2215,7 @@ def parse_simple_table(
             row[0].is_title
             and text
             and not is_superscript(text[0])
-            and text not in infl_map  # zealous inflation map?
+            and text not in en_tables.infl_map  # zealous inflation map?
             and (
                 re.match(r"Inflection ", text)
                 or re.sub(
@@ -2227,9 +2228,9 @@ def parse_simple_table(
                         text,
                     ),
                 ).strip()
-                not in infl_map
+                not in en_tables.infl_map
             )
-            and not re.match(infl_start_re, text)
+            and not re.match(en_tables.infl_start_re, text)
             and all(
                 x.is_title == row[0].is_title and x.text == text
                 # all InflCells in `row` have the same is_title and text
@@ -2835,6 +2836,7 @@ def determine_header(
         header_kind = NodeKind.TABLE_HEADER_CELL
     elif table_kind == NodeKind.HTML:
         header_kind = "th"
+    cells_as_headers = en_tables.LANGUAGES_WITH_CELLS_AS_HEADERS
     idx = celltext.find(": ")
     is_title = False
     # remove anything in parentheses, compress whitespace, .strip()
@@ -2879,7 +2881,7 @@ def determine_header(
         and cleaned not in IGNORED_COLVALUES
     ):
         # print("col: {}".format(col))
-        if not ignored_cell and lang not in LANGUAGES_WITH_CELLS_AS_HEADERS:
+        if not ignored_cell and lang not in cells_as_headers:
             wxr.wtp.debug(
                 "rejected heuristic header: "
                 "table cell identified as header and given "
@@ -2889,7 +2891,7 @@ def determine_header(
                 sortid="inflection/2447",
             )
             candidate_hdr = False
-        elif cleaned not in LANGUAGES_WITH_CELLS_AS_HEADERS.get(lang, ""):
+        elif cleaned not in cells_as_headers.get(lang, ""):
             wxr.wtp.debug(
                 "rejected heuristic header: "
                 "table cell identified as header and given "
@@ -2919,7 +2921,7 @@ def determine_header(
     #      "lang={} pos={}"
     #      .format(titletext, hdr_expansion, candidate_hdr,
     #              lang, pos))
-    if idx >= 0 and titletext[:idx] in infl_map:
+    if idx >= 0 and titletext[:idx] in en_tables.infl_map:
         target = titletext[idx + 2 :].strip()
         celltext = celltext[:idx]
         is_title = True
@@ -2955,7 +2957,7 @@ def determine_header(
         not style.startswith("////")
         and " + " not in titletext
     ):
-        if not ignored_cell and lang not in LANGUAGES_WITH_CELLS_AS_HEADERS:
+        if not ignored_cell and lang not in cells_as_headers:
             wxr.wtp.debug(
                 "rejected heuristic header: "
                 "table cell identified as header based "
@@ -2966,7 +2968,7 @@ def determine_header(
             )
         elif (
             not ignored_cell
-            and cleaned not in LANGUAGES_WITH_CELLS_AS_HEADERS.get(lang, "")
+            and cleaned not in cells_as_headers.get(lang, "")
         ):
             wxr.wtp.debug(
                 "rejected heuristic header: "
@@ -41,6 +41,7 @@ from ...page import (
     is_panel_template,
     recursively_extract,
 )
+from ...page_timing import time_section
 from ...tags import valid_tags
 from ...wxr_context import WiktextractContext
 from ...wxr_logging import logger
@@ -3553,15 +3554,16 @@ def parse_language(
                     wxr.wtp.start_subsection(None)
                 if wxr.config.capture_pronunciation:
                     data = select_data()
-                    parse_pronunciation(
-                        wxr,
-                        node,
-                        data,
-                        etym_data,
-                        have_etym,
-                        base_data,
-                        lang_code,
-                    )
+                    with time_section(wxr, "pronunciation"):
+                        parse_pronunciation(
+                            wxr,
+                            node,
+                            data,
+                            etym_data,
+                            have_etym,
+                            base_data,
+                            lang_code,
+                        )
             elif t.startswith(tuple(ETYMOLOGY_TITLES)):
                 push_etym()
                 wxr.wtp.start_subsection(None)
@@ -3569,10 +3571,12 @@ def parse_language(
                     m = re.search(r"\s(\d+)$", t)
                     if m:
                         etym_data["etymology_number"] = int(m.group(1))
-                    parse_etymology(etym_data, node)
+                    with time_section(wxr, "etymology"):
+                        parse_etymology(etym_data, node)
             elif t == DESCENDANTS_TITLE and wxr.config.capture_descendants:
                 data = select_data()
-                parse_descendants(data, node)
+                with time_section(wxr, "descendants"):
+                    parse_descendants(data, node)
             elif (
                 t in PROTO_ROOT_DERIVED_TITLES
                 and pos == "root"
@@ -3580,12 +3584,15 @@ def parse_language(
                 and wxr.config.capture_descendants
             ):
                 data = select_data()
-                parse_descendants(data, node, True)
+                with time_section(wxr, "descendants"):
+                    parse_descendants(data, node, True)
             elif t == TRANSLATIONS_TITLE:
                 data = select_data()
-                parse_translations(data, node)
+                with time_section(wxr, "translations"):
+                    parse_translations(data, node)
             elif t in INFLECTION_TITLES:
-                parse_inflection(node, t, pos)
+                with time_section(wxr, "inflection"):
+                    parse_inflection(node, t, pos)
             else:
                 lst = t.split()
                 while len(lst) > 1 and lst[-1].isdigit():
@@ -3612,18 +3619,21 @@ def parse_language(
                             sortid="page/2763",
                         )
                     # Parse word senses for the part-of-speech
-                    parse_part_of_speech(node, pos)
+                    with time_section(wxr, "pos"):
+                        parse_part_of_speech(node, pos)
                     if "tags" in dt:
                         for pdata in pos_datas:
                             data_extend(pdata, "tags", dt["tags"])
                 elif t_no_number in LINKAGE_TITLES:
                     rel = LINKAGE_TITLES[t_no_number]
                     data = select_data()
-                    parse_linkage(data, rel, node)
+                    with time_section(wxr, "linkage"):
+                        parse_linkage(data, rel, node)
                 elif t_no_number == COMPOUNDS_TITLE:
                     data = select_data()
                     if wxr.config.capture_compounds:
-                        parse_linkage(data, "derived", node)
+                        with time_section(wxr, "linkage"):
+                            parse_linkage(data, "derived", node)
 
             # XXX parse interesting templates also from other sections.  E.g.,
             # {{Letter|...}} in ===See also===
@@ -4272,12 +4282,13 @@ def parse_page(wxr: WiktextractContext, word: str, text: str) -> list[WordData]:
 
     # Parse the page, pre-expanding those templates that are likely to
     # influence parsing
-    tree = wxr.wtp.parse(
-        text,
-        pre_expand=True,
-        additional_expand=ADDITIONAL_EXPAND_TEMPLATES,
-        do_not_pre_expand=DO_NOT_PRE_EXPAND_TEMPLATES,
-    )
+    with time_section(wxr, "wtp.parse"):
+        tree = wxr.wtp.parse(
+            text,
+            pre_expand=True,
+            additional_expand=ADDITIONAL_EXPAND_TEMPLATES,
+            do_not_pre_expand=DO_NOT_PRE_EXPAND_TEMPLATES,
+        )
     # from wikitextprocessor.parser import print_tree
     # print("PAGE PARSE:", print_tree(tree))
 
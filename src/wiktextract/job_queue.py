@@ -0,0 +1,277 @@
+# Job queue in a sqlite file for running the second phase with any number of
+# independent "wiktwords --worker" processes.
+#
+# The coordinator publishes the page ids to process as jobs of a fixed
+# number of pages.  Workers claim jobs with a lease that they renew while
+# processing; a job whose lease has expired (e.g. because its worker was
+# killed) is claimed again by some other worker.  Leases are renewed by a
+# thread, so that pages that take longer than the lease don't lose it.  A
+# worker writes the output of a job to a file of its own, whose name is
+# saved in the queue in the same transaction that marks the job done,
+# together with the emitted keys and error messages of the job.  The
+# coordinator thus only reads complete outputs of the workers that still
+# held the lease, and a worker that lost its lease never touches the output
+# of the worker that took over the job.
+#
+# The rollback journal is used instead of WAL because WAL does not work on
+# network filesystems.
+
+import json
+import sqlite3
+import threading
+import time
+from array import array
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+# Message lists of WiktionaryConfig saved with completed jobs
+MESSAGE_KINDS = ("errors", "warnings", "debugs")
+
+PENDING = 0
+LEASED = 1
+DONE = 2
+
+
+def job_output_dir(queue_path: Path) -> Path:
+    """Directory of the job output files, next to the queue file."""
+    return queue_path.with_name(queue_path.name + ".out")
+
+
+def job_output_path(queue_path: Path, job_id: int, owner: str) -> Path:
+    """Output file of the job ``job_id`` written by ``owner``."""
+    name = f"job-{job_id:06d}-{owner.replace(':', '-')}.jsonl"
+    return job_output_dir(queue_path) / name
+
+
+class JobQueue:
+    """Connection to the job queue in the sqlite file ``db_path``."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        # Transactions are started explicitly with BEGIN IMMEDIATE so that
+        # claiming a job can't race with another process
+        self.conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY,
+            page_ids BLOB,  -- array("q") of page ids
+            state INTEGER DEFAULT 0,  -- PENDING, LEASED, DONE
+            owner TEXT,
+            lease_until REAL,
+            attempts INTEGER DEFAULT 0,
+            output TEXT  -- output file name in job_output_dir()
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs(state, lease_until);
+
+            CREATE TABLE IF NOT EXISTS emitted (
+            word TEXT,
+            lang_code TEXT,
+            pos TEXT,
+            PRIMARY KEY(word, lang_code, pos)
+            ) WITHOUT ROWID;
+
+            CREATE TABLE IF NOT EXISTS messages (
+            job_id INTEGER,
+            kind TEXT,  -- errors, warnings, debugs
+            data TEXT  -- JSON
+            );
+
+            CREATE TABLE IF NOT EXISTS state (
+            key TEXT PRIMARY KEY,
+            value
+            );
+            """
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def is_published(self) -> bool:
+        for _ in self.conn.execute(
+            "SELECT value FROM state WHERE key = 'published'"
+        ):
+            return True
+        return False
+
+    def publish(self, jobs: Iterable[array]) -> int:
+        """Adds the jobs, each an array of page ids, and marks the queue as
+        published.  Returns the number of jobs."""
+        num_jobs = 0
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for page_ids in jobs:
+                self.conn.execute(
+                    "INSERT INTO jobs (page_ids) VALUES(?)",
+                    (page_ids.tobytes(),),
+                )
+                num_jobs += 1
+            self.conn.execute(
+                "INSERT INTO state (key, value) VALUES('published', ?)",
+                (time.time(),),
+            )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return num_jobs
+
+    def claim(
+        self, owner: str, lease_seconds: float
+    ) -> tuple[int, array] | None:
+        """Leases a pending job, or a job whose lease has expired, to
+        ``owner``.  Returns (job id, page ids) or None if there is no such
+        job."""
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            job = None
+            for job_id, page_ids_blob in self.conn.execute(
+                "SELECT id, page_ids FROM jobs WHERE state = ? "
+                "OR (state = ? AND lease_until < ?) ORDER BY id LIMIT 1",
+                (PENDING, LEASED, now),
+            ):
+                page_ids = array("q")
+                page_ids.frombytes(page_ids_blob)
+                job = job_id, page_ids
+            if job is not None:
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, owner = ?, lease_until = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (LEASED, owner, now + lease_seconds, job[0]),
+                )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return job
+
+    def renew(self, job_id: int, owner: str, lease_seconds: float) -> bool:
+        """Extends the lease of a job.  Returns False if ``owner`` no longer
+        holds the lease."""
+        cur = self.conn.execute(
+            "UPDATE jobs SET lease_until = ? "
+            "WHERE id = ? AND state = ? AND owner = ?",
+            (time.time() + lease_seconds, job_id, LEASED, owner),
+        )
+        return cur.rowcount == 1
+
+    def complete(
+        self,
+        job_id: int,
+        owner: str,
+        emitted: Iterable[tuple[str, str, str]],
+        messages: dict[str, list],
+        output: str | None = None,
+    ) -> bool:
+        """Marks a job done and saves its emitted keys, messages and the
+        name of its ``output`` file.  Returns False if ``owner`` no longer
+        holds the lease, in which case nothing is saved."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            cur = self.conn.execute(
+                "UPDATE jobs SET state = ?, lease_until = NULL, output = ? "
+                "WHERE id = ? AND state = ? AND owner = ?",
+                (DONE, output, job_id, LEASED, owner),
+            )
+            if cur.rowcount != 1:
+                self.conn.execute("ROLLBACK")
+                return False
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO emitted (word, lang_code, pos) "
+                "VALUES(?, ?, ?)",
+                emitted,
+            )
+            for kind in MESSAGE_KINDS:
+                self.conn.executemany(
+                    "INSERT INTO messages (job_id, kind, data) VALUES(?, ?, ?)",
+                    (
+                        (job_id, kind, json.dumps(msg, ensure_ascii=False))
+                        for msg in messages.get(kind, [])
+                    ),
+                )
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return True
+
+    def job_counts(self) -> tuple[int, int, int]:
+        """Returns the numbers of pending, leased and done jobs."""
+        counts = [0, 0, 0]
+        for state, count in self.conn.execute(
+            "SELECT state, count(*) FROM jobs GROUP BY state"
+        ):
+            counts[state] = count
+        return counts[PENDING], counts[LEASED], counts[DONE]
+
+    def all_done(self) -> bool:
+        pending, leased, _ = self.job_counts()
+        return self.is_published() and pending == 0 and leased == 0
+
+    def done_job_ids(self) -> list[int]:
+        return [
+            job_id
+            for (job_id,) in self.conn.execute(
+                "SELECT id FROM jobs WHERE state = ? ORDER BY id", (DONE,)
+            )
+        ]
+
+    def done_job_outputs(self) -> list[str]:
+        """Returns the output file names of the done jobs."""
+        return [
+            output
+            for (output,) in self.conn.execute(
+                "SELECT output FROM jobs "
+                "WHERE state = ? AND output IS NOT NULL ORDER BY id",
+                (DONE,),
+            )
+        ]
+
+    def emitted_keys(self) -> Iterator[tuple[str, str, str]]:
+        return self.conn.execute("SELECT word, lang_code, pos FROM emitted")
+
+    def messages(self, kind: str) -> Iterator[dict]:
+        for (data,) in self.conn.execute(
+            "SELECT data FROM messages WHERE kind = ? ORDER BY job_id, rowid",
+            (kind,),
+        ):
+            yield json.loads(data)
+
+
+class LeaseRenewer:
+    """Renews the lease of a job every third of ``lease_seconds`` in a
+    thread, with its own connection to the queue, until ``stop()`` is
+    called or the lease is lost."""
+
+    def __init__(
+        self, db_path: Path, job_id: int, owner: str, lease_seconds: float
+    ):
+        self.db_path = db_path
+        self.job_id = job_id
+        self.owner = owner
+        self.lease_seconds = lease_seconds
+        self.have_lease = True
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(
+            target=self.renew, name="wiktextract-lease", daemon=True
+        )
+
+    def start(self) -> None:
+        self.thread.start()
+
+    def renew(self) -> None:
+        queue = JobQueue(self.db_path)
+        try:
+            while not self.stop_event.wait(self.lease_seconds / 3):
+                if not queue.renew(self.job_id, self.owner, self.lease_seconds):
+                    self.have_lease = False
+                    break
+        finally:
+            queue.close()
+
+    def stop(self) -> bool:
+        """Stops renewing the lease.  Returns False if it has been lost."""
+        self.stop_event.set()
+        self.thread.join()
+        return self.have_lease
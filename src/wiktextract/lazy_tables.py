@@ -0,0 +1,75 @@
+# Large data tables that are loaded on first access.
+#
+# Some tables of the English extractor are big Python modules that take a
+# noticeable time to import, and the English vocabulary also loads the NLTK
+# Brown corpus.  Importing them with the extractor slowed down the start of
+# every process, also of single-page runs that never parse an inflection
+# table.  The extractor accesses them as attributes of ``en_tables``
+# instead, which imports the table's module on first access and then keeps
+# the table as its own attribute, so later accesses are ordinary attribute
+# lookups.
+
+import importlib
+from typing import Any
+
+# Lazily loaded tables of the English extractor, as name: (module, attribute)
+EN_TABLES = {
+    "infl_map": ("wiktextract.extractor.en.inflectiondata", "infl_map"),
+    "infl_start_map": (
+        "wiktextract.extractor.en.inflectiondata",
+        "infl_start_map",
+    ),
+    "infl_start_re": (
+        "wiktextract.extractor.en.inflectiondata",
+        "infl_start_re",
+    ),
+    "LANGUAGES_WITH_CELLS_AS_HEADERS": (
+        "wiktextract.extractor.en.table_headers_heuristics_data",
+        "LANGUAGES_WITH_CELLS_AS_HEADERS",
+    ),
+    "english_words": (
+        "wiktextract.extractor.en.english_words",
+        "english_words",
+    ),
+    "not_english_words": (
+        "wiktextract.extractor.en.english_words",
+        "not_english_words",
+    ),
+    "potentially_english_words": (
+        "wiktextract.extractor.en.english_words",
+        "potentially_english_words",
+    ),
+    "known_firsts": (
+        "wiktextract.extractor.en.form_descriptions_known_firsts",
+        "known_firsts",
+    ),
+    "known_species": ("wiktextract.extractor.en.taxondata", "known_species"),
+}
+
+
+class LazyTables:
+    """Tables that are imported from their modules on first access.
+    ``registry`` maps the name of each table to its module and attribute."""
+
+    def __init__(self, registry: dict[str, tuple[str, str]]):
+        self._registry = registry
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for tables that haven't been loaded yet
+        if name.startswith("_") or name not in self._registry:
+            raise AttributeError(name)
+        module_name, attr = self._registry[name]
+        value = getattr(importlib.import_module(module_name), attr)
+        setattr(self, name, value)
+        return value
+
+    def loaded(self) -> list[str]:
+        """Returns the names of the tables that have been loaded."""
+        return [name for name in self._registry if name in self.__dict__]
+
+    def load_all(self) -> None:
+        for name in self._registry:
+            getattr(self, name)
+
+
+en_tables = LazyTables(EN_TABLES)
@@ -0,0 +1,92 @@
+# Memory profiling of worker processes (wiktwords --memory-profile).
+#
+# Every N pages, each worker process takes a tracemalloc snapshot, compares
+# it with its previous snapshot and appends the allocation sites (file:line)
+# that grew the most, its RSS and the sizes of the larger lru_caches of the
+# extractors to its own report file memory-<pid>.jsonl.  The reports are
+# written as the run goes, so they are also kept for workers that are
+# killed.  tracemalloc slows down the workers considerably, so this is
+# meant for finding out why workers grow, not for production runs.
+
+import json
+import os
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any
+
+from .cache_stats import registered_caches
+from .worker_pool import current_rss
+
+# Allocations of tracemalloc itself and of the import system are left out
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+def cache_sizes() -> dict[str, int]:
+    """Returns the number of entries in each of the registered caches whose
+    module has been imported."""
+    return {
+        name: func.cache_info().currsize
+        for name, func in registered_caches().items()
+    }
+
+
+class MemoryProfiler:
+    """Takes a tracemalloc snapshot every ``every_pages`` pages and appends
+    the ``top`` allocation sites that grew the most since the previous
+    snapshot to a report in ``report_dir``."""
+
+    def __init__(self, report_dir: Path, every_pages: int, top: int = 20):
+        self.report_path = report_dir / f"memory-{os.getpid()}.jsonl"
+        self.every_pages = every_pages
+        self.top = top
+        self.num_pages = 0
+        self.snapshot: tracemalloc.Snapshot | None = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def end_page(self) -> None:
+        self.num_pages += 1
+        if self.num_pages % self.every_pages == 0:
+            self.take_snapshot()
+
+    def take_snapshot(self) -> dict[str, Any]:
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        if self.snapshot is None:
+            stats = snapshot.statistics("lineno")
+        else:
+            stats = snapshot.compare_to(self.snapshot, "lineno")
+        self.snapshot = snapshot
+        # Largest growth first
+        stats.sort(
+            key=lambda stat: getattr(stat, "size_diff", stat.size),
+            reverse=True,
+        )
+        traced, peak = tracemalloc.get_traced_memory()
+        report = {
+            "time": time.time(),
+            "pages": self.num_pages,
+            "rss": current_rss(),
+            "traced": traced,
+            "traced_peak": peak,
+            "caches": cache_sizes(),
+            "top": [
+                {
+                    "site": "{}:{}".format(
+                        stat.traceback[0].filename, stat.traceback[0].lineno
+                    ),
+                    "size": stat.size,
+                    "size_diff": getattr(stat, "size_diff", stat.size),
+                    "count": stat.count,
+                }
+                for stat in stats[: self.top]
+            ],
+        }
+        with self.report_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(report) + "\n")
+        return report
@@ -0,0 +1,281 @@
+# Live metrics of the second phase for dashboards and alerting
+# (wiktwords --metrics-textfile and --metrics-port).
+#
+# The parent process counts pages, entries and messages as results arrive
+# and every ``interval`` seconds renders them in the Prometheus text format,
+# together with gauges read at that time (output size, worker RSS, busy
+# workers, buffered output, caches).  The text is written atomically to a
+# file for the node_exporter textfile collector and/or served on
+# http://127.0.0.1:PORT/metrics by a thread.  Rates are computed over the
+# last interval; Prometheus can also compute them from the counters.
+
+import os
+import stat
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TextIO
+
+from .cache_stats import CacheStats
+from .reorder_buffer import ReorderBuffer
+from .worker_pool import WorkerPool, process_rss
+from .wxr_logging import logger
+
+MESSAGE_KINDS = ("errors", "warnings", "debugs")
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    text = ""
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    server: MetricsServer
+
+    def do_GET(self) -> None:
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.text.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        # Scrapes are not logged
+        pass
+
+
+class ProgressMetrics:
+    """Metrics of the pages processed by the parent process, exported every
+    ``interval`` seconds to ``textfile_path`` and/or an HTTP server on
+    ``port``."""
+
+    def __init__(
+        self,
+        textfile_path: Path | None = None,
+        port: int | None = None,
+        interval: float = 15,
+        cache_stats: CacheStats | None = None,
+    ):
+        self.textfile_path = textfile_path
+        self.interval = interval
+        self.cache_stats = cache_stats
+        self.start_time = time.time()
+        self.pages_selected = 0
+        self.pages_processed = 0
+        self.entries = 0
+        self.lost_pages = 0
+        self.messages = dict.fromkeys(MESSAGE_KINDS, 0)
+        self.last_time = self.start_time
+        self.last_pages = 0
+        self.last_entries = 0
+        self.last_errors = 0
+        self.server: MetricsServer | None = None
+        if port is not None:
+            self.server = MetricsServer(("127.0.0.1", port), MetricsHandler)
+            threading.Thread(
+                target=self.server.serve_forever,
+                name="metrics-server",
+                daemon=True,
+            ).start()
+            logger.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+
+    def add_page(self, num_entries: int, wtp_stats: dict) -> None:
+        self.pages_processed += 1
+        self.entries += num_entries
+        for kind in MESSAGE_KINDS:
+            self.messages[kind] += len(wtp_stats.get(kind, ()))
+
+    def add_lost_page(self) -> None:
+        self.pages_processed += 1
+        self.lost_pages += 1
+        self.messages["errors"] += 1
+
+    def maybe_export(
+        self,
+        pool: WorkerPool | None = None,
+        out_f: TextIO | None = None,
+        reorder_buffer: ReorderBuffer | None = None,
+    ) -> None:
+        if time.time() - self.last_time >= self.interval:
+            self.export(pool, out_f, reorder_buffer)
+
+    def export(
+        self,
+        pool: WorkerPool | None = None,
+        out_f: TextIO | None = None,
+        reorder_buffer: ReorderBuffer | None = None,
+    ) -> None:
+        text = self.render(pool, out_f, reorder_buffer)
+        if self.textfile_path is not None:
+            # Renamed so that the collector never reads a partial file
+            tmp_path = self.textfile_path.with_name(
+                self.textfile_path.name + ".tmp"
+            )
+            tmp_path.write_text(text, encoding="utf-8")
+            tmp_path.replace(self.textfile_path)
+        if self.server is not None:
+            self.server.text = text
+
+    def render(
+        self,
+        pool: WorkerPool | None = None,
+        out_f: TextIO | None = None,
+        reorder_buffer: ReorderBuffer | None = None,
+    ) -> str:
+        now = time.time()
+        elapsed = max(now - self.last_time, 1e-9)
+        lines: list[str] = []
+
+        def metric(
+            name: str, kind: str, help: str, values: list[tuple[str, float]]
+        ) -> None:
+            lines.append(f"# HELP wiktextract_{name} {help}")
+            lines.append(f"# TYPE wiktextract_{name} {kind}")
+            for labels, value in values:
+                lines.append(f"wiktextract_{name}{labels} {value}")
+
+        metric(
+            "start_time_seconds",
+            "gauge",
+            "Start time of the second phase",
+            [("", self.start_time)],
+        )
+        metric(
+            "pages_selected",
+            "gauge",
+            "Pages to process",
+            [("", self.pages_selected)],
+        )
+        metric(
+            "pages_pending",
+            "gauge",
+            "Pages not processed yet",
+            [("", max(self.pages_selected - self.pages_processed, 0))],
+        )
+        metric(
+            "pages_processed_total",
+            "counter",
+            "Pages processed",
+            [("", self.pages_processed)],
+        )
+        metric(
+            "pages_per_second",
+            "gauge",
+            "Pages processed per second in the last interval",
+            [("", (self.pages_processed - self.last_pages) / elapsed)],
+        )
+        metric(
+            "entries_total",
+            "counter",
+            "Word entries extracted",
+            [("", self.entries)],
+        )
+        metric(
+            "entries_per_second",
+            "gauge",
+            "Word entries extracted per second in the last interval",
+            [("", (self.entries - self.last_entries) / elapsed)],
+        )
+        metric(
+            "messages_total",
+            "counter",
+            "Error, warning and debug messages",
+            [(f'{{kind="{kind}"}}', n) for kind, n in self.messages.items()],
+        )
+        metric(
+            "errors_per_second",
+            "gauge",
+            "Error messages per second in the last interval",
+            [("", (self.messages["errors"] - self.last_errors) / elapsed)],
+        )
+        metric(
+            "lost_pages_total",
+            "counter",
+            "Pages whose worker process died or was killed",
+            [("", self.lost_pages)],
+        )
+        if out_f is not None:
+            try:
+                st = os.fstat(out_f.fileno())
+                size = st.st_size if stat.S_ISREG(st.st_mode) else None
+            except (AttributeError, OSError, ValueError):
+                # Compressed output has no file descriptor
+                size = None
+            if size is not None:
+                metric(
+                    "output_bytes",
+                    "gauge",
+                    "Size of the output file",
+                    [("", size)],
+                )
+        if pool is not None:
+            metric(
+                "busy_workers",
+                "gauge",
+                "Worker processes running a task",
+                [("", sum(w.busy for w in pool.workers))],
+            )
+            metric(
+                "resubmitted_tasks",
+                "gauge",
+                "Tasks waiting to be given to a worker again",
+                [("", len(pool.resubmitted))],
+            )
+            metric(
+                "recycled_workers_total",
+                "counter",
+                "Worker processes replaced because of their limits",
+                [("", pool.num_recycled)],
+            )
+            rss_values = []
+            for worker in pool.workers:
+                pid = worker.process.pid
+                rss = process_rss(pid) if pid is not None else None
+                if rss is not None:
+                    rss_values.append((f'{{pid="{pid}"}}', rss))
+            if rss_values:
+                metric(
+                    "worker_rss_bytes",
+                    "gauge",
+                    "Resident set size of each worker process",
+                    rss_values,
+                )
+        if reorder_buffer is not None:
+            metric(
+                "reorder_buffer_bytes",
+                "gauge",
+                "UTF-8 bytes of output waiting for earlier pages",
+                [("", reorder_buffer.size)],
+            )
+        if self.cache_stats is not None:
+            totals = sorted(self.cache_stats.totals().items())
+            for name, kind, help in (
+                ("hits", "counter", "Cache hits in all workers"),
+                ("misses", "counter", "Cache misses in all workers"),
+                ("evictions", "counter", "Cache evictions in all workers"),
+                ("hit_rate", "gauge", "Cache hit rate"),
+                ("entries", "gauge", "Cache entries in all workers"),
+            ):
+                metric(
+                    f"cache_{name}" + ("_total" if kind == "counter" else ""),
+                    kind,
+                    help,
+                    [(f'{{cache="{cache}"}}', t[name]) for cache, t in totals],
+                )
+        self.last_time = now
+        self.last_pages = self.pages_processed
+        self.last_entries = self.entries
+        self.last_errors = self.messages["errors"]
+        return "\n".join(lines) + "\n"
+
+    def close(self, out_f: TextIO | None = None) -> None:
+        """Exports the final values and stops the HTTP server."""
+        self.export(None, out_f)
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
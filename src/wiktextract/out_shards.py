@@ -0,0 +1,46 @@
+# Per-worker output files ("output shards").  With --out-shards, every worker
+# process checks and serializes the data it extracts and writes it to its own
+# JSONL file, so the parent process does not have to receive, check and
+# write every entry.
+import os
+import shutil
+from pathlib import Path
+from typing import TextIO
+
+SHARD_PREFIX = "shard-"
+SHARD_SUFFIX = ".jsonl"
+
+
+def out_shard_path(out_dir: Path, name: str) -> Path:
+    return out_dir / f"{SHARD_PREFIX}{name}{SHARD_SUFFIX}"
+
+
+def out_shard_paths(out_dir: Path) -> list[Path]:
+    return sorted(out_dir.glob(f"{SHARD_PREFIX}*{SHARD_SUFFIX}"))
+
+
+def open_out_shard(out_dir: Path, name: str | None = None) -> TextIO:
+    """Opens a new output shard in ``out_dir``.  By default, the file is
+    named after the id of the current process."""
+    if name is None:
+        name = str(os.getpid())
+    return open(
+        out_shard_path(out_dir, name),
+        "w",
+        buffering=1024 * 1024,
+        encoding="utf-8",
+    )
+
+
+def remove_out_shards(out_dir: Path) -> None:
+    """Creates ``out_dir`` if needed and removes shards left there by an
+    earlier run."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for path in out_shard_paths(out_dir):
+        path.unlink()
+
+
+def concatenate_out_shards(out_dir: Path, out_f: TextIO) -> None:
+    for path in out_shard_paths(out_dir):
+        with path.open(encoding="utf-8") as f:
+            shutil.copyfileobj(f, out_f, 1024 * 1024)
@@ -0,0 +1,241 @@
+# Bundles of pathological pages (wiktwords --bundle-dir, --replay).
+#
+# When a page takes longer than --bundle-seconds, raises an exception or
+# kills its worker process, a bundle is written that contains everything
+# needed for re-running it without the database: the page itself, the
+# Template and Module pages it used and the extraction settings.
+# ``wiktwords --replay BUNDLE`` loads these pages into an empty database and
+# parses the page again, and --profile profiles it.
+#
+# The pages used by a page are the pages read through ``Wtp.get_page()``
+# while the page was parsed, and the templates and modules that the page,
+# and recursively these pages, refer to in their text.  The second part
+# also covers pages that were read from wikitextprocessor's own caches, and
+# it is all that is available for pages whose worker process was killed.
+
+import hashlib
+import inspect
+import json
+import re
+from pathlib import Path
+from typing import Any, Optional
+
+from wikitextprocessor import Page, Wtp
+
+from .config import WiktionaryConfig
+from .wxr_context import WiktextractContext
+from .wxr_logging import logger
+
+BUNDLE_VERSION = 1
+
+# {{name|...}} and {{#invoke:module|...}} in wikitext
+TEMPLATE_RE = re.compile(r"\{\{\s*([^{}|<>\[\]\n]+?)\s*(?=[|}])")
+INVOKE_RE = re.compile(r"\{\{\s*#invoke:\s*([^{}|\n]+?)\s*[|}]")
+# require("Module:x"), mw.loadData("Module:x") and
+# frame:expandTemplate{title = "x"} in Lua code
+LUA_MODULE_RE = re.compile(
+    r"""(?:require|mw\.loadData|mw\.loadJsonData)\s*\(?\s*"""
+    r"""(?:"([^"\n]+)"|'([^'\n]+)')"""
+)
+LUA_TEMPLATE_RE = re.compile(
+    r"""expandTemplate\s*\{\s*title\s*=\s*(?:"([^"\n]+)"|'([^'\n]+)')"""
+)
+# Bounds the closure of pages that refer to many other pages
+MAX_BUNDLE_PAGES = 5000
+
+
+def page_to_dict(page: Page) -> dict[str, Any]:
+    return {
+        "title": page.title,
+        "namespace_id": page.namespace_id,
+        "body": page.body,
+        "redirect_to": page.redirect_to,
+        "model": page.model,
+        "need_pre_expand": page.need_pre_expand,
+    }
+
+
+def config_to_dict(config: WiktionaryConfig) -> dict[str, Any]:
+    """Returns the settings that WiktionaryConfig is created with."""
+    settings = {}
+    for name in inspect.signature(WiktionaryConfig).parameters:
+        value = getattr(config, name)
+        if isinstance(value, (set, frozenset, tuple)):
+            value = sorted(value)
+        settings[name] = value
+    return settings
+
+
+def ns_title(wtp: Wtp, ns_name: str, name: str) -> str:
+    """Returns the title of page ``name`` in namespace ``ns_name``, which
+    may already have the namespace prefix."""
+    ns = wtp.NAMESPACE_DATA.get(ns_name, {})
+    local_name = ns.get("name", ns_name)
+    for prefix in (local_name, ns_name, *ns.get("aliases", ())):
+        if name.lower().startswith(prefix.lower() + ":"):
+            return local_name + name[len(prefix) :]
+    return f"{local_name}:{name}"
+
+
+def referenced_titles(wtp: Wtp, page: Page) -> list[tuple[int, str]]:
+    """Returns the pages that the text of ``page`` refers to, as
+    (namespace id, title) pairs."""
+    template_ns_id = wtp.NAMESPACE_DATA["Template"]["id"]
+    module_ns_id = wtp.NAMESPACE_DATA["Module"]["id"]
+    body = page.body or ""
+    refs = []
+    if page.redirect_to is not None:
+        refs.append((page.namespace_id, page.redirect_to))
+    if page.model == "Scribunto":
+        for m in LUA_MODULE_RE.finditer(body):
+            name = m.group(1) or m.group(2)
+            # Lua's own modules like "string" have no namespace prefix
+            if ":" in name:
+                refs.append((module_ns_id, ns_title(wtp, "Module", name)))
+        for m in LUA_TEMPLATE_RE.finditer(body):
+            name = m.group(1) or m.group(2)
+            refs.append((template_ns_id, ns_title(wtp, "Template", name)))
+        return refs
+    for m in INVOKE_RE.finditer(body):
+        refs.append((module_ns_id, ns_title(wtp, "Module", m.group(1))))
+    for m in TEMPLATE_RE.finditer(body):
+        name = m.group(1)
+        if name.startswith("#"):
+            # Parser functions
+            continue
+        if name.startswith(":"):
+            # Transcluded page of the main namespace
+            refs.append((0, name[1:]))
+            continue
+        prefix, colon, rest = name.partition(":")
+        if colon and prefix.strip().lower() in ("subst", "safesubst"):
+            name = rest.strip()
+        # Magic words like {{lc:...}} aren't found, which is harmless
+        refs.append((template_ns_id, ns_title(wtp, "Template", name)))
+    return refs
+
+
+def collect_pages(
+    wtp: Wtp, page: Page, used_pages: Optional[dict[str, Page]] = None
+) -> dict[str, Page]:
+    """Returns the pages used by ``page``: ``used_pages`` and the pages
+    that ``page`` and these pages refer to, recursively."""
+    pages = dict(used_pages or {})
+    pages.pop(page.title, None)
+    todo = [page, *pages.values()]
+    seen = {page.title, *pages}
+    while todo and len(pages) < MAX_BUNDLE_PAGES:
+        for ns_id, title in referenced_titles(wtp, todo.pop()):
+            if title in seen:
+                continue
+            seen.add(title)
+            ref_page = wtp.get_page(title, ns_id, no_redirect=True)
+            if ref_page is not None:
+                pages[ref_page.title] = ref_page
+                todo.append(ref_page)
+    return pages
+
+
+def bundle_path(bundle_dir: Path, title: str) -> Path:
+    digest = hashlib.sha1(title.encode("utf-8")).hexdigest()[:8]
+    name = re.sub(r"[^\w-]+", "_", title).strip("_")[:50]
+    return bundle_dir / f"{name}-{digest}.json"
+
+
+def save_bundle(
+    wxr: WiktextractContext,
+    page: Page,
+    reason: str,
+    used_pages: Optional[dict[str, Page]] = None,
+    seconds: Optional[float] = None,
+    error: Optional[str] = None,
+) -> Optional[Path]:
+    """Writes the bundle of ``page`` in ``wxr.config.bundle_dir`` and
+    returns its path.  ``reason`` is "slow", "exception" or "lost".
+    Errors are logged and None is returned, so that a bundle that can't be
+    saved doesn't stop the worker process."""
+    path = bundle_path(wxr.config.bundle_dir, page.title)  # type: ignore[arg-type]
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        pages = collect_pages(wxr.wtp, page, used_pages)
+        bundle = {
+            "version": BUNDLE_VERSION,
+            "reason": reason,
+            "seconds": seconds,
+            "error": error,
+            "config": config_to_dict(wxr.config),
+            "page": page_to_dict(page),
+            "pages": [page_to_dict(p) for _, p in sorted(pages.items())],
+        }
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(bundle, f, ensure_ascii=False)
+        tmp_path.replace(path)
+    except Exception as e:
+        logger.error(f"Can't save bundle of page {page.title!r}: {e!r}")
+        tmp_path.unlink(missing_ok=True)
+        return None
+    logger.warning(
+        f'Saved bundle of page "{page.title}" ({reason}, {len(pages)} '
+        f"used pages) in {path}"
+    )
+    return path
+
+
+def read_bundle(path: Path) -> dict[str, Any]:
+    with path.open(encoding="utf-8") as f:
+        bundle = json.load(f)
+    if bundle.get("version") != BUNDLE_VERSION:
+        raise ValueError(
+            f"{path}: unsupported bundle version {bundle.get('version')}"
+        )
+    return bundle
+
+
+def apply_bundle_config(wxr: WiktextractContext, bundle: dict) -> None:
+    """Sets the extraction settings of ``wxr`` to those of the bundle."""
+    for name, value in bundle["config"].items():
+        if name == "capture_language_codes" and value is not None:
+            value = set(value)
+        setattr(wxr.config, name, value)
+
+
+def load_bundle_pages(wtp: Wtp, bundle: dict) -> None:
+    """Adds the page of the bundle and the pages it uses to the database."""
+    for data in (bundle["page"], *bundle["pages"]):
+        wtp.add_page(
+            data["title"],
+            data["namespace_id"],
+            data["body"],
+            redirect_to=data["redirect_to"],
+            need_pre_expand=data["need_pre_expand"],
+            model=data["model"],
+        )
+    wtp.db_conn.commit()
+
+
+class PageRecorder:
+    """Records the pages that ``Wtp.get_page()`` returns in a worker
+    process while a page is parsed."""
+
+    __slots__ = ("pages",)
+
+    def __init__(self, wtp: Wtp):
+        self.pages: dict[str, Page] = {}
+        get_page = wtp.get_page
+
+        def recording_get_page(*args, **kwargs):
+            page = get_page(*args, **kwargs)
+            if page is not None:
+                self.pages[page.title] = page
+            return page
+
+        try:
+            wtp.get_page = recording_get_page  # type: ignore[method-assign]
+        except AttributeError:
+            logger.warning(
+                "Used pages can't be recorded, bundles only include the "
+                "pages referred to in the text of their pages"
+            )
+
+    def start_page(self) -> None:
+        self.pages.clear()
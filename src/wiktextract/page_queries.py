@@ -0,0 +1,117 @@
+# Queries on the page table of the wikitextprocessor database that are not
+# provided by Wtp.  Pages are identified by their sqlite rowid ("page id").
+import sqlite3
+from array import array
+from collections.abc import Iterator, Sequence
+
+from wikitextprocessor import Page
+
+# Number of pages fetched with one query
+FETCH_BATCH_SIZE = 500
+
+
+def page_where_clause(
+    namespace_ids: list[int] | None = None,
+    include_redirects: bool = True,
+    model: str | None = None,
+    search_pattern: str | None = None,
+) -> tuple[str, list]:
+    """Returns a WHERE clause and its parameters selecting the same pages
+    as ``Wtp.get_all_pages()`` with these arguments."""
+    conditions = []
+    values: list = []
+    if namespace_ids is not None:
+        conditions.append(
+            "namespace_id IN ({})".format(", ".join("?" * len(namespace_ids)))
+        )
+        values.extend(namespace_ids)
+    if not include_redirects:
+        conditions.append("redirect_to IS NULL")
+    if model is not None:
+        conditions.append("model = ?")
+        values.append(model)
+    if search_pattern is not None:
+        conditions.append("body LIKE ?")
+        values.append(search_pattern)
+    if len(conditions) == 0:
+        return "", values
+    return " WHERE " + " AND ".join(conditions), values
+
+
+def body_size_expression() -> str:
+    # octet_length() (sqlite 3.43+) gets the size from the record header
+    # without reading the page body
+    if sqlite3.sqlite_version_info >= (3, 43, 0):
+        return "IFNULL(octet_length(body), 0)"
+    return "IFNULL(length(body), 0)"
+
+
+def select_page_sizes(
+    db_conn: sqlite3.Connection,
+    namespace_ids: list[int] | None = None,
+    include_redirects: bool = True,
+    model: str | None = None,
+    search_pattern: str | None = None,
+    largest_first: bool = False,
+) -> tuple[array, array]:
+    """Returns the ids and body sizes of the selected pages sorted by title
+    or by size, largest first.  Arrays are used because there may be
+    millions of pages."""
+    where_str, values = page_where_clause(
+        namespace_ids, include_redirects, model, search_pattern
+    )
+    query_str = (
+        f"SELECT rowid, {body_size_expression()} AS size FROM pages" + where_str
+    )
+    if largest_first:
+        query_str += " ORDER BY size DESC, title ASC"
+    else:
+        query_str += " ORDER BY title ASC"
+    page_ids = array("q")
+    sizes = array("q")
+    for page_id, size in db_conn.execute(query_str, values):
+        page_ids.append(page_id)
+        sizes.append(size)
+    return page_ids, sizes
+
+
+def load_pages(
+    db_conn: sqlite3.Connection, page_ids: list[int]
+) -> dict[int, Page]:
+    """Returns the pages with the given ids (at most a few hundred)."""
+    pages = {}
+    for row in db_conn.execute(
+        "SELECT rowid, title, namespace_id, redirect_to, "
+        "need_pre_expand, body, model FROM pages "
+        "WHERE rowid IN ({})".format(", ".join("?" * len(page_ids))),
+        page_ids,
+    ):
+        pages[row[0]] = Page(
+            title=row[1],
+            namespace_id=row[2],
+            redirect_to=row[3],
+            need_pre_expand=row[4],
+            body=row[5],
+            model=row[6],
+        )
+    return pages
+
+
+def get_pages_by_ids(
+    db_conn: sqlite3.Connection, page_ids: Sequence[int]
+) -> Iterator[Page]:
+    """Yields the pages with the given ids in the given order."""
+    for start in range(0, len(page_ids), FETCH_BATCH_SIZE):
+        batch_ids = list(page_ids[start : start + FETCH_BATCH_SIZE])
+        pages = load_pages(db_conn, batch_ids)
+        for page_id in batch_ids:
+            if page_id in pages:
+                yield pages[page_id]
+
+
+def get_page_title(db_conn: sqlite3.Connection, page_id: int) -> str:
+    for (title,) in db_conn.execute(
+        "SELECT title FROM pages WHERE rowid = ?", (page_id,)
+    ):
+        return title
+    return f"<page {page_id}>"
@@ -0,0 +1,187 @@
+# Timing of the processing of each page (wiktwords --timing-stats).
+#
+# Worker processes measure the total time of each page, the time spent in
+# sections of the page (see ``time_section()``) and the time spent running
+# Lua modules.  The timings are returned to the parent process with the
+# page's error messages and saved in a sqlite file, from which a report of
+# the slowest pages and sections is logged at the end of the run.
+#
+# Section and Lua times are inclusive: Lua time is also counted in the
+# section that expanded the template, and the time of Lua code includes
+# the templates it expands.
+
+import sqlite3
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, ContextManager
+
+from .wxr_logging import logger
+
+NULL_CONTEXT = nullcontext()
+
+
+class PageTimer:
+    """Times of the page being processed in a worker process."""
+
+    __slots__ = ("sections", "lua_seconds", "lua_depth")
+
+    def __init__(self) -> None:
+        self.sections: dict[str, float] = {}
+        self.lua_seconds = 0.0
+        self.lua_depth = 0
+
+    def start_page(self) -> None:
+        self.sections = {}
+        self.lua_seconds = 0.0
+        self.lua_depth = 0
+
+    def add(self, kind: str, seconds: float) -> None:
+        self.sections[kind] = self.sections.get(kind, 0.0) + seconds
+
+    def result(self, title: str, total_seconds: float) -> dict[str, Any]:
+        return {
+            "title": title,
+            "total": total_seconds,
+            "lua": self.lua_seconds,
+            "sections": self.sections,
+        }
+
+
+class SectionTimer:
+    __slots__ = ("timer", "kind", "start")
+
+    def __init__(self, timer: PageTimer, kind: str):
+        self.timer = timer
+        self.kind = kind
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, exc_type, exc_value, tb) -> None:
+        self.timer.add(self.kind, time.perf_counter() - self.start)
+
+
+def time_section(wxr, kind: str) -> ContextManager:
+    """Returns a context manager that adds the time spent in it to section
+    ``kind`` of the current page, or does nothing if timing is off."""
+    timer = wxr.page_timer
+    if timer is None:
+        return NULL_CONTEXT
+    return SectionTimer(timer, kind)
+
+
+def install_lua_timer(timer: PageTimer) -> bool:
+    """Wraps the function that wikitextprocessor uses for calling Lua
+    modules so that the time spent in it is added to ``timer``.  Returns
+    False if the function is not found in this wikitextprocessor
+    version."""
+    import wikitextprocessor.core
+
+    call_lua_sandbox = getattr(wikitextprocessor.core, "call_lua_sandbox", None)
+    if call_lua_sandbox is None:
+        return False
+    if getattr(call_lua_sandbox, "page_timer", None) is not None:
+        call_lua_sandbox.page_timer = timer
+        return True
+
+    def timed_call_lua_sandbox(*args, **kwargs):
+        timer = timed_call_lua_sandbox.page_timer
+        # Lua modules can expand templates that call Lua again; only the
+        # outermost call is timed
+        timer.lua_depth += 1
+        start = time.perf_counter()
+        try:
+            return call_lua_sandbox(*args, **kwargs)
+        finally:
+            timer.lua_depth -= 1
+            if timer.lua_depth == 0:
+                timer.lua_seconds += time.perf_counter() - start
+
+    timed_call_lua_sandbox.page_timer = timer  # type: ignore[attr-defined]
+    wikitextprocessor.core.call_lua_sandbox = timed_call_lua_sandbox
+    return True
+
+
+class PageTimingLog:
+    """Page timings saved by the parent process in a sqlite file."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.unlink(missing_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript(
+            """
+            CREATE TABLE pages (
+            id INTEGER PRIMARY KEY,
+            title TEXT,
+            total REAL,
+            lua REAL
+            );
+
+            CREATE TABLE sections (
+            page_id INTEGER,
+            kind TEXT,  -- e.g. pos, translations, wtp.parse
+            seconds REAL,
+            FOREIGN KEY(page_id) REFERENCES pages(id)
+            );
+            """
+        )
+        self.pending = 0
+
+    def add(self, timing: dict[str, Any]) -> None:
+        cur = self.conn.execute(
+            "INSERT INTO pages (title, total, lua) VALUES(?, ?, ?)",
+            (timing["title"], timing["total"], timing["lua"]),
+        )
+        self.conn.executemany(
+            "INSERT INTO sections (page_id, kind, seconds) VALUES(?, ?, ?)",
+            (
+                (cur.lastrowid, kind, seconds)
+                for kind, seconds in timing["sections"].items()
+            ),
+        )
+        self.pending += 1
+        if self.pending >= 10000:
+            self.conn.commit()
+            self.pending = 0
+
+    def log_report(self, limit: int = 20) -> None:
+        """Logs where the time went and the slowest pages and sections."""
+        self.conn.commit()
+        for num_pages, total, lua in self.conn.execute(
+            "SELECT count(*), sum(total), sum(lua) FROM pages"
+        ):
+            if not num_pages:
+                return
+            logger.info(
+                f"Page timing ({self.db_path}): {num_pages} pages, "
+                f"{total:.0f}s in total, {lua:.0f}s in Lua"
+            )
+        logger.info("Time by section:")
+        for kind, seconds, count in self.conn.execute(
+            "SELECT kind, sum(seconds) AS s, count(*) FROM sections "
+            "GROUP BY kind ORDER BY s DESC"
+        ):
+            logger.info(
+                f"  {seconds:10.1f}s {seconds / total:6.1%} {count:9d}x  {kind}"
+            )
+        logger.info(f"Slowest {limit} pages:")
+        for title, page_total, lua in self.conn.execute(
+            "SELECT title, total, lua FROM pages ORDER BY total DESC LIMIT ?",
+            (limit,),
+        ):
+            logger.info(f"  {page_total:8.1f}s (Lua {lua:.1f}s)  {title}")
+        logger.info(f"Slowest {limit} sections:")
+        for title, kind, seconds in self.conn.execute(
+            "SELECT title, kind, seconds FROM sections "
+            "JOIN pages ON page_id = pages.id "
+            "ORDER BY seconds DESC LIMIT ?",
+            (limit,),
+        ):
+            logger.info(f"  {seconds:8.1f}s  {kind:14}  {title}")
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,213 @@
+# Warm-up of the main process before the worker processes are started.
+#
+# Every worker process of the second phase needs the extractor of the
+# edition with its large module-level tables, the valid_sequences tree and
+# the compiled regexes.  When each worker imports and builds these itself,
+# each has its own copy of them.  Instead, the main process loads them all
+# before the worker pool is started and the workers are forked, so that
+# they share these memory pages with the main process until one of them
+# writes to a page.  Reading an object writes its reference count, though,
+# and the garbage collector writes to every object it examines, so the
+# pages would be copied little by little anyway.  As documented for
+# gc.freeze(), the collector is disabled while the extractor is loaded, so
+# that freed objects don't leave holes in the pages, and the objects are
+# then moved to a permanent generation that the collector ignores.  The
+# collector is enabled again in the workers and, once they have been
+# started, in the main process.
+#
+# The workers are forked before the main process starts any thread: the
+# watchdog, the metrics server and the compression of the output are
+# started after the worker pool.  Workers that replace recycled or killed
+# workers during the run are not forked from the main process, which then
+# has these threads (see worker_pool.py), but started by a fork server that
+# has imported the extractor.  Objects with locks passed to them, like the
+# watchdog's table, are created from the fork server's context.
+#
+# To show what is gained, a process forked before the warm-up loads the
+# extractor itself like a worker without preloading, and one forked after
+# it uses the preloaded extractor; the shared and private memory of both
+# are logged.  The memory of each worker is also logged when the pool is
+# started and when it is done.
+
+import gc
+import importlib
+import multiprocessing
+import os
+import pkgutil
+import sys
+import time
+from multiprocessing.connection import Connection
+
+from .lazy_tables import en_tables
+from .validation import entry_check
+from .worker_pool import WorkerPool, current_rss, process_shared_memory
+from .wxr_context import WiktextractContext
+from .wxr_logging import logger
+
+
+def import_extractor_modules(lang_code: str) -> list[str]:
+    """Imports all modules of the edition's extractor and returns their
+    names."""
+    package = importlib.import_module(f"wiktextract.extractor.{lang_code}")
+    names = []
+    for module_info in pkgutil.iter_modules(package.__path__):
+        name = f"{package.__name__}.{module_info.name}"
+        importlib.import_module(name)
+        names.append(name)
+    return names
+
+
+def load_extractor(lang_code: str, validate: bool) -> list[str]:
+    """Imports the edition's extractor, loads its lazy tables and, with
+    ``validate``, compiles the schema of the extracted data.  Returns the
+    names of the extractor's modules."""
+    names = import_extractor_modules(lang_code)
+    if lang_code == "en":
+        from .extractor.en.form_descriptions import get_tokenizer
+
+        en_tables.load_all()
+        get_tokenizer()
+    if validate:
+        entry_check(lang_code)
+    return names
+
+
+def worker_start_methods() -> tuple[str | None, str | None]:
+    """Returns the start methods of the worker processes started with the
+    pool and of the ones that replace them, or None for the default.
+    Workers are forked if possible (not on macOS, where forking is not
+    safe) and replaced from a fork server."""
+    methods = multiprocessing.get_all_start_methods()
+    if sys.platform == "darwin" or "fork" not in methods:
+        return None, None
+    if "forkserver" in methods:
+        return "fork", "forkserver"
+    return "fork", "spawn"
+
+
+def freeze_objects() -> int:
+    """Moves all objects to the permanent generation of the garbage
+    collector and returns the number of frozen objects."""
+    gc.freeze()
+    return gc.get_freeze_count()
+
+
+def probe_main(conn: Connection, lang_code: str, validate: bool) -> None:
+    gc.enable()
+    load_extractor(lang_code, validate)
+    gc.collect()
+    conn.send(process_shared_memory(os.getpid()))
+    conn.close()
+
+
+class MemoryProbe:
+    """Process forked from the main process that loads the extractor like
+    a worker and reports its shared and private memory."""
+
+    def __init__(self, lang_code: str, validate: bool):
+        context = multiprocessing.get_context("fork")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(  # type: ignore[attr-defined]
+            target=probe_main,
+            args=(child_conn, lang_code, validate),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def result(self) -> tuple[int, int] | None:
+        """Waits for the probe and returns its shared and private memory in
+        bytes, or None if they are not known."""
+        try:
+            memory = self.conn.recv()
+        except EOFError:
+            memory = None
+        self.process.join()
+        self.conn.close()
+        return memory
+
+
+def log_probe(memory: tuple[int, int] | None, when: str) -> None:
+    if memory is None:
+        return
+    shared, private = memory
+    logger.info(
+        f"Worker memory {when}: {shared // 2**20} MiB shared, "
+        f"{private // 2**20} MiB private"
+    )
+
+
+def preload_extractor(wxr: WiktextractContext, probe: bool) -> list[str]:
+    """Loads the edition's extractor (see ``load_extractor()``) with the
+    garbage collector disabled and freezes the objects of the main process.
+    With ``probe``, the memory of a worker without and with preloading is
+    logged.  Returns the names of the extractor's modules."""
+    lang_code = wxr.wtp.lang_code
+    validate = wxr.config.validate_every > 0
+    before_probe = None
+    if probe:
+        # Loads the extractor at the same time as this process
+        before_probe = MemoryProbe(lang_code, validate)
+    gc.disable()
+    start = time.time()
+    rss = current_rss()
+    names = load_extractor(lang_code, validate)
+    num_frozen = freeze_objects()
+    logger.info(
+        f"Preloaded {len(names)} extractor modules in "
+        f"{time.time() - start:.1f}s, RSS grew by "
+        f"{(current_rss() - rss) // 2**20} MiB, froze {num_frozen} objects"
+    )
+    if before_probe is not None:
+        log_probe(before_probe.result(), "without preloading")
+        log_probe(MemoryProbe(lang_code, validate).result(), "with preloading")
+    return names
+
+
+def prepare_workers(
+    wxr: WiktextractContext,
+) -> tuple[str | None, str | None]:
+    """Preloads the extractor unless disabled in the configuration or the
+    workers can't be forked.  Returns the start methods for the worker
+    processes and for the ones that replace them (see ``WorkerPool``)."""
+    if not wxr.config.preload_extractor:
+        return None, None
+    start_method, replacement_start_method = worker_start_methods()
+    if start_method != "fork":
+        return None, None
+    probe = process_shared_memory(os.getpid()) is not None
+    names = preload_extractor(wxr, probe)
+    if replacement_start_method == "forkserver":
+        multiprocessing.get_context("forkserver").set_forkserver_preload(names)
+    return start_method, replacement_start_method
+
+
+def workers_started(pool: WorkerPool) -> None:
+    """Called in the main process when the workers of ``pool`` have been
+    started."""
+    gc.enable()
+    log_worker_memory(pool, "at start")
+
+
+def log_worker_memory(pool: WorkerPool, when: str) -> None:
+    """Logs the shared and private memory of each worker of ``pool``."""
+    total_shared = total_private = 0
+    for worker in pool.workers:
+        pid = worker.process.pid
+        if pid is None:
+            continue
+        memory = process_shared_memory(pid)
+        if memory is None:
+            # Not available on this platform
+            return
+        shared, private = memory
+        total_shared += shared
+        total_private += private
+        logger.info(
+            f"Worker process {pid} {when}: {shared // 2**20} MiB shared, "
+            f"{private // 2**20} MiB private"
+        )
+    logger.info(
+        f"Worker processes {when}: {total_shared // 2**20} MiB shared, "
+        f"{total_private // 2**20} MiB private in total"
+    )
@@ -0,0 +1,67 @@
+# Buffer for writing output produced out of order by worker processes in
+# a fixed order.
+from typing import TextIO
+
+from .wxr_logging import logger
+
+
+class ReorderBuffer:
+    """Writes text pieces to ``out_f`` in the order of their sequence
+    numbers (0, 1, 2, ...), keeping pieces that arrive early in memory.
+    ``is_full()`` returns True when the buffered text takes more than
+    ``max_size`` bytes in UTF-8; the caller should then stop producing new
+    pieces until the missing ones have arrived."""
+
+    __slots__ = (
+        "out_f",
+        "max_size",
+        "next_seq",
+        "pending",
+        "size",
+        "peak_size",
+        "full",
+        "full_count",
+    )
+
+    def __init__(self, out_f: TextIO | None, max_size: int):
+        self.out_f = out_f
+        self.max_size = max_size
+        self.next_seq = 0
+        # Buffered pieces and their sizes in bytes
+        self.pending: dict[int, tuple[str, int]] = {}
+        self.size = 0
+        # Statistics logged at the end of the run
+        self.peak_size = 0
+        self.full = False
+        self.full_count = 0
+
+    def add(self, seq: int, text: str) -> None:
+        if seq != self.next_seq:
+            size = len(text.encode("utf-8"))
+            self.pending[seq] = text, size
+            self.size += size
+            self.peak_size = max(self.peak_size, self.size)
+            return
+        self.write(text)
+        while self.next_seq in self.pending:
+            text, size = self.pending.pop(self.next_seq)
+            self.size -= size
+            self.write(text)
+
+    def write(self, text: str) -> None:
+        if self.out_f is not None and len(text) > 0:
+            self.out_f.write(text)
+        self.next_seq += 1
+
+    def is_full(self) -> bool:
+        full = self.size >= self.max_size
+        if full and not self.full:
+            self.full_count += 1
+        self.full = full
+        return full
+
+    def log_stats(self) -> None:
+        logger.info(
+            f"Reorder buffer: peak size {self.peak_size / 1024 / 1024:.1f} MB, "
+            f"filled up {self.full_count} times"
+        )
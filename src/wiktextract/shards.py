@@ -0,0 +1,226 @@
+# Splitting the second phase across several machines with "--shard i/N" and
+# merging the results.
+#
+# Every machine has a copy of the same page database and computes the same
+# assignment of pages to shards, so no coordination is needed.  Each shard
+# writes its output file and a manifest with the (word, lang_code, pos) keys
+# it emitted.  Words that only occur in the Thesaurus namespace are emitted
+# when merging, because that needs the emitted keys of all shards.
+
+import argparse
+import heapq
+import json
+import shutil
+import sys
+from array import array
+from pathlib import Path
+from typing import TextIO
+
+from wikitextprocessor import Wtp
+
+from .compressed_output import open_input, open_output
+from .config import WiktionaryConfig
+from .thesaurus import (
+    close_thesaurus_db,
+    emit_words_in_thesaurus,
+    thesaurus_linkage_number,
+)
+from .wxr_context import WiktextractContext
+from .wxr_logging import logger
+
+MANIFEST_SUFFIX = ".shard.json"
+
+# Cost of a page in bytes on top of its body size, so that redirects and
+# other empty pages are spread over the shards too
+PAGE_OVERHEAD = 1000
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parses "i/N" into (i, N), where 1 <= i <= N."""
+    shard_str, _, num_str = value.partition("/")
+    try:
+        shard = int(shard_str)
+        num_shards = int(num_str)
+    except ValueError:
+        raise ValueError(f"Invalid shard {value!r}, expected i/N")
+    if not 1 <= shard <= num_shards:
+        raise ValueError(f"Invalid shard {value!r}, i must be in 1..N")
+    return shard, num_shards
+
+
+def shard_page_ids(
+    page_ids: array, sizes: array, shard: int, num_shards: int
+) -> array:
+    """Returns the ids of the pages in ``shard`` (1-based).  ``page_ids``
+    and ``sizes`` must be sorted largest first.  Each page is given to the
+    shard with the smallest total size so far (the LPT heuristic), which is
+    deterministic and keeps the shards balanced even though a few pages
+    are much slower than the rest."""
+    heap = [(0, i) for i in range(1, num_shards + 1)]
+    selected = array("q")
+    for page_id, size in zip(page_ids, sizes):
+        total, i = heap[0]
+        if i == shard:
+            selected.append(page_id)
+        heapq.heapreplace(heap, (total + size + PAGE_OVERHEAD, i))
+    return selected
+
+
+def shard_manifest_path(out_path: str | Path) -> Path:
+    return Path(str(out_path) + MANIFEST_SUFFIX)
+
+
+def write_shard_manifest(
+    path: Path,
+    shard: tuple[int, int],
+    num_pages: int,
+    emitted: set[tuple[str, str, str]],
+) -> None:
+    with path.open("w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "shard": shard[0],
+                "num_shards": shard[1],
+                "num_pages": num_pages,
+                "emitted": sorted(emitted),
+            },
+            f,
+            ensure_ascii=False,
+        )
+
+
+def read_shard_manifest(path: Path) -> dict:
+    with path.open(encoding="utf-8") as f:
+        return json.load(f)
+
+
+def merge_shards(
+    wxr: WiktextractContext,
+    out_paths: list[Path],
+    out_f: TextIO,
+    human_readable: bool = False,
+) -> None:
+    """Concatenates the output files of all shards in shard order and
+    emits the words that only occur in the thesaurus."""
+    shards = []
+    for path in out_paths:
+        manifest = read_shard_manifest(shard_manifest_path(path))
+        shards.append((manifest["shard"], manifest, path))
+    shards.sort(key=lambda x: x[0])
+    num_shards = shards[0][1]["num_shards"]
+    if [x[0] for x in shards] != list(range(1, num_shards + 1)) or any(
+        x[1]["num_shards"] != num_shards for x in shards
+    ):
+        raise ValueError(
+            "Expected the output of shards 1 to {}, got {}".format(
+                num_shards,
+                ", ".join(f"{x[0]}/{x[1]['num_shards']}" for x in shards),
+            )
+        )
+    emitted: set[tuple[str, str, str]] = set()
+    for shard, manifest, path in shards:
+        logger.info(
+            f"Merging shard {shard}/{num_shards}: {path} "
+            f"({manifest['num_pages']} pages)"
+        )
+        with open_input(path) as f:
+            shutil.copyfileobj(f, out_f, 1024 * 1024)
+        emitted.update(tuple(key) for key in manifest["emitted"])
+    if wxr.config.dump_file_lang_code == "en":
+        if thesaurus_linkage_number(wxr.thesaurus_db_conn) == 0:  # type: ignore[arg-type]
+            logger.warning(
+                f"Thesaurus database {wxr.thesaurus_db_path} is empty"
+            )
+        emit_words_in_thesaurus(wxr, emitted, out_f, human_readable)
+
+
+def merge_error_files(paths: list[Path], out_path: Path) -> None:
+    """Merges the files written with ``wiktwords --errors``."""
+    merged: dict[str, list] = {"errors": [], "warnings": [], "debugs": []}
+    for path in paths:
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+        for kind, messages in merged.items():
+            messages.extend(data.get(kind, []))
+    with out_path.open("w", encoding="utf-8") as f:
+        json.dump(merged, f, sort_keys=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Merge the output of wiktwords runs with --shard i/N"
+    )
+    parser.add_argument(
+        "shard_out",
+        nargs="+",
+        help="Output files (--out) of all shards",
+    )
+    parser.add_argument(
+        "--db-path",
+        type=str,
+        required=True,
+        help="Page database used by the shards (its thesaurus database is "
+        "used for emitting words that only occur in the thesaurus)",
+    )
+    parser.add_argument(
+        "--dump-file-language-code",
+        type=str,
+        default="en",
+        help="Language code of the dump file",
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        required=True,
+        help="Merged output file, compressed if it ends with .gz, .bz2, "
+        ".xz or .zst",
+    )
+    parser.add_argument(
+        "--errors",
+        type=str,
+        default=None,
+        help="Merged error file, from the files given with --shard-errors",
+    )
+    parser.add_argument(
+        "--shard-errors",
+        type=str,
+        nargs="+",
+        default=[],
+        help="Error files (--errors) of the shards",
+    )
+    parser.add_argument(
+        "--human-readable",
+        action="store_true",
+        default=False,
+        help="Write thesaurus words in human-readable JSON",
+    )
+    args = parser.parse_args()
+
+    conf = WiktionaryConfig(dump_file_lang_code=args.dump_file_language_code)
+    wtp = Wtp(db_path=args.db_path, lang_code=args.dump_file_language_code)
+    wxr = WiktextractContext(wtp, conf)
+    out_tmp_path = args.out + ".tmp"
+    try:
+        with open_output(out_tmp_path, args.out) as out_f:
+            merge_shards(
+                wxr,
+                [Path(p) for p in args.shard_out],
+                out_f,
+                args.human_readable,
+            )
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        wtp.close_db_conn()
+        if conf.extract_thesaurus_pages:
+            close_thesaurus_db(wxr.thesaurus_db_path, wxr.thesaurus_db_conn)
+    Path(out_tmp_path).replace(args.out)
+    if args.errors:
+        merge_error_files(
+            [Path(p) for p in args.shard_errors], Path(args.errors)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+# Generator of synthetic Wiktionary dumps for scale testing
+# (python -m wiktextract.synthetic_dump).
+#
+# tests/test-pages-articles.xml.bz2 has a few hundred pages, which is too
+# few to see how the phases behave on a full dump.  This writes a MediaWiki
+# XML dump of any size in the layout of the English Wiktionary: main
+# namespace pages with a configurable mix of language and part-of-speech
+# sections (headword lines, glosses, pronunciations, etymologies, linkages
+# and translations), the templates they use, Lua modules invoked by those
+# templates and Thesaurus pages.  The dump can then be given to wiktwords
+# like a real one.
+#
+# Pages are written as they are generated, so memory use doesn't depend on
+# the number of pages.  The output is the same for the same arguments and
+# seed.
+
+import argparse
+import random
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TextIO
+from xml.sax.saxutils import escape
+
+from .compressed_output import open_output
+
+# Languages that can be used in --langs, by code
+LANGUAGES = {
+    "en": "English",
+    "fi": "Finnish",
+    "de": "German",
+    "es": "Spanish",
+    "fr": "French",
+    "it": "Italian",
+    "pt": "Portuguese",
+    "nl": "Dutch",
+    "pl": "Polish",
+    "ru": "Russian",
+    "ja": "Japanese",
+    "zh": "Chinese",
+    "la": "Latin",
+    "sv": "Swedish",
+}
+
+# Parts of speech that can be used in --pos, and their section headings
+POS_HEADINGS = {
+    "noun": "Noun",
+    "verb": "Verb",
+    "adj": "Adjective",
+    "adv": "Adverb",
+    "name": "Proper noun",
+    "prep": "Preposition",
+    "intj": "Interjection",
+}
+
+DEFAULT_LANGS = "en:40,fi:10,de:10,es:10,fr:10,it:5,pt:5,la:5,sv:5"
+DEFAULT_POS = "noun:50,verb:20,adj:15,adv:10,name:5"
+
+SYLLABLES = (
+    "ka ko ku ki ta to tu ti ra ro ru ri la lo lu li ma mo mu mi na no nu "
+    "ni sa so su si va vo pa po pe be de ge he je ke le me ne re se te ve"
+).split()
+
+NAMESPACES = (
+    (0, ""),
+    (4, "Wiktionary"),
+    (10, "Template"),
+    (14, "Category"),
+    (110, "Thesaurus"),
+    (828, "Module"),
+)
+
+# Templates the extractor handles by name, with simple definitions
+NAMED_TEMPLATES = {
+    "head": "'''{{{head|{{PAGENAME}}}}}''' {{{3|}}}"
+    "[[Category:{{{1}}} {{{2}}}s]]",
+    "IPA": "IPA<sup>([[Appendix:IPA|key]])</sup>: "
+    '<span class="IPA">{{{2}}}</span>',
+    "inh": "{{#invoke:synth-link|link}}",
+    "der": "{{#invoke:synth-link|link}}",
+    "l": "{{#invoke:synth-link|link}}",
+    "t": "{{#invoke:synth-link|link}}",
+    "syn": "Synonyms: {{#invoke:synth-link|list}}",
+    "trans-top": '<div class="NavFrame"><div class="NavHead">{{{1}}}'
+    '</div><div class="NavContent">\n{|\n|-\n|',
+    "trans-bottom": "|}</div></div>",
+    "ws": "[[{{{1}}}]]",
+    "ws header": "''Thesaurus''",
+    "ws sense": "Sense: {{{1}}}",
+}
+
+LINK_MODULE = """local export = {}
+
+function export.link(frame)
+    local args = frame:getParent().args
+    local word = args[3] or args[2] or ""
+    return "[[" .. word .. "#" .. (args[1] or "") .. "|" .. word .. "]]"
+end
+
+function export.list(frame)
+    local args = frame:getParent().args
+    local links = {}
+    for i = 2, 20 do
+        if args[i] == nil then break end
+        table.insert(links, "[[" .. args[i] .. "]]")
+    end
+    return table.concat(links, ", ")
+end
+
+return export
+"""
+
+# Filler modules do some string work so that Lua time is not negligible
+FILLER_MODULE = """local export = {{}}
+
+function export.main(frame)
+    local args = frame:getParent().args
+    local text = args[1] or ""
+    local parts = {{}}
+    for i = 1, {repeat} do
+        table.insert(parts, mw.ustring.upper(mw.ustring.sub(text, 1, i)))
+    end
+    return "<span>" .. table.concat(parts, " ") .. "</span>"
+end
+
+return export
+"""
+
+
+def parse_mix(spec: str, choices: dict[str, str]) -> tuple[list, list]:
+    """Parses "key:weight,..." into a list of keys and a list of weights.
+    Raises ValueError if a key is not in ``choices``."""
+    keys = []
+    weights = []
+    for item in spec.split(","):
+        key, _, weight = item.strip().partition(":")
+        if key not in choices:
+            raise ValueError(f"unknown {key!r} (known: {', '.join(choices)})")
+        keys.append(key)
+        weights.append(float(weight) if weight else 1.0)
+    return keys, weights
+
+
+def make_word(n: int) -> str:
+    """Returns a word that is different for each ``n``."""
+    parts = []
+    while True:
+        n, i = divmod(n, len(SYLLABLES))
+        parts.append(SYLLABLES[i])
+        if n == 0:
+            break
+    return "".join(parts)
+
+
+class DumpGenerator:
+    """Generates the pages of a synthetic dump."""
+
+    def __init__(
+        self,
+        num_pages: int,
+        langs: str = DEFAULT_LANGS,
+        pos: str = DEFAULT_POS,
+        num_templates: int = 50,
+        num_modules: int = 10,
+        num_thesaurus: int | None = None,
+        max_langs: int = 3,
+        seed: int = 0,
+    ):
+        self.num_pages = num_pages
+        self.lang_codes, self.lang_weights = parse_mix(langs, LANGUAGES)
+        self.pos_keys, self.pos_weights = parse_mix(pos, POS_HEADINGS)
+        self.num_templates = num_templates
+        self.num_modules = max(num_modules, 1)
+        self.num_thesaurus = min(
+            num_pages // 100 if num_thesaurus is None else num_thesaurus,
+            num_pages,
+        )
+        self.max_langs = max(min(max_langs, len(self.lang_codes)), 1)
+        self.rng = random.Random(seed)
+
+    def word(self) -> str:
+        """Returns the title of a random main namespace page."""
+        return make_word(self.rng.randrange(max(self.num_pages, 1)))
+
+    def pages(self) -> Iterator[tuple[str, int, str]]:
+        """Yields (title, namespace id, text) for each page."""
+        for name, body in NAMED_TEMPLATES.items():
+            yield f"Template:{name}", 10, body
+        yield "Module:synth-link", 828, LINK_MODULE
+        for i in range(self.num_modules):
+            yield (
+                f"Module:synth-{i}",
+                828,
+                FILLER_MODULE.format(repeat=5 + i % 20),
+            )
+        for i in range(self.num_templates):
+            yield (
+                f"Template:synth-{i}",
+                10,
+                f"{{{{#invoke:synth-{i % self.num_modules}|main}}}}",
+            )
+        for n in range(self.num_pages):
+            yield make_word(n), 0, self.main_page(make_word(n))
+        # Thesaurus pages for words spread over the main namespace pages
+        step = max(self.num_pages // max(self.num_thesaurus, 1), 1)
+        for i in range(self.num_thesaurus):
+            word = make_word(i * step)
+            yield f"Thesaurus:{word}", 110, self.thesaurus_page(word)
+
+    def main_page(self, word: str) -> str:
+        rng = self.rng
+        num_langs = rng.randint(1, self.max_langs)
+        codes: list[str] = []
+        while len(codes) < num_langs:
+            code = rng.choices(self.lang_codes, self.lang_weights)[0]
+            if code not in codes:
+                codes.append(code)
+        # Languages are sorted as on Wiktionary, English first
+        codes.sort(key=lambda c: (c != "en", LANGUAGES[c]))
+        sections = [self.language_section(word, code) for code in codes]
+        return "\n\n----\n\n".join(sections)
+
+    def language_section(self, word: str, code: str) -> str:
+        rng = self.rng
+        lines = [f"=={LANGUAGES[code]}==", ""]
+        if rng.random() < 0.7:
+            lines += [
+                "===Etymology===",
+                "From {{{{inh|{}|la|{}}}}} {}.".format(
+                    code, self.word(), self.filler_template(word)
+                ),
+                "",
+            ]
+        if rng.random() < 0.6:
+            lines += [
+                "===Pronunciation===",
+                "* {{{{IPA|{}|/{}/}}}}".format(code, word),
+                "",
+            ]
+        poses = {
+            rng.choices(self.pos_keys, self.pos_weights)[0]
+            for _ in range(rng.randint(1, 2))
+        }
+        for pos in sorted(poses, key=self.pos_keys.index):
+            lines += self.pos_section(word, code, pos)
+        return "\n".join(lines).rstrip()
+
+    def pos_section(self, word: str, code: str, pos: str) -> list[str]:
+        rng = self.rng
+        heading = POS_HEADINGS[pos]
+        lines = [
+            f"==={heading}===",
+            "{{{{head|{}|{}}}}}".format(code, heading.lower()),
+            "",
+        ]
+        glosses = []
+        for _ in range(rng.randint(1, 4)):
+            gloss = "{} [[{}]] {}".format(
+                rng.choice(("A", "The", "Some", "To")),
+                self.word(),
+                self.filler_template(word),
+            )
+            glosses.append(gloss)
+            lines.append(f"# {gloss}")
+            if rng.random() < 0.3:
+                lines.append(
+                    "#: {{{{syn|{}|{}|{}}}}}".format(
+                        code, self.word(), self.word()
+                    )
+                )
+            if rng.random() < 0.3:
+                lines.append(f"#: ''{word} {self.word()} {self.word()}.''")
+        lines.append("")
+        if rng.random() < 0.4:
+            lines += ["====Synonyms====", ""]
+            lines += [
+                "* {{{{l|{}|{}}}}}".format(code, self.word())
+                for _ in range(rng.randint(1, 4))
+            ]
+            if rng.random() < 0.2:
+                lines.append(f"* See also [[Thesaurus:{word}]].")
+            lines.append("")
+        if rng.random() < 0.2:
+            lines += ["====Derived terms====", ""]
+            lines += [
+                "* {{{{l|{}|{}{}}}}}".format(code, word, self.word())
+                for _ in range(rng.randint(1, 3))
+            ]
+            lines.append("")
+        if code == "en" and rng.random() < 0.5:
+            lines += ["====Translations====", ""]
+            for gloss in glosses[:2]:
+                lines.append(f"{{{{trans-top|{gloss}}}}}")
+                for t_code in sorted(rng.sample(sorted(LANGUAGES), 4)):
+                    if t_code == "en":
+                        continue
+                    lines.append(
+                        "* {}: {{{{t|{}|{}}}}}".format(
+                            LANGUAGES[t_code], t_code, self.word()
+                        )
+                    )
+                lines.append("{{trans-bottom}}")
+            lines.append("")
+        return lines
+
+    def filler_template(self, word: str) -> str:
+        if self.num_templates == 0:
+            return ""
+        i = self.rng.randrange(self.num_templates)
+        return f"{{{{synth-{i}|{word}}}}}"
+
+    def thesaurus_page(self, word: str) -> str:
+        rng = self.rng
+        code = rng.choices(self.lang_codes, self.lang_weights)[0]
+        pos = rng.choices(self.pos_keys, self.pos_weights)[0]
+        lines = [
+            f"{{{{ws header|lang={code}}}}}",
+            "",
+            f"=={LANGUAGES[code]}==",
+            "",
+            f"==={POS_HEADINGS[pos]}===",
+            "",
+        ]
+        for _ in range(rng.randint(1, 3)):
+            lines.append(f"===={{{{ws sense|{self.word()}}}}}====")
+            lines += [
+                f"{{{{ws|{self.word()}}}}}" for _ in range(rng.randint(2, 10))
+            ]
+            lines.append("")
+            for heading in ("Synonyms", "Antonyms"):
+                if rng.random() < 0.5:
+                    lines.append(f"====={heading}=====")
+                    lines += [
+                        f"{{{{ws|{self.word()}}}}}"
+                        for _ in range(rng.randint(1, 5))
+                    ]
+                    lines.append("")
+        return "\n".join(lines).rstrip()
+
+
+def write_dump(generator: DumpGenerator, out_f: TextIO) -> int:
+    """Writes the pages of ``generator`` as a MediaWiki XML dump.  Returns
+    the number of pages written."""
+    out_f.write(
+        '<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/" '
+        'version="0.10" xml:lang="en">\n'
+        "  <siteinfo>\n"
+        "    <sitename>Wiktionary</sitename>\n"
+        "    <dbname>enwiktionary</dbname>\n"
+        "    <case>case-sensitive</case>\n"
+        "    <namespaces>\n"
+    )
+    for ns_id, name in NAMESPACES:
+        if name:
+            out_f.write(
+                f'      <namespace key="{ns_id}" case="case-sensitive">'
+                f"{name}</namespace>\n"
+            )
+        else:
+            out_f.write(
+                f'      <namespace key="{ns_id}" case="case-sensitive" />\n'
+            )
+    out_f.write("    </namespaces>\n  </siteinfo>\n")
+    num_pages = 0
+    for page_id, (title, ns_id, text) in enumerate(generator.pages(), 1):
+        if ns_id == 828:
+            model, text_format = "Scribunto", "text/plain"
+        else:
+            model, text_format = "wikitext", "text/x-wiki"
+        out_f.write(
+            "  <page>\n"
+            f"    <title>{escape(title)}</title>\n"
+            f"    <ns>{ns_id}</ns>\n"
+            f"    <id>{page_id}</id>\n"
+            "    <revision>\n"
+            f"      <id>{page_id}</id>\n"
+            "      <timestamp>2024-01-01T00:00:00Z</timestamp>\n"
+            f"      <model>{model}</model>\n"
+            f"      <format>{text_format}</format>\n"
+            '      <text xml:space="preserve">'
+            f"{escape(text)}</text>\n"
+            "    </revision>\n"
+            "  </page>\n"
+        )
+        num_pages += 1
+    out_f.write("</mediawiki>\n")
+    return num_pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic Wiktionary dump for scale testing"
+    )
+    parser.add_argument(
+        "out",
+        type=str,
+        help="Output file, compressed if it ends with .bz2, .gz, .xz or "
+        ".zst (wiktwords reads .bz2 dumps)",
+    )
+    parser.add_argument(
+        "--pages",
+        type=int,
+        default=100_000,
+        metavar="N",
+        help="Number of main namespace pages (default 100000)",
+    )
+    parser.add_argument(
+        "--langs",
+        type=str,
+        default=DEFAULT_LANGS,
+        help="Language codes and weights of the language sections "
+        f"(default {DEFAULT_LANGS}; known: {', '.join(LANGUAGES)})",
+    )
+    parser.add_argument(
+        "--pos",
+        type=str,
+        default=DEFAULT_POS,
+        help="Parts of speech and weights of the part-of-speech sections "
+        f"(default {DEFAULT_POS}; known: {', '.join(POS_HEADINGS)})",
+    )
+    parser.add_argument(
+        "--max-langs",
+        type=int,
+        default=3,
+        help="Maximum number of languages on a page (default 3)",
+    )
+    parser.add_argument(
+        "--templates",
+        type=int,
+        default=50,
+        metavar="N",
+        help="Number of filler templates used by the pages (default 50)",
+    )
+    parser.add_argument(
+        "--modules",
+        type=int,
+        default=10,
+        metavar="N",
+        help="Number of Lua modules invoked by the filler templates "
+        "(default 10)",
+    )
+    parser.add_argument(
+        "--thesaurus",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Number of Thesaurus pages (default 1%% of --pages)",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Random seed (default 0)"
+    )
+    args = parser.parse_args()
+    try:
+        generator = DumpGenerator(
+            args.pages,
+            args.langs,
+            args.pos,
+            args.templates,
+            args.modules,
+            args.thesaurus,
+            args.max_langs,
+            args.seed,
+        )
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    with open_output(Path(args.out)) as out_f:
+        num_pages = write_dump(generator, out_f)
+    print(f"Wrote {num_pages} pages to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
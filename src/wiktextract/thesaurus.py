@@ -2,14 +2,13 @@
 # merged into word linkages in later stages.
 #
 # Copyright (c) 2021 Tatu Ylonen.  See file LICENSE and https://ylonen.org
-import os
 import sqlite3
 import tempfile
 import time
 import traceback
 from collections.abc import Iterable
 from dataclasses import dataclass, field
-from multiprocessing import Pool, current_process
+from multiprocessing import current_process
 from pathlib import Path
 from typing import Optional, TextIO
 
@@ -18,6 +17,8 @@ from wikitextprocessor import Page
 from wikitextprocessor.core import CollatedErrorReturnData, NamespaceDataEntry
 
 from .import_utils import import_extractor_module
+from .watchdog import PageWatchdog
+from .worker_pool import LostTask, WorkerPool
 from .wxr_context import WiktextractContext
 from .wxr_logging import logger
 
@@ -41,28 +42,25 @@ def worker_func(
     page: Page,
 ) -> tuple[bool, list[ThesaurusTerm], CollatedErrorReturnData, Optional[str]]:
     wxr: WiktextractContext = worker_func.wxr  # type:ignore[attr-defined]
-    with tempfile.TemporaryDirectory(prefix="wiktextract") as tmpdirname:
-        debug_path = "{}/wiktextract-{}".format(tmpdirname, os.getpid())
-        with open(debug_path, "w", encoding="utf-8") as f:
-            f.write(page.title + "\n")
-
-        wxr.wtp.start_page(page.title)
-        try:
-            terms = extract_thesaurus_page(wxr, page)
-            return True, terms, wxr.wtp.to_return(), None
-        except Exception as e:
-            lst = traceback.format_exception(
-                type(e), value=e, tb=e.__traceback__
-            )
-            msg = (
-                '=== EXCEPTION while parsing page "{}":\n '
-                "in process {}".format(
-                    page.title,
-                    current_process().name,
-                )
-                + "".join(lst)
+    watchdog: PageWatchdog = worker_func.watchdog  # type:ignore[attr-defined]
+    watchdog.start_page(page.title)
+    wxr.wtp.start_page(page.title)
+    try:
+        terms = extract_thesaurus_page(wxr, page)
+        return True, terms, wxr.wtp.to_return(), None
+    except Exception as e:
+        lst = traceback.format_exception(type(e), value=e, tb=e.__traceback__)
+        msg = (
+            '=== EXCEPTION while parsing page "{}":\n '
+            "in process {}".format(
+                page.title,
+                current_process().name,
             )
-            return False, [], {}, msg  # type:ignore[typeddict-item]
+            + "".join(lst)
+        )
+        return False, [], {}, msg  # type:ignore[typeddict-item]
+    finally:
+        watchdog.end_page()
 
 
 def extract_thesaurus_page(
@@ -77,7 +75,7 @@ def extract_thesaurus_page(
 def extract_thesaurus_data(
     wxr: WiktextractContext, num_processes: Optional[int] = None
 ) -> None:
-    from .wiktionary import init_worker_process
+    from .wiktionary import create_watchdog, init_worker_process
 
     start_t = time.time()
     logger.info("Extracting thesaurus data")
@@ -88,18 +86,38 @@ def extract_thesaurus_data(
     thesaurus_ns_id = thesaurus_ns_data.get("id", 0)
 
     wxr.remove_unpicklable_objects()
-    with Pool(num_processes, init_worker_process, (worker_func, wxr)) as pool:
+    watchdog = create_watchdog(wxr, num_processes)
+    with WorkerPool(
+        num_processes,
+        worker_func,
+        init_worker_process,
+        (worker_func, wxr, watchdog),
+        profile_dir=wxr.config.profile_dir,
+        profile_every=wxr.config.profile_every,
+    ) as pool:
         wxr.reconnect_databases(False)
-        for success, terms, stats, err in pool.imap_unordered(
-            worker_func, wxr.wtp.get_all_pages([thesaurus_ns_id], False)
-        ):
-            if not success:
-                # Print error in parent process - do not remove
-                logger.error(err)
-                continue
-            for term in terms:
-                insert_thesaurus_term(wxr.thesaurus_db_conn, term)  # type:ignore[arg-type]
-            wxr.config.merge_return(stats)
+        watchdog.start()
+        try:
+            for result in pool.imap_unordered(
+                wxr.wtp.get_all_pages([thesaurus_ns_id], False)
+            ):
+                if isinstance(result, LostTask):
+                    logger.error(
+                        f"Worker process {result.pid} exited with code "
+                        f"{result.exitcode} while parsing page "
+                        f'"{result.task.title}"'
+                    )
+                    continue
+                success, terms, stats, err = result
+                if not success:
+                    # Print error in parent process - do not remove
+                    logger.error(err)
+                    continue
+                for term in terms:
+                    insert_thesaurus_term(wxr.thesaurus_db_conn, term)  # type:ignore[arg-type]
+                wxr.config.merge_return(stats)
+        finally:
+            watchdog.stop()
 
     wxr.thesaurus_db_conn.commit()  # type:ignore[union-attr]
     num_pages = wxr.wtp.saved_page_nums([thesaurus_ns_id], False)
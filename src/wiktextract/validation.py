@@ -0,0 +1,473 @@
+# Checks of the extracted data (wiktwords --validate).
+#
+# The expected format of the word entries is described declaratively by
+# ``ENTRY_SCHEMA`` and compiled once per process into nested closures, with
+# the fields of each kind grouped together, so that checking an entry
+# is a few loops over its fields.  Error messages, which include the JSON
+# of the offending data, are only formatted when a check fails.
+#
+# The checks run in the worker processes right after a page has been
+# parsed, so the parent process only writes the results.  On full dumps
+# the checks can be limited to every Nth entry ("sample=1/N") or turned
+# off.
+
+import functools
+import json
+import re
+from typing import Callable, Container, Iterable
+
+from wikitextprocessor.core import ErrorMessageData
+
+from .wxr_context import WiktextractContext
+
+
+class Str:
+    """A string, non-empty unless ``empty_ok``.  Absent fields are ok unless
+    ``mandatory``."""
+
+    __slots__ = ("mandatory", "empty_ok")
+
+    def __init__(self, mandatory: bool = False, empty_ok: bool = False):
+        self.mandatory = mandatory
+        self.empty_ok = empty_ok
+
+
+class StrList:
+    """A list of non-empty strings."""
+
+    __slots__ = ()
+
+
+class StrDict:
+    """A dict with string keys and values, like template arguments."""
+
+    __slots__ = ()
+
+
+class Int:
+    __slots__ = ()
+
+
+class Tags:
+    """A list of tags, which must be in ``valid_tags`` in the English
+    edition."""
+
+    __slots__ = ()
+
+
+class DictList:
+    """A list of dicts, each checked with ``schema`` if given."""
+
+    __slots__ = ("schema",)
+
+    def __init__(self, schema: "Schema | None" = None):
+        self.schema = schema
+
+
+# A rule gets a dict and returns an error message or None
+Rule = Callable[[dict], str | None]
+
+
+class Schema:
+    """The fields of a dict and rules that involve several fields."""
+
+    __slots__ = ("fields", "rules")
+
+    def __init__(
+        self,
+        fields: dict[str, Str | StrList | StrDict | Int | Tags | DictList],
+        rules: Iterable[Rule] = (),
+    ):
+        self.fields = fields
+        self.rules = tuple(rules)
+
+
+def form_rule(form: dict) -> str | None:
+    tags = form.get("tags")
+    if isinstance(tags, list) and "table-tags" in tags:
+        # The "table-tags" form of an inflection table may be empty
+        return None
+    v = form.get("form")
+    if not isinstance(v, str) or not v:
+        return (
+            "'form' should be a non-empty string (it is a mandatory field): "
+            + json.dumps(form, sort_keys=True)
+        )
+    return None
+
+
+def translation_rule(item: dict) -> str | None:
+    if not item.get("code") and not item.get("lang"):
+        return (
+            '"translations" items must contain at least one of "code" and '
+            '"lang" (normally both): '
+            + json.dumps(item, sort_keys=True, ensure_ascii=False)
+        )
+    return None
+
+
+def senses_rule(dt: dict) -> str | None:
+    if not dt.get("senses"):
+        return (
+            'missing "senses" in data (must have at least one sense, add '
+            'empty sense with "no-gloss" tag if none otherwise available)'
+        )
+    return None
+
+
+LINKAGE_SCHEMA = Schema(
+    {
+        "word": Str(mandatory=True),
+        "english": Str(empty_ok=True),
+        "roman": Str(empty_ok=True),
+        "sense": Str(empty_ok=True),
+        "taxonomic": Str(empty_ok=True),
+        "tags": Tags(),
+        "topics": StrList(),
+    }
+)
+
+ALT_OF_SCHEMA = Schema({"word": Str(mandatory=True), "extra": Str()})
+
+TEMPLATE_SCHEMA = Schema(
+    {
+        "name": Str(mandatory=True),
+        # Some templates expand to nothing
+        "expansion": Str(empty_ok=True),
+        "args": StrDict(),
+    }
+)
+
+LINKAGE_FIELDS = (
+    "synonyms",
+    "antonyms",
+    "hypernyms",
+    "holonyms",
+    "meronyms",
+    "coordinate_terms",
+    "derived",
+    "related",
+)
+
+SENSE_SCHEMA = Schema(
+    {
+        "glosses": StrList(),
+        "raw_glosses": StrList(),
+        "tags": Tags(),
+        "categories": StrList(),
+        "topics": StrList(),
+        "wikidata": StrList(),
+        "wikipedia": StrList(),
+        "english": Str(),
+        "alt_of": DictList(ALT_OF_SCHEMA),
+        "form_of": DictList(ALT_OF_SCHEMA),
+        **{field: DictList(LINKAGE_SCHEMA) for field in LINKAGE_FIELDS},
+    }
+)
+
+ENTRY_SCHEMA = Schema(
+    {
+        "tags": Tags(),
+        "etymology_text": Str(),
+        "etymology_number": Int(),
+        "categories": StrList(),
+        "topics": StrList(),
+        "wikidata": StrList(),
+        "wikipedia": StrList(),
+        "forms": DictList(Schema({"tags": Tags()}, [form_rule])),
+        "senses": DictList(SENSE_SCHEMA),
+        # Linkages are in the senses in the English edition
+        **{field: DictList() for field in LINKAGE_FIELDS},
+        # Any number of different types of sounds (ipa, enpr, etc.) are
+        # allowed in the same or different sound entries
+        "sounds": DictList(
+            Schema(
+                {
+                    "ipa": Str(),
+                    "enpr": Str(),
+                    "audio": Str(),
+                    "ogg_url": Str(),
+                    "mp3_url": Str(),
+                    "audio-ipa": Str(),
+                    "text": Str(),
+                    "tags": Tags(),
+                    "homophones": StrList(),
+                    "hyphenation": StrList(),
+                }
+            )
+        ),
+        "translations": DictList(
+            Schema(
+                {
+                    "word": Str(mandatory=True),
+                    "tags": Tags(),
+                    "alt": Str(),
+                    "code": Str(),
+                    "english": Str(),
+                    "lang": Str(),
+                    "note": Str(),
+                    "roman": Str(),
+                    "sense": Str(),
+                    "taxonomic": Str(),
+                },
+                [translation_rule],
+            )
+        ),
+        "descendants": DictList(
+            Schema({"text": Str(), "depth": Int(), "templates": DictList()})
+        ),
+        "etymology_templates": DictList(TEMPLATE_SCHEMA),
+        "head_templates": DictList(TEMPLATE_SCHEMA),
+        "inflection_templates": DictList(TEMPLATE_SCHEMA),
+    },
+    [senses_rule],
+)
+
+
+# Checks a dict, appending error messages to a list
+Check = Callable[[dict, list[str]], None]
+
+
+def compile_schema(schema: Schema, valid_tags: Container[str] | None) -> Check:
+    """Compiles ``schema`` into a function that checks a dict.  Tags must
+    be in ``valid_tags`` unless it is None."""
+    str_fields = []
+    str_list_fields = []
+    str_dict_fields = []
+    int_fields = []
+    tag_fields = []
+    dict_list_fields = []
+    for name, spec in schema.fields.items():
+        if isinstance(spec, Str):
+            str_fields.append((name, spec.mandatory, spec.empty_ok))
+        elif isinstance(spec, StrList):
+            str_list_fields.append(name)
+        elif isinstance(spec, StrDict):
+            str_dict_fields.append(name)
+        elif isinstance(spec, Int):
+            int_fields.append(name)
+        elif isinstance(spec, Tags):
+            tag_fields.append(name)
+        else:
+            dict_list_fields.append(
+                (
+                    name,
+                    compile_schema(spec.schema, valid_tags)
+                    if spec.schema is not None
+                    else None,
+                )
+            )
+    rules = schema.rules
+
+    def check(item: dict, errors: list[str]) -> None:
+        for name, mandatory, empty_ok in str_fields:
+            v = item.get(name)
+            if v is None:
+                if mandatory:
+                    errors.append(
+                        "{!r} should be a{} string (it is a mandatory "
+                        "field): {}".format(
+                            name,
+                            "" if empty_ok else " non-empty",
+                            json.dumps(item, sort_keys=True),
+                        )
+                    )
+            elif not isinstance(v, str):
+                errors.append(
+                    "{!r} should be a{} string: {}".format(
+                        name,
+                        "" if empty_ok else " non-empty",
+                        json.dumps(item, sort_keys=True),
+                    )
+                )
+            elif not v and not empty_ok:
+                errors.append(
+                    "{!r} should contain a non-empty string: {}".format(
+                        name, json.dumps(item, sort_keys=True)
+                    )
+                )
+        for name in str_list_fields:
+            lst = item.get(name)
+            if lst is None:
+                continue
+            if not isinstance(lst, (list, tuple)) or not all(
+                isinstance(x, str) and x for x in lst
+            ):
+                errors.append(
+                    "{!r} should be a list of non-empty strings: {}".format(
+                        name, json.dumps(item, sort_keys=True)
+                    )
+                )
+        for name in str_dict_fields:
+            args = item.get(name)
+            if args is None:
+                continue
+            if not isinstance(args, dict) or not all(
+                isinstance(k, str) and isinstance(v, str)
+                for k, v in args.items()
+            ):
+                errors.append(
+                    "{!r} must be a dict with string keys and values: "
+                    "{}".format(name, json.dumps(args, sort_keys=True))
+                )
+        for name in int_fields:
+            v = item.get(name)
+            if v is not None and not isinstance(v, int):
+                errors.append(f"{name!r} must be an int")
+        for name in tag_fields:
+            tags = item.get(name)
+            if tags is None:
+                continue
+            if not isinstance(tags, (list, tuple)):
+                errors.append(
+                    '"tags" field value must be a list of strings: {!r}'.format(
+                        tags
+                    )
+                )
+                continue
+            for tag in tags:
+                if not isinstance(tag, str):
+                    errors.append(
+                        '"tags" field should only contain strings: {!r}'.format(
+                            tag
+                        )
+                    )
+                elif valid_tags is not None and tag not in valid_tags:
+                    errors.append(
+                        "invalid tag {!r} not in valid_tags (or "
+                        "uppercase_tags)".format(tag)
+                    )
+        for name, check_item in dict_list_fields:
+            lst = item.get(name)
+            if lst is None:
+                continue
+            if not isinstance(lst, (list, tuple)) or not all(
+                isinstance(x, dict) for x in lst
+            ):
+                errors.append(
+                    "{!r} should be a list of dicts: {}".format(
+                        name, json.dumps(lst, sort_keys=True)
+                    )
+                )
+                # The items would cause type errors
+                continue
+            if check_item is not None:
+                for x in lst:
+                    check_item(x, errors)
+        for rule in rules:
+            msg = rule(item)
+            if msg is not None:
+                errors.append(msg)
+
+    return check
+
+
+@functools.cache
+def entry_check(lang_code: str) -> Check:
+    """Returns the compiled ``ENTRY_SCHEMA`` for an edition."""
+    valid_tags: Container[str] | None = None
+    # XXX check tags in other editions later (currently too many bogus
+    # tags in non-English editions).  Tag values should be standardized
+    # across editions, except for uppercase tags (e.g., regional variants).
+    if lang_code == "en":
+        from .tags import valid_tags as en_valid_tags
+
+        valid_tags = en_valid_tags
+    return compile_schema(ENTRY_SCHEMA, valid_tags)
+
+
+def check_error(
+    wxr: WiktextractContext,
+    dt: dict,
+    word: str | None,
+    lang: str | None,
+    pos: str | None,
+    msg: str,
+) -> None:
+    """Formats and outputs an error message about data format checks."""
+    msg += ": " + json.dumps(dt, sort_keys=True, ensure_ascii=False)
+    prefix = word or ""
+    if lang:
+        prefix += "/" + lang
+    if pos:
+        prefix += "/" + pos
+    if prefix:
+        msg = prefix + ": " + msg
+    print(msg)
+    config = wxr.config
+    if len(config.debugs) > 100000:  # Avoid excessive size
+        return
+    error_data: ErrorMessageData = {
+        "msg": msg,
+        "trace": "",
+        "title": word,
+        "section": lang,
+        "subsection": pos,
+        "called_from": "wiktionary/179/20240425",
+        "path": tuple(),
+    }
+    config.debugs.append(error_data)
+
+
+def validate_entry(wxr: WiktextractContext, dt: dict) -> None:
+    """Checks a word entry or redirect, adding a debug message to
+    ``wxr.config.debugs`` for each problem found."""
+    word = dt.get("word", dt.get("title"))
+    if word is None:
+        check_error(
+            wxr, dt, None, None, None, 'missing "word" or "title" field in data'
+        )
+        return
+    if "title" in dt:
+        return  # redirect pages don't have following fields
+    lang = dt.get("lang")
+    if not lang:
+        check_error(wxr, dt, word, None, None, 'missing "lang" field in data')
+        return
+    pos = dt.get("pos")
+    if not pos:
+        check_error(wxr, dt, word, lang, pos, 'missing "pos" field in data')
+        return
+    if not dt.get("lang_code"):
+        check_error(
+            wxr, dt, word, lang, pos, 'missing "lang_code" field in data'
+        )
+    errors: list[str] = []
+    entry_check(wxr.wtp.lang_code)(dt, errors)
+    for msg in errors:
+        check_error(wxr, dt, word, lang, pos, msg)
+
+
+def parse_validate_mode(mode: str) -> int | None:
+    """Parses a --validate mode: "full", "sample=1/N" or "off".  Returns N,
+    which is 1 for "full" and 0 for "off", or None if the mode is
+    invalid."""
+    if mode == "full":
+        return 1
+    if mode == "off":
+        return 0
+    m = re.fullmatch(r"sample=1/([1-9][0-9]*)", mode)
+    if m is None:
+        return None
+    return int(m.group(1))
+
+
+class DataValidator:
+    """Checks every ``every``th entry extracted by a worker process, or
+    none if ``every`` is 0."""
+
+    __slots__ = ("every", "num_entries")
+
+    def __init__(self, every: int = 1):
+        self.every = every
+        self.num_entries = 0
+
+    def check_page(
+        self, wxr: WiktextractContext, page_data: list[dict]
+    ) -> None:
+        if self.every == 0:
+            return
+        for dt in page_data:
+            if self.num_entries % self.every == 0:
+                validate_entry(wxr, dt)
+            self.num_entries += 1
@@ -0,0 +1,203 @@
+# Watchdog for finding pages on which extraction hangs.
+#
+# Each worker process records the title of the page it is processing and the
+# time it started in its own slot of a table in shared memory.  This costs a
+# few memory writes per page.  A supervisor thread in the parent process
+# periodically checks the table, warns about pages that take too long and
+# can optionally kill the worker, which is then replaced by the worker pool.
+# The pages being processed are also logged if the parent process gets
+# SIGINT or SIGTERM.
+
+import ctypes
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from multiprocessing.context import BaseContext
+
+from .wxr_logging import logger
+
+# Maximum length of a title in bytes (MediaWiki limits titles to 255 bytes,
+# not counting the namespace prefix)
+TITLE_SIZE = 512
+
+
+class WatchdogSlot(ctypes.Structure):
+    _fields_ = [
+        ("pid", ctypes.c_int64),
+        # time.time() when the current page was started, 0 when idle
+        ("start", ctypes.c_double),
+        ("title", ctypes.c_char * TITLE_SIZE),
+    ]
+
+
+def pid_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class PageWatchdog:
+    """Slot table shared by the worker processes and the parent process.
+    Worker processes call ``attach()`` once and then ``start_page()`` and
+    ``end_page()`` around each page.  The parent process calls ``start()``
+    and ``stop()`` around the processing loop.
+
+    Pages taking more than ``warn_seconds`` are logged; if ``kill_seconds``
+    is not None, the worker process is killed after that many seconds.
+
+    The lock of the table is created from the multiprocessing ``context``
+    (by default the default context), which must be the one the worker
+    processes are started with if they are not forked."""
+
+    def __init__(
+        self,
+        num_slots: int,
+        warn_seconds: float = 100.0,
+        kill_seconds: float | None = None,
+        check_interval: float = 1.0,
+        context: BaseContext | None = None,
+    ):
+        if context is None:
+            context = multiprocessing.get_context()
+        self.slots = context.RawArray(WatchdogSlot, num_slots)
+        self.lock = context.Lock()
+        self.warn_seconds = warn_seconds
+        self.kill_seconds = kill_seconds
+        self.check_interval = check_interval
+        self.parent_pid = os.getpid()
+        # Slot claimed by this process (worker processes only)
+        self.slot: WatchdogSlot | None = None
+        # Supervisor state (parent process only)
+        self.thread: threading.Thread | None = None
+        self.stop_event = threading.Event()
+        self.old_handlers: dict[int, object] = {}
+
+    def __getstate__(self) -> dict:
+        # Only the shared table and settings are passed to worker processes
+        return {
+            "slots": self.slots,
+            "lock": self.lock,
+            "warn_seconds": self.warn_seconds,
+            "kill_seconds": self.kill_seconds,
+            "check_interval": self.check_interval,
+            "parent_pid": self.parent_pid,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.slot = None
+        self.thread = None
+        self.stop_event = threading.Event()
+        self.old_handlers = {}
+
+    def attach(self) -> None:
+        """Claims a free slot for the current (worker) process."""
+        pid = os.getpid()
+        with self.lock:
+            for slot in self.slots:
+                if slot.pid == 0 or not pid_exists(slot.pid):
+                    slot.start = 0.0
+                    slot.pid = pid
+                    self.slot = slot
+                    return
+        logger.warning(f"No free watchdog slot for process {pid}")
+
+    def start_page(self, title: str) -> None:
+        slot = self.slot
+        if slot is None:
+            return
+        slot.start = 0.0
+        slot.title = title.encode("utf-8")[: TITLE_SIZE - 1]
+        slot.start = time.time()
+
+    def end_page(self) -> None:
+        if self.slot is not None:
+            self.slot.start = 0.0
+
+    def active_pages(self) -> list[tuple[int, str, float]]:
+        """Returns (pid, title, seconds) for every page currently being
+        processed, longest running first."""
+        now = time.time()
+        pages = []
+        for slot in self.slots:
+            start = slot.start
+            if start > 0:
+                title = slot.title.decode("utf-8", errors="replace")
+                pages.append((slot.pid, title, now - start))
+        pages.sort(key=lambda x: x[2], reverse=True)
+        return pages
+
+    def log_active_pages(self, reason: str) -> None:
+        pages = self.active_pages()
+        if not pages:
+            return
+        logger.warning(f"{reason}; pages being processed:")
+        for pid, title, dur in pages:
+            logger.warning(f"  {dur:8.1f}s  process {pid}: {title}")
+
+    def start(self) -> None:
+        """Starts the supervisor thread and installs signal handlers that
+        log the pages being processed.  Called in the parent process."""
+        self.stop_event.clear()
+        self.thread = threading.Thread(
+            target=self.supervise, name="wiktextract-watchdog", daemon=True
+        )
+        self.thread.start()
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                self.old_handlers[signum] = signal.signal(
+                    signum, self.signal_handler
+                )
+
+    def stop(self) -> None:
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        for signum, handler in self.old_handlers.items():
+            signal.signal(signum, handler)  # type: ignore[arg-type]
+        self.old_handlers = {}
+
+    def supervise(self) -> None:
+        warned: set[tuple[int, float]] = set()
+        while not self.stop_event.wait(self.check_interval):
+            now = time.time()
+            for slot in self.slots:
+                start = slot.start
+                if start <= 0:
+                    continue
+                pid = slot.pid
+                dur = now - start
+                title = slot.title.decode("utf-8", errors="replace")
+                if self.kill_seconds is not None and dur > self.kill_seconds:
+                    logger.error(
+                        f"====== KILLING PROCESS {pid}: PAGE HAS TAKEN "
+                        f"{dur:.1f}s: {title}"
+                    )
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    slot.start = 0.0
+                elif dur > self.warn_seconds and (pid, start) not in warned:
+                    warned.add((pid, start))
+                    logger.warning(
+                        f"====== WARNING: PAGE HAS TAKEN {dur:.1f}s "
+                        f"SO FAR IN PROCESS {pid}: {title}"
+                    )
+
+    def signal_handler(self, signum: int, frame) -> None:
+        if os.getpid() == self.parent_pid:
+            self.log_active_pages(f"Received {signal.Signals(signum).name}")
+        handler = self.old_handlers.get(signum, signal.SIG_DFL)
+        if callable(handler):
+            handler(signum, frame)
+        elif handler == signal.SIG_DFL:
+            signal.signal(signum, signal.SIG_DFL)
+            os.kill(os.getpid(), signum)
@@ -6,27 +6,62 @@
 
 import io
 import json
+import multiprocessing
 import os
 import re
+import shutil
+import socket
 import tarfile
-import tempfile
 import time
 import traceback
-from multiprocessing import Pool, current_process
+from array import array
+from collections.abc import Iterable, Iterator
+from multiprocessing import current_process
 from pathlib import Path
-from typing import TextIO
+from typing import Any, TextIO
 
 from wikitextprocessor import Page
 from wikitextprocessor.core import CollatedErrorReturnData, ErrorMessageData
 from wikitextprocessor.dumpparser import process_dump
 
+from .cache_stats import CacheReporter, CacheStats
+from .checkpoint import Checkpoint
+from .error_sink import MessageSink
 from .import_utils import import_extractor_module
+from .job_queue import (
+    MESSAGE_KINDS,
+    JobQueue,
+    LeaseRenewer,
+    job_output_dir,
+    job_output_path,
+)
+from .memory_profile import MemoryProfiler
+from .metrics import ProgressMetrics
+from .out_shards import (
+    concatenate_out_shards,
+    open_out_shard,
+    remove_out_shards,
+)
 from .page import parse_page
+from .page_bundles import PageRecorder, save_bundle
+from .page_queries import (
+    get_page_title,
+    get_pages_by_ids,
+    load_pages,
+    select_page_sizes,
+)
+from .page_timing import PageTimer, PageTimingLog, install_lua_timer
+from .preload import log_worker_memory, prepare_workers, workers_started
+from .reorder_buffer import ReorderBuffer
+from .shards import shard_page_ids, write_shard_manifest
 from .thesaurus import (
     emit_words_in_thesaurus,
     extract_thesaurus_data,
     thesaurus_linkage_number,
 )
+from .validation import DataValidator
+from .watchdog import PageWatchdog
+from .worker_pool import BatchSizer, LostTask, WorkerPool
 from .wxr_context import WiktextractContext
 from .wxr_logging import logger
 
@@ -40,48 +75,152 @@ def page_handler(
     # We've given the page_handler function an extra wxr attribute previously.
     # This should never cause an exception, and if it does, we want it to.
     wxr: WiktextractContext = page_handler.wxr  #  type:ignore[attr-defined]
-    # Helps debug extraction hangs. This writes the path of each file being
-    # processed into /tmp/wiktextract*/wiktextract-*.  Once a hang
-    # has been observed, these files contain page(s) that hang.  They should
-    # be checked before aborting the process, as an interrupt might delete them.
-    with tempfile.TemporaryDirectory(prefix="wiktextract") as tmpdirname:
-        debug_path = "{}/wiktextract-{}".format(tmpdirname, os.getpid())
-        with open(debug_path, "w", encoding="utf-8") as f:
-            f.write(page.title + "\n")
-
-        wxr.wtp.start_page(page.title)
-        try:
-            title = re.sub(r"[\s\000-\037]+", " ", page.title)
-            title = title.strip()
-            if page.redirect_to is not None:
-                page_data = [
-                    {
-                        "title": title,
-                        "redirect": page.redirect_to,
-                        "pos": "hard-redirect",
-                    }
-                ]
-            else:
-                # XXX Sign gloss pages?
-                start_t = time.time()
-                page_data = parse_page(wxr, title, page.body)  # type: ignore[arg-type]
-                dur = time.time() - start_t
-                if dur > 100:
-                    logger.warning(
-                        "====== WARNING: PARSING PAGE TOOK {:.1f}s: {}".format(
-                            dur, title
-                        )
+    # Helps debug extraction hangs.  The title of the page being processed
+    # is recorded in the watchdog's shared memory table, which the parent
+    # process checks for pages that take too long.
+    watchdog: PageWatchdog = page_handler.watchdog  # type:ignore[attr-defined]
+    watchdog.start_page(page.title)
+    wxr.wtp.start_page(page.title)
+    page_recorder: PageRecorder | None = page_handler.page_recorder  # type:ignore[attr-defined]
+    if page_recorder is not None:
+        page_recorder.start_page()
+    timing = None
+    try:
+        title = re.sub(r"[\s\000-\037]+", " ", page.title)
+        title = title.strip()
+        if page.redirect_to is not None:
+            page_data = [
+                {
+                    "title": title,
+                    "redirect": page.redirect_to,
+                    "pos": "hard-redirect",
+                }
+            ]
+        else:
+            # XXX Sign gloss pages?
+            timer = wxr.page_timer
+            if timer is not None:
+                timer.start_page()
+            start_t = time.time()
+            page_data = parse_page(wxr, title, page.body)  # type: ignore[arg-type]
+            dur = time.time() - start_t
+            if dur > 100:
+                logger.warning(
+                    "====== WARNING: PARSING PAGE TOOK {:.1f}s: {}".format(
+                        dur, title
                     )
+                )
+            if timer is not None:
+                timing = timer.result(title, dur)
+            if page_recorder is not None and dur > wxr.config.bundle_seconds:
+                save_bundle(wxr, page, "slow", page_recorder.pages, dur)
 
-            return page_data, wxr.wtp.to_return()
-        except Exception:
-            wxr.wtp.error(
-                f'=== EXCEPTION while parsing page "{page.title}" '
-                f"in process {current_process().name}",
-                traceback.format_exc(),
-                "page_handler_exception",
+        # The data is checked here so that the parent process only writes it
+        validator: DataValidator = page_handler.validator  # type:ignore[attr-defined]
+        validator.check_page(wxr, page_data)
+        wtp_stats = wxr.wtp.to_return()
+        if len(wxr.config.debugs) > 0:
+            wtp_stats.setdefault("debugs", []).extend(wxr.config.debugs)
+            wxr.config.debugs.clear()
+        if timing is not None:
+            wtp_stats["timing"] = timing  # type: ignore[typeddict-unknown-key]
+        cache_reporter = page_handler.cache_reporter  # type:ignore[attr-defined]
+        if cache_reporter is not None:
+            wtp_stats["cache_stats"] = cache_reporter.end_page()  # type: ignore[typeddict-unknown-key]
+        return page_data, wtp_stats
+    except Exception:
+        wxr.wtp.error(
+            f'=== EXCEPTION while parsing page "{page.title}" '
+            f"in process {current_process().name}",
+            traceback.format_exc(),
+            "page_handler_exception",
+        )
+        if page_recorder is not None:
+            save_bundle(
+                wxr,
+                page,
+                "exception",
+                page_recorder.pages,
+                error=traceback.format_exc(),
             )
-            return [], wxr.wtp.to_return()
+        return [], wxr.wtp.to_return()
+    finally:
+        watchdog.end_page()
+        memory_profiler = page_handler.memory_profiler  # type:ignore[attr-defined]
+        if memory_profiler is not None:
+            memory_profiler.end_page()
+
+
+def shard_page_handler(
+    page: Page,
+) -> tuple[list[tuple[str, str, str]], CollatedErrorReturnData]:
+    """Like ``page_handler()``, but writes the extracted data to the output
+    shard of the worker process.  Only the (word, lang_code, pos) keys of
+    the written entries are returned to the parent process."""
+    out_f: TextIO = shard_page_handler.out_f  #  type:ignore[attr-defined]
+    page_data, wtp_stats = page_handler(page)
+    keys = write_checked_data(
+        page_data,
+        out_f,
+        shard_page_handler.human_readable,  #  type:ignore[attr-defined]
+    )
+    # Flush after every page so that only the current page is lost if the
+    # watchdog kills the process
+    out_f.flush()
+    return keys, wtp_stats
+
+
+def ordered_page_handler(
+    task: tuple[int, Page],
+) -> tuple[int, str, list[tuple[str, str, str]], CollatedErrorReturnData]:
+    """Like ``page_handler()``, but serializes the extracted data in the
+    worker process.  The sequence number of the page is returned
+    with the JSON lines so that the parent can write them in page order."""
+    seq, page = task
+    page_data, wtp_stats = page_handler(page)
+    out_f = io.StringIO()
+    keys = write_checked_data(
+        page_data,
+        out_f,
+        ordered_page_handler.human_readable,  #  type:ignore[attr-defined]
+    )
+    return seq, out_f.getvalue(), keys, wtp_stats
+
+
+def write_checked_data(
+    page_data: list[dict],
+    out_f: TextIO,
+    human_readable: bool,
+) -> list[tuple[str, str, str]]:
+    """Writes the data extracted from a page in a worker process, which
+    ``page_handler()`` has checked.  Returns the emitted (word, lang_code,
+    pos) keys."""
+    keys = []
+    for dt in page_data:
+        write_json_data(dt, out_f, human_readable)
+        key = emitted_key(dt)
+        if key is not None:
+            keys.append(key)
+    return keys
+
+
+def batch_page_handler(
+    batch: list[tuple[int, int]],
+) -> Iterator[tuple[int, Any, float]]:
+    """Processes a batch of (sequence number, page id) pairs, reading the
+    pages from the database in the worker process.  Yields the page id,
+    the result of the page handler and the time it took for each page."""
+    wxr: WiktextractContext = page_handler.wxr  #  type:ignore[attr-defined]
+    handler = batch_page_handler.handler  #  type:ignore[attr-defined]
+    pages = load_pages(wxr.wtp.db_conn, [page_id for _, page_id in batch])
+    for seq, page_id in batch:
+        start_t = time.time()
+        page = pages.pop(page_id)
+        if handler is ordered_page_handler:
+            result = handler((seq, page))
+        else:
+            result = handler(page)
+        yield page_id, result, time.time() - start_t
 
 
 def parse_wiktionary(
@@ -95,6 +234,7 @@ def parse_wiktionary(
     override_folders: list[str] | list[Path] | None = None,
     skip_extract_dump: bool = False,
     save_pages_path: str | Path = None,
+    error_sink: MessageSink | None = None,
 ) -> None:
     """Parses Wiktionary from the dump file ``path`` (which should point
     to a "enwiktionary-<date>-pages-articles.xml.bz2" file.  This
@@ -127,7 +267,9 @@ def parse_wiktionary(
     )
 
     if not phase1_only:
-        reprocess_wiktionary(wxr, num_processes, out_f, human_readable)
+        reprocess_wiktionary(
+            wxr, num_processes, out_f, human_readable, error_sink=error_sink
+        )
 
 
 def write_json_data(data: dict, out_f: TextIO, human_readable: bool) -> None:
@@ -141,6 +283,17 @@ def write_json_data(data: dict, out_f: TextIO, human_readable: bool) -> None:
         out_f.write("\n")
 
 
+def emitted_key(dt: dict) -> tuple[str, str, str] | None:
+    """Returns the (word, lang_code, pos) key used for finding words that
+    only occur in the Thesaurus namespace."""
+    word = dt.get("word")
+    lang_code = dt.get("lang_code")
+    pos = dt.get("pos")
+    if word and lang_code and pos:
+        return word, lang_code, pos
+    return None
+
+
 def estimate_progress(
     processed_pages: int, all_pages: int, start_time: float, last_time: float
 ) -> float:
@@ -166,563 +319,487 @@ def estimate_progress(
     return last_time
 
 
-def init_worker_process(worker_func, wxr: WiktextractContext) -> None:
+def init_worker_process(
+    worker_func, wxr: WiktextractContext, watchdog: PageWatchdog
+) -> None:
     wxr.reconnect_databases()
+    watchdog.attach()
+    if wxr.config.timing_stats_path is not None:
+        wxr.page_timer = PageTimer()
+        if not install_lua_timer(wxr.page_timer):
+            logger.warning("Lua time can't be measured")
     worker_func.wxr = wxr
+    worker_func.watchdog = watchdog
+    worker_func.validator = DataValidator(wxr.config.validate_every)
+    worker_func.cache_reporter = None
+    if collects_cache_stats(wxr):
+        worker_func.cache_reporter = CacheReporter(wxr.config.cache_stats_pages)
+    worker_func.page_recorder = None
+    if wxr.config.bundle_dir is not None:
+        worker_func.page_recorder = PageRecorder(wxr.wtp)
+    worker_func.memory_profiler = None
+    if wxr.config.memory_profile_dir is not None:
+        worker_func.memory_profiler = MemoryProfiler(
+            wxr.config.memory_profile_dir, wxr.config.memory_profile_pages
+        )
 
 
-def check_error(
+def merge_page_stats(
     wxr: WiktextractContext,
-    dt: dict,
-    word: str | None,
-    lang: str | None,
-    pos: str | None,
-    msg: str,
+    wtp_stats: CollatedErrorReturnData,
+    timing_log: PageTimingLog | None,
+    cache_stats: CacheStats | None = None,
 ) -> None:
-    """Formats and outputs an error message about data format checks."""
-    msg += ": " + json.dumps(dt, sort_keys=True, ensure_ascii=False)
-    prefix = word or ""
-    if lang:
-        prefix += "/" + lang
-    if pos:
-        prefix += "/" + pos
-    if prefix:
-        msg = prefix + ": " + msg
-    print(msg)
+    """Merges the messages returned for a page in the parent process and
+    saves the page's timing and cache statistics, if any."""
+    timing = wtp_stats.pop("timing", None)  # type: ignore[typeddict-item]
+    if timing is not None and timing_log is not None:
+        timing_log.add(timing)
+    cache_report = wtp_stats.pop("cache_stats", None)  # type: ignore[typeddict-item]
+    if cache_report is not None and cache_stats is not None:
+        cache_stats.add(cache_report)
+    wxr.config.merge_return(wtp_stats)
+
+
+def open_timing_log(wxr: WiktextractContext) -> PageTimingLog | None:
+    if wxr.config.timing_stats_path is None:
+        return None
+    return PageTimingLog(wxr.config.timing_stats_path)
+
+
+def close_timing_log(timing_log: PageTimingLog | None) -> None:
+    if timing_log is not None:
+        timing_log.log_report()
+        timing_log.close()
+
+
+def collects_cache_stats(wxr: WiktextractContext) -> bool:
+    """Returns whether the workers report the statistics of their caches,
+    which are needed for --cache-stats and the metrics."""
     config = wxr.config
-    if len(config.debugs) > 100000:  # Avoid excessive size
-        return
-    error_data: ErrorMessageData = {
-        "msg": msg,
-        "trace": "",
-        "title": word,
-        "section": lang,
-        "subsection": pos,
-        "called_from": "wiktionary/179/20240425",
-        "path": tuple(),
-    }
-    config.debugs.append(error_data)
+    return (
+        config.cache_stats_path is not None
+        or config.metrics_textfile_path is not None
+        or config.metrics_port is not None
+    )
 
 
-def check_tags(
+def create_cache_stats(wxr: WiktextractContext) -> CacheStats | None:
+    return CacheStats() if collects_cache_stats(wxr) else None
+
+
+def close_cache_stats(
+    wxr: WiktextractContext, cache_stats: CacheStats | None
+) -> None:
+    path = wxr.config.cache_stats_path
+    if cache_stats is not None and path is not None:
+        cache_stats.log_report()
+        cache_stats.write(path)
+
+
+def create_metrics(
     wxr: WiktextractContext,
-    dt: dict,
-    word: str,
-    lang: str,
-    pos: str,
-    item: dict,
+    num_pages: int,
+    cache_stats: CacheStats | None = None,
+) -> ProgressMetrics | None:
+    config = wxr.config
+    if config.metrics_textfile_path is None and config.metrics_port is None:
+        return None
+    metrics = ProgressMetrics(
+        config.metrics_textfile_path,
+        config.metrics_port,
+        config.metrics_interval,
+        cache_stats,
+    )
+    metrics.pages_selected = num_pages
+    return metrics
+
+
+def init_writer_worker_process(
+    worker_func,
+    wxr: WiktextractContext,
+    watchdog: PageWatchdog,
+    human_readable: bool,
+    out_shards_dir: Path | None,
 ) -> None:
-    assert isinstance(item, dict)
-    tags = item.get("tags")
-    if tags is None:
-        return
-    if not isinstance(tags, (list, tuple)):
-        check_error(
-            wxr,
-            dt,
-            word,
-            lang,
-            pos,
-            '"tags" field value must be a list of strings: {}'.format(
-                repr(tags)
-            ),
-        )
-        return
-    for tag in tags:
-        if not isinstance(tag, str):
-            check_error(
-                wxr,
-                dt,
-                word,
-                lang,
-                pos,
-                '"tags" field should only contain strings: {}'.format(
-                    repr(tag)
-                ),
-            )
-            continue
-        # XXX enable the following later (currently too many bogus tags in
-        # non-English editions).  Tag values should be standardized across
-        # editions, except for uppercase tags (e.g., regional variants).
-        if wxr.wtp.lang_code in ("en",):  # Check edition
-            from .tags import valid_tags
-
-            if tag not in valid_tags:
-                check_error(
-                    wxr,
-                    dt,
-                    word,
-                    lang,
-                    pos,
-                    "invalid tag {} not in valid_tags (or "
-                    "uppercase_tags)".format(repr(tag)),
-                )
+    """Initializes a worker process that serializes the extracted data
+    itself (``shard_page_handler()`` or ``ordered_page_handler()``)."""
+    init_worker_process(page_handler, wxr, watchdog)
+    worker_func.human_readable = human_readable
+    if out_shards_dir is not None:
+        worker_func.out_f = open_out_shard(out_shards_dir)
+
+
+def init_batch_worker_process(handler, initializer, initargs: tuple) -> None:
+    """Initializes a worker process running ``batch_page_handler()`` which
+    calls ``handler`` for each page."""
+    initializer(*initargs)
+    batch_page_handler.handler = handler  # type:ignore[attr-defined]
 
 
-def check_str_fields(
+def create_watchdog(
     wxr: WiktextractContext,
-    dt: dict,
-    word: str,
-    lang: str,
-    pos: str,
-    item: dict,
-    fields: list[str],
-    mandatory: bool = False,
-    empty_ok: bool = False,
+    num_processes: int | None,
+    start_method: str | None = None,
+) -> PageWatchdog:
+    """Creates the watchdog of worker processes that are started or
+    replaced with ``start_method`` (see ``WorkerPool``)."""
+    # Twice the number of workers, because a replaced worker's slot is only
+    # freed when the new worker process claims it
+    return PageWatchdog(
+        2 * (num_processes or os.cpu_count() or 1),
+        wxr.config.hung_page_warning_seconds,
+        wxr.config.hung_page_kill_seconds,
+        context=multiprocessing.get_context(start_method),
+    )
+
+
+def lost_page_error(
+    wxr: WiktextractContext, title: str, lost: LostTask
 ) -> None:
-    """Checks that each of the listed fields contains a non-empty string.
-    Non-existent fields are ok unless ``mandatory`` is True."""
-    assert isinstance(item, dict)
-    for field in fields:
-        v = item.get(field)
-        if v is None:
-            if mandatory:
-                check_error(
-                    wxr,
-                    dt,
-                    word,
-                    lang,
-                    pos,
-                    "{!r} should be a{} string (it is a "
-                    "mandatory field): {}".format(
-                        field,
-                        "" if empty_ok else " non-empty",
-                        json.dumps(item, sort_keys=True),
-                    ),
-                )
-            continue
-        if not isinstance(v, str):
-            check_error(
-                wxr,
-                dt,
-                word,
-                lang,
-                pos,
-                "{!r} should be a{} string: {}".format(
-                    field,
-                    "" if empty_ok else " non-empty",
-                    json.dumps(item, sort_keys=True),
-                ),
-            )
-        if not v and not empty_ok:
-            check_error(
-                wxr,
-                dt,
-                word,
-                lang,
-                pos,
-                "{!r} should contain a non-empty string: {}".format(
-                    field, json.dumps(item, sort_keys=True)
-                ),
-            )
+    """Records an error for a page whose worker process died or was killed
+    by the watchdog before returning the page's data."""
+    msg = (
+        f"=== Worker process {lost.pid} exited with code {lost.exitcode} "
+        f'while parsing page "{title}"'
+    )
+    logger.error(msg)
+    error_data: ErrorMessageData = {
+        "msg": msg,
+        "trace": "",
+        "title": title,
+        "section": None,
+        "subsection": None,
+        "called_from": "wiktionary/473/20261017",
+        "path": tuple(),
+    }
+    wxr.config.errors.append(error_data)
 
 
-def check_dict_list_fields(
+def handle_lost_task(
     wxr: WiktextractContext,
-    dt: dict,
-    word: str,
-    lang: str,
-    pos: str,
-    item: dict,
-    fields: list[str],
+    pool: WorkerPool,
+    lost: LostTask,
+    reorder_buffer: ReorderBuffer | None,
+    checkpoint: Checkpoint | None,
+    batched: bool,
 ) -> bool:
-    """Checks that each listed field, if present, is a list of dicts."""
-    assert isinstance(item, dict)
-    for field in fields:
-        lst = item.get(field)
-        if lst is None:
-            continue
-        if not isinstance(lst, (list, tuple)):
-            check_error(
-                wxr,
-                dt,
-                word,
-                lang,
-                pos,
-                "{!r} should be a list of dicts: {}".format(
-                    field, json.dumps(lst, sort_keys=True)
-                ),
-            )
+    """Records an error for the page that was being processed when a worker
+    process died and saves its bundle if bundles are enabled.  If
+    ``batched``, the task was a batch of page ids (``batch_page_handler()``)
+    and the rest of it is resubmitted.  Returns False if no page was lost
+    because the worker died after returning the results of the whole
+    batch."""
+    page: Page | None
+    if batched:
+        batch: list[tuple[int, int]] = lost.task
+        if lost.num_results >= len(batch):
             return False
-        for x in lst:
-            if not isinstance(x, dict):
-                check_error(
-                    wxr,
-                    dt,
-                    word,
-                    lang,
-                    pos,
-                    "{!r} should be a list of dicts: {}".format(
-                        field, json.dumps(lst, sort_keys=True)
-                    ),
-                )
-                return False
+        seq, page_id = batch[lost.num_results]
+        title = get_page_title(wxr.wtp.db_conn, page_id)
+        page = None
+        if wxr.config.bundle_dir is not None:
+            page = load_pages(wxr.wtp.db_conn, [page_id]).get(page_id)
+        if lost.num_results + 1 < len(batch):
+            pool.resubmit(batch[lost.num_results + 1 :])
+        if checkpoint is not None:
+            # Not retried when resuming, like in an uninterrupted run
+            checkpoint.add_page(seq, page_id, [])
+    elif reorder_buffer is not None:
+        seq, page = lost.task
+        title = page.title  # type: ignore[union-attr]
+    else:
+        seq = 0
+        page = lost.task
+        title = lost.task.title
+    if reorder_buffer is not None:
+        reorder_buffer.add(seq, "")
+    lost_page_error(wxr, title, lost)
+    if wxr.config.bundle_dir is not None and page is not None:
+        # The pages that the worker process read are lost with it, so the
+        # bundle only has the pages referred to in the text
+        save_bundle(wxr, page, "lost")
     return True
 
 
-def check_str_list_fields(
+def select_page_ids(
     wxr: WiktextractContext,
-    dt: dict,
-    word: str,
-    lang: str,
-    pos: str,
-    item: dict,
-    fields: list[str],
-) -> None:
-    """Checks that each of the listed fields contains a list of non-empty
-    strings or is not present."""
-    assert isinstance(item, dict)
-    for field in fields:
-        lst = item.get(field)
-        if lst is None:
-            continue
-        if not isinstance(lst, (list, tuple)):
-            check_error(
-                wxr,
-                dt,
-                word,
-                lang,
-                pos,
-                "{!r} should be a list of dicts: {}".format(
-                    field, json.dumps(item, sort_keys=True)
-                ),
-            )
-            continue
-        for x in lst:
-            if not isinstance(x, str) or not x:
-                check_error(
-                    wxr,
-                    dt,
-                    word,
-                    lang,
-                    pos,
-                    "{!r} should be a list of non-empty strings: {}".format(
-                        field, json.dumps(item, sort_keys=True)
-                    ),
-                )
-                break
+    namespace_ids: list[int],
+    search_pattern: str | None,
+    largest_first: bool,
+) -> array:
+    """Returns the ids of the pages processed in the second phase sorted by
+    title or by body size, largest first.  With ``config.shard``, only the
+    pages of that shard are returned."""
+    shard = wxr.config.shard
+    page_ids, sizes = select_page_sizes(
+        wxr.wtp.db_conn,
+        namespace_ids,
+        True,
+        "wikitext",
+        search_pattern,
+        largest_first=largest_first or shard is not None,
+    )
+    if shard is None:
+        return page_ids
+    page_ids = shard_page_ids(page_ids, sizes, shard[0], shard[1])
+    if largest_first:
+        return page_ids
+    in_shard = bytearray(max(page_ids, default=0) + 1)
+    for page_id in page_ids:
+        in_shard[page_id] = 1
+    page_ids, _ = select_page_sizes(
+        wxr.wtp.db_conn, namespace_ids, True, "wikitext", search_pattern
+    )
+    return array(
+        "q",
+        (
+            page_id
+            for page_id in page_ids
+            if page_id < len(in_shard) and in_shard[page_id]
+        ),
+    )
 
 
-def check_json_data(wxr: WiktextractContext, dt: dict) -> None:
-    """Performs some basic checks on the generated data."""
-    word = dt.get("word", dt.get("title"))
-    if word is None:
-        check_error(
-            wxr,
-            dt,
-            None,
-            None,
-            None,
-            'missing "word" or "title" field in data',
-        )
-        return
-    if "title" in dt:
-        return  # redirect pages don't have following fields
-    lang = dt.get("lang")
-    if not lang:
-        check_error(wxr, dt, word, None, None, 'missing "lang" field in data')
-        return
-    pos = dt.get("pos")
-    if not pos:
-        check_error(wxr, dt, word, lang, pos, 'missing "pos" field in data')
-        return
-    if not dt.get("lang_code"):
-        check_error(
-            wxr, dt, word, lang, pos, 'missing "lang_code" field in data'
-        )
-    check_tags(wxr, dt, word, lang, pos, dt)
-    check_str_fields(wxr, dt, word, lang, pos, dt, ["etymology_text"])
-    num = dt.get("etymology_number")
-    if num is not None and not isinstance(num, int):
-        check_error(
-            wxr, dt, word, lang, pos, '"etymology_number" must be an int'
-        )
-    # Check that certain fields, if present, contain lists of dicts
-    if not check_dict_list_fields(
-        wxr,
-        dt,
-        word,
-        lang,
-        pos,
-        dt,
-        [
-            "forms",
-            "senses",
-            "synonyms",
-            "antonyms",
-            "hypernyms",
-            "holonyms",
-            "meronyms",
-            "coordinate_terms",
-            "derived",
-            "related",
-            "sounds",
-            "translations",
-            "descendants",
-            "etymology_templates",
-            "head_templates",
-            "inflection_templates",
-        ],
-    ):
-        return  # Avoid further processing because it would cause type errors
-    # Check the "forms" field
-    forms = dt.get("forms") or []
-    for form in forms:
-        check_tags(wxr, dt, word, lang, pos, form)
-        tags = dt.get("tags")
-        if not isinstance(tags, (list, tuple)) or "table-tags" not in tags:
-            check_str_fields(
-                wxr, dt, word, lang, pos, form, ["form"], mandatory=True
-            )
-    check_str_list_fields(
-        wxr,
-        dt,
-        word,
-        lang,
-        pos,
-        dt,
-        ["categories", "topics", "wikidata", "wikipedia"],
-    )
-    # Check the "senses" field
-    senses = dt.get("senses") or []
-    if not senses:
-        check_error(
-            wxr,
-            dt,
-            word,
-            lang,
-            pos,
-            'missing "senses" in data (must have at least one '
-            'sense, add empty sense with "no-gloss" tag if none '
-            "otherwise available)",
+def get_selected_pages(
+    wxr: WiktextractContext,
+    namespace_ids: list[int],
+    search_pattern: str | None,
+    page_ids: array | None = None,
+) -> Iterator[Page]:
+    """Yields the pages processed in the second phase in the order given by
+    ``config.page_order``.  Sorting by size, largest first, keeps the
+    slowest pages from ending up as the last tasks of the run.  Unless
+    ``page_ids`` are given, they are queried when the first page is
+    requested."""
+    if page_ids is None:
+        page_ids = select_page_ids(
+            wxr, namespace_ids, search_pattern, wxr.config.page_order == "size"
         )
-        return
-    for sense in senses:
-        check_str_list_fields(
-            wxr, dt, word, lang, pos, sense, ["glosses", "raw_glosses"]
+    yield from get_pages_by_ids(wxr.wtp.db_conn, page_ids)
+
+
+def page_id_batches(
+    wxr: WiktextractContext,
+    namespace_ids: list[int],
+    search_pattern: str | None,
+    sizer: BatchSizer,
+    done_pages: bytearray | None = None,
+    page_ids: array | None = None,
+) -> Iterator[list[tuple[int, int]]]:
+    """Yields batches of (sequence number, page id) pairs of the pages
+    processed in the second phase.  Sequence numbers follow the title order
+    of the pages.  The size of each batch is chosen by ``sizer``.  Pages
+    marked in ``done_pages`` (see ``Checkpoint.done_pages()``) are skipped.
+    Unless ``page_ids`` are given, they are queried when the first batch is
+    requested."""
+    if page_ids is None:
+        page_ids = select_page_ids(
+            wxr, namespace_ids, search_pattern, wxr.config.page_order == "size"
         )
-        # Extra check: should have no-gloss tag if no glosses
-        for field in ("glosses", "raw_glosses"):
-            glosses = sense.get(field) or []
-            if (
-                not glosses
-                and isinstance(sense.get("tags"), str)
-                and "no-gloss" not in sense.get("tags", "").split()
-            ):
-                check_error(
-                    wxr,
-                    dt,
-                    word,
-                    lang,
-                    pos,
-                    "{!r} should have at least one gloss or "
-                    '"no-gloss" in "tags"'.format(field),
-                )
-                continue
-        check_tags(wxr, dt, word, lang, pos, sense)
-        check_str_list_fields(
-            wxr,
-            dt,
-            word,
-            lang,
-            pos,
-            sense,
-            ["categories", "topics", "wikidata", "wikipedia"],
+    if done_pages is not None:
+        page_ids = array(
+            "q",
+            (
+                page_id
+                for page_id in page_ids
+                if page_id >= len(done_pages) or not done_pages[page_id]
+            ),
         )
-        check_str_fields(wxr, dt, word, lang, pos, sense, ["english"])
-        if not check_dict_list_fields(
-            wxr,
-            dt,
-            word,
-            lang,
-            pos,
-            sense,
-            [
-                "alt_of",
-                "form_of",
-                "synonyms",
-                "antonyms",
-                "hypernyms",
-                "holonyms",
-                "meronyms",
-                "coordinate_terms",
-                "derived",
-                "related",
-            ],
-        ):
-            continue
-        for field in ("alt_of", "form_of"):
-            lst = sense.get(field)
-            if lst is None:
-                continue
-            for item in lst:
-                check_str_fields(
-                    wxr, dt, word, lang, pos, item, ["word"], mandatory=True
-                )
-                check_str_fields(
-                    wxr, dt, word, lang, pos, item, ["extra"], mandatory=False
-                )
+    yield from split_batches(page_ids, sizer)
 
-        for field in (
-            "synonyms",
-            "antonyms",
-            "hypernyms",
-            "holonyms",
-            "meronyms",
-            "coordinate_terms",
-            "derived",
-            "related",
-        ):
-            lst = sense.get(field)
-            if lst is None:
-                continue
-            for item in lst:
-                check_str_fields(
-                    wxr, dt, word, lang, pos, item, ["word"], mandatory=True
-                )
-                check_tags(wxr, dt, word, lang, pos, item)
-                check_str_fields(
-                    wxr,
-                    dt,
-                    word,
-                    lang,
-                    pos,
-                    item,
-                    ["english", "roman", "sense", "taxonomic"],
-                    mandatory=False,
-                    empty_ok=True,
-                )
-                check_str_list_fields(
-                    wxr, dt, word, lang, pos, item, ["topics"]
-                )
-    # Check the "sounds" field
-    # We will permit having any number of different types (ipa, enpr, etc)
-    # in the same sound entry or in different sound entries.
-    sounds = dt.get("sounds") or []
-    for item in sounds:
-        check_str_fields(
-            wxr,
-            dt,
-            word,
-            lang,
-            pos,
-            item,
-            ["ipa", "enpr", "audio", "ogg_url", "mp3_url", "audio-ipa", "text"],
-        )
-        check_tags(wxr, dt, word, lang, pos, item)
-        check_str_list_fields(
-            wxr, dt, word, lang, pos, item, ["homophones", "hyphenation"]
+
+def split_batches(
+    page_ids: array, sizer: BatchSizer
+) -> Iterator[list[tuple[int, int]]]:
+    """Yields batches of (sequence number, page id) pairs, the size of each
+    batch chosen by ``sizer`` when the batch is requested."""
+    start = 0
+    while start < len(page_ids):
+        end = min(start + sizer.size(), len(page_ids))
+        yield [(seq, page_ids[seq]) for seq in range(start, end)]
+        start = end
+
+
+def job_owner() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def coordinate_jobs(
+    wxr: WiktextractContext,
+    namespace_ids: list[int],
+    out_f: TextIO,
+    human_readable: bool,
+    search_pattern: str | None,
+    error_sink: MessageSink | None = None,
+) -> None:
+    """Publishes the pages of the second phase as jobs in the job queue,
+    waits until ``wiktwords --worker`` processes have done all jobs and
+    merges their output.  If the jobs were already published, e.g. by an
+    earlier coordinator that was interrupted, only waits and merges."""
+    queue_path: Path = wxr.config.job_queue_path  # type: ignore[assignment]
+    queue = JobQueue(queue_path)
+    if queue.is_published():
+        logger.info(f"Jobs have already been published in {queue_path}")
+    else:
+        job_output_dir(queue_path).mkdir(parents=True, exist_ok=True)
+        page_ids = select_page_ids(
+            wxr, namespace_ids, search_pattern, wxr.config.page_order == "size"
         )
-    # Check the "translations" field
-    translations = dt.get("translations") or []
-    for item in translations:
-        check_str_fields(
-            wxr, dt, word, lang, pos, item, ["word"], mandatory=True
+        size = wxr.config.job_size
+        num_jobs = queue.publish(
+            page_ids[start : start + size]
+            for start in range(0, len(page_ids), size)
         )
-        check_tags(wxr, dt, word, lang, pos, item)
-        check_str_fields(
-            wxr,
-            dt,
-            word,
-            lang,
-            pos,
-            item,
-            [
-                "alt",
-                "code",
-                "english",
-                "lang",
-                "note",
-                "roman",
-                "sense",
-                "taxonomic",
-            ],
+        logger.info(
+            f"Published {len(page_ids)} pages as {num_jobs} jobs "
+            f"in {queue_path}"
         )
-        if not item.get("code") and not item.get("lang"):
-            check_error(
-                wxr,
-                dt,
-                word,
-                lang,
-                pos,
-                '"translations" items must contain at least one '
-                'of "code" and "lang" (normally both): {}'.format(
-                    json.dumps(item, sort_keys=True, ensure_ascii=False)
-                ),
-            )
-    # Check the "etymology_templates", "head_templates", and
-    # "inflection_templates" fields
-    for field in [
-        "etymology_templates",
-        "head_templates",
-        "inflection_templates",
-    ]:
-        lst = dt.get(field)
-        if lst is None:
-            continue
-        for item in lst:
-            check_str_fields(
-                wxr, dt, word, lang, pos, item, ["name"], mandatory=True
-            )
-            check_str_fields(
-                wxr,
-                dt,
-                word,
-                lang,
-                pos,
-                item,
-                ["expansion"],
-                # empty_ok=True because there are some templates
-                # that generate empty expansions.
-                mandatory=False,
-                empty_ok=True,
+    last_counts = None
+    while not queue.all_done():
+        counts = queue.job_counts()
+        if counts != last_counts:
+            logger.info(
+                "  ... jobs: {} pending, {} leased, {} done".format(*counts)
             )
-            args = item.get("args")
-            if args is None:
-                continue
-            if not isinstance(args, dict):
-                check_error(
+            last_counts = counts
+        time.sleep(wxr.config.job_poll_seconds)
+    logger.info("All jobs done, merging their output")
+    out_dir = job_output_dir(queue_path)
+    for output in queue.done_job_outputs():
+        with (out_dir / output).open(encoding="utf-8") as f:
+            shutil.copyfileobj(f, out_f)
+    for kind in MESSAGE_KINDS:
+        if error_sink is not None:
+            error_sink.add(kind, queue.messages(kind))
+        else:
+            getattr(wxr.config, kind).extend(queue.messages(kind))
+    if wxr.config.dump_file_lang_code == "en":
+        emit_words_in_thesaurus(
+            wxr, set(queue.emitted_keys()), out_f, human_readable
+        )
+    queue.close()
+
+
+def process_jobs(
+    wxr: WiktextractContext,
+    num_processes: int | None,
+    human_readable: bool,
+) -> None:
+    """Claims jobs from the job queue and processes them until all jobs are
+    done (``wiktwords --worker``).  When there is nothing to claim, waits
+    for the jobs to be published or for the lease of some other worker to
+    expire."""
+    queue = JobQueue(wxr.config.job_queue_path)  # type: ignore[arg-type]
+    owner = job_owner()
+    timing_log = open_timing_log(wxr)
+    cache_stats = create_cache_stats(wxr)
+    wxr.remove_unpicklable_objects()
+    start_method, replacement_start_method = prepare_workers(wxr)
+    watchdog = create_watchdog(wxr, num_processes, replacement_start_method)
+    sizer = BatchSizer()
+    pool = WorkerPool(
+        num_processes,
+        batch_page_handler,
+        init_batch_worker_process,
+        (page_handler, init_worker_process, (page_handler, wxr, watchdog)),
+        stream_results=True,
+        max_results=wxr.config.worker_max_pages,
+        max_rss=wxr.config.worker_max_rss,
+        profile_dir=wxr.config.profile_dir,
+        profile_every=wxr.config.profile_every,
+        start_method=start_method,
+        replacement_start_method=replacement_start_method,
+    )
+    with pool:
+        wxr.reconnect_databases(False)
+        workers_started(pool)
+        watchdog.start()
+        try:
+            while True:
+                job = queue.claim(owner, wxr.config.job_lease_seconds)
+                if job is None:
+                    if queue.all_done():
+                        break
+                    time.sleep(wxr.config.job_poll_seconds)
+                    continue
+                process_job(
                     wxr,
-                    dt,
-                    word,
-                    lang,
-                    pos,
-                    '{!r} item "args" value must be a dict: {}'.format(
-                        field, json.dumps(args, sort_keys=True)
-                    ),
+                    pool,
+                    queue,
+                    owner,
+                    job,
+                    sizer,
+                    human_readable,
+                    timing_log,
+                    cache_stats,
                 )
-                continue
-            for k, v in args.items():
-                if not isinstance(k, str) or not isinstance(v, str):
-                    check_error(
-                        wxr,
-                        dt,
-                        word,
-                        lang,
-                        pos,
-                        '{!r} item "args" must be a dict with '
-                        "string keys and values: {}".format(
-                            field, json.dumps(args, sort_keys=True)
-                        ),
-                    )
-                continue
-    # Check the "descendants" field
-    descendants = dt.get("descendants") or []
-    for item in descendants:
-        check_str_fields(wxr, dt, word, lang, pos, item, ["text"])
-        depth = item.get("depth")
-        if depth is not None and not isinstance(depth, int):
-            check_error(
-                wxr,
-                dt,
-                word,
-                lang,
-                pos,
-                '"descentants" field "depth" must be an int',
-            )
-        check_dict_list_fields(wxr, dt, word, lang, pos, item, ["templates"])
-        # XXX should check that they are valid templates, perhaps turn
-        # template checking code above into a function
+            log_worker_memory(pool, "at end")
+        finally:
+            watchdog.stop()
+    queue.close()
+    close_timing_log(timing_log)
+    close_cache_stats(wxr, cache_stats)
+    logger.info("No more jobs")
+
+
+def process_job(
+    wxr: WiktextractContext,
+    pool: WorkerPool,
+    queue: JobQueue,
+    owner: str,
+    job: tuple[int, array],
+    sizer: BatchSizer,
+    human_readable: bool,
+    timing_log: PageTimingLog | None,
+    cache_stats: CacheStats | None = None,
+) -> None:
+    """Processes the pages of a job, writing their data to an output file
+    of this worker that is recorded in the queue when the job is complete.
+    The lease is renewed by a thread while the job is processed."""
+    job_id, page_ids = job
+    logger.info(f"Processing job {job_id} ({len(page_ids)} pages)")
+    config = wxr.config
+    out_path = job_output_path(queue.db_path, job_id, owner)
+    emitted = set()
+    renewer = LeaseRenewer(
+        queue.db_path, job_id, owner, config.job_lease_seconds
+    )
+    renewer.start()
+    try:
+        with out_path.open(
+            "w", buffering=1024 * 1024, encoding="utf-8"
+        ) as out_f:
+            # The rest of the job is processed even if the lease has been
+            # lost, because tasks given to the pool can't be cancelled
+            for result in pool.imap_unordered(split_batches(page_ids, sizer)):
+                if isinstance(result, LostTask):
+                    handle_lost_task(wxr, pool, result, None, None, True)
+                    continue
+                _, (page_data, wtp_stats), dur = result
+                sizer.add(dur)
+                merge_page_stats(wxr, wtp_stats, timing_log, cache_stats)
+                for dt in page_data:
+                    write_json_data(dt, out_f, human_readable)
+                    key = emitted_key(dt)
+                    if key is not None:
+                        emitted.add(key)
+            out_f.flush()
+            os.fsync(out_f.fileno())
+    finally:
+        have_lease = renewer.stop()
+    # The messages of each job are saved in the queue
+    messages = {}
+    for kind in MESSAGE_KINDS:
+        messages[kind] = list(getattr(config, kind))
+        getattr(config, kind).clear()
+    if have_lease and queue.complete(
+        job_id, owner, emitted, messages, out_path.name
+    ):
+        logger.info(f"Job {job_id} done")
+    else:
+        out_path.unlink(missing_ok=True)
+        logger.warning(f"Lease of job {job_id} was lost, output discarded")
 
 
 def reprocess_wiktionary(
@@ -731,10 +808,17 @@ def reprocess_wiktionary(
     out_f: TextIO,
     human_readable: bool = False,
     search_pattern: str | None = None,
+    error_sink: MessageSink | None = None,
 ) -> None:
-    """Reprocesses the Wiktionary from the sqlite db."""
+    """Reprocesses the Wiktionary from the sqlite db.  With ``error_sink``,
+    messages are moved from ``wxr.config`` to it as results arrive."""
     logger.info("Second phase - processing pages")
 
+    if wxr.config.job_queue_path is not None and wxr.config.job_worker:
+        # The thesaurus has been extracted by the coordinator
+        process_jobs(wxr, num_processes, human_readable)
+        return
+
     # Extract thesaurus data. This iterates over thesaurus pages,
     # but is very fast.
     if (
@@ -750,36 +834,236 @@ def reprocess_wiktionary(
             for ns in wxr.config.extract_ns_names
         }
     )
+    if wxr.config.job_queue_path is not None:
+        coordinate_jobs(
+            wxr,
+            process_ns_ids,
+            out_f,
+            human_readable,
+            search_pattern,
+            error_sink,
+        )
+        return
     start_time = time.time()
     last_time = start_time
     all_page_nums = wxr.wtp.saved_page_nums(
         process_ns_ids, True, "wikitext", search_pattern
     )
+    shard_ids = None
+    if wxr.config.shard is not None:
+        # Selected here to know the number of pages in this shard
+        shard_ids = select_page_ids(
+            wxr,
+            process_ns_ids,
+            search_pattern,
+            wxr.config.page_order == "size",
+        )
+        all_page_nums = shard_page_nums = len(shard_ids)
+        logger.info(
+            "Processing shard {}/{}: {} pages".format(
+                *wxr.config.shard, shard_page_nums
+            )
+        )
+    out_shards_dir = wxr.config.out_shards_dir
+    if out_shards_dir is not None:
+        remove_out_shards(out_shards_dir)
+    checkpoint = None
+    done_pages = None
+    if wxr.config.checkpoint_path is not None:
+        # Results must come with their page ids
+        assert wxr.config.batch_pages
+        checkpoint = Checkpoint(
+            wxr.config.checkpoint_path, wxr.config.checkpoint_interval
+        )
+        if wxr.config.resume:
+            checkpoint.restore(wxr.config, emitted, out_f, error_sink)
+            done_pages = checkpoint.done_pages()
+            all_page_nums -= checkpoint.num_done_pages()
+        else:
+            checkpoint.clear()
+    if wxr.config.page_order == "size" or shard_ids is not None:
+        pages = get_selected_pages(
+            wxr, process_ns_ids, search_pattern, shard_ids
+        )
+    else:
+        pages = wxr.wtp.get_all_pages(
+            process_ns_ids, True, "wikitext", search_pattern
+        )
+    timing_log = open_timing_log(wxr)
+    cache_stats = create_cache_stats(wxr)
     wxr.remove_unpicklable_objects()
-    with Pool(num_processes, init_worker_process, (page_handler, wxr)) as pool:
+    start_method, replacement_start_method = prepare_workers(wxr)
+    watchdog = create_watchdog(wxr, num_processes, replacement_start_method)
+    reorder_buffer = None
+    if out_shards_dir is not None:
+        # Each worker checks and writes its own output file, the parent
+        # process only collects statistics and the emitted keys
+        handler = shard_page_handler
+        initializer = init_writer_worker_process
+        initargs: tuple = (
+            shard_page_handler,
+            wxr,
+            watchdog,
+            human_readable,
+            out_shards_dir,
+        )
+        tasks: Iterable = pages
+    elif wxr.config.ordered_output:
+        # Pages come from the database sorted by title.  Workers return
+        # serialized data with the page's sequence number and the reorder
+        # buffer writes it in that order.
+        reorder_buffer = ReorderBuffer(out_f, wxr.config.max_buffered_bytes)
+        handler = ordered_page_handler
+        initializer = init_writer_worker_process
+        initargs = (ordered_page_handler, wxr, watchdog, human_readable, None)
+        tasks = enumerate(pages)
+    else:
+        handler = page_handler
+        initializer = init_worker_process
+        initargs = (page_handler, wxr, watchdog)
+        tasks = pages
+    batch_sizer = None
+    if wxr.config.batch_pages:
+        # Only page ids are sent to the workers, which read the pages from
+        # the database themselves
+        batch_sizer = BatchSizer()
+        tasks = page_id_batches(
+            wxr,
+            process_ns_ids,
+            search_pattern,
+            batch_sizer,
+            done_pages,
+            shard_ids,
+        )
+        pool = WorkerPool(
+            num_processes,
+            batch_page_handler,
+            init_batch_worker_process,
+            (handler, initializer, initargs),
+            stream_results=True,
+            max_results=wxr.config.worker_max_pages,
+            max_rss=wxr.config.worker_max_rss,
+            profile_dir=wxr.config.profile_dir,
+            profile_every=wxr.config.profile_every,
+            start_method=start_method,
+            replacement_start_method=replacement_start_method,
+        )
+    else:
+        pool = WorkerPool(
+            num_processes,
+            handler,
+            initializer,
+            initargs,
+            max_results=wxr.config.worker_max_pages,
+            max_rss=wxr.config.worker_max_rss,
+            profile_dir=wxr.config.profile_dir,
+            profile_every=wxr.config.profile_every,
+            start_method=start_method,
+            replacement_start_method=replacement_start_method,
+        )
+    # Threads of this process are only started once the workers have been
+    # forked (see preload.py)
+    metrics = create_metrics(wxr, all_page_nums, cache_stats)
+    with pool:
         wxr.reconnect_databases(False)
-        for processed_pages, (page_data, wtp_stats) in enumerate(
-            pool.imap_unordered(
-                page_handler,
-                wxr.wtp.get_all_pages(
-                    process_ns_ids, True, "wikitext", search_pattern
-                ),
-            )
-        ):
-            wxr.config.merge_return(wtp_stats)
-            for dt in page_data:
-                check_json_data(wxr, dt)
-                write_json_data(dt, out_f, human_readable)
-                word = dt.get("word")
-                lang_code = dt.get("lang_code")
-                pos = dt.get("pos")
-                if word and lang_code and pos:
-                    emitted.add((word, lang_code, pos))
-            last_time = estimate_progress(
-                processed_pages, all_page_nums, start_time, last_time
+        workers_started(pool)
+        watchdog.start()
+        try:
+            for processed_pages, result in enumerate(
+                pool.imap_unordered(
+                    tasks,
+                    reorder_buffer.is_full
+                    if reorder_buffer is not None
+                    else None,
+                )
+            ):
+                if isinstance(result, LostTask):
+                    if (
+                        handle_lost_task(
+                            wxr,
+                            pool,
+                            result,
+                            reorder_buffer,
+                            checkpoint,
+                            wxr.config.batch_pages,
+                        )
+                        and metrics is not None
+                    ):
+                        metrics.add_lost_page()
+                    continue
+                if batch_sizer is not None:
+                    page_id, result, dur = result
+                    batch_sizer.add(dur)
+                seq = 0
+                if out_shards_dir is not None:
+                    keys, wtp_stats = result
+                    merge_page_stats(wxr, wtp_stats, timing_log, cache_stats)
+                elif reorder_buffer is not None:
+                    seq, text, keys, wtp_stats = result
+                    merge_page_stats(wxr, wtp_stats, timing_log, cache_stats)
+                    reorder_buffer.add(seq, text)
+                else:
+                    page_data, wtp_stats = result
+                    merge_page_stats(wxr, wtp_stats, timing_log, cache_stats)
+                    keys = []
+                    for dt in page_data:
+                        write_json_data(dt, out_f, human_readable)
+                        key = emitted_key(dt)
+                        if key is not None:
+                            keys.append(key)
+                emitted.update(keys)
+                if error_sink is not None:
+                    error_sink.drain(wxr.config)
+                if metrics is not None:
+                    metrics.add_page(len(keys), wtp_stats)
+                    metrics.maybe_export(pool, out_f, reorder_buffer)
+                if checkpoint is not None:
+                    checkpoint.add_page(seq, page_id, keys)
+                    checkpoint.maybe_save(
+                        wxr.config,
+                        out_f,
+                        reorder_buffer.next_seq
+                        if reorder_buffer is not None
+                        else None,
+                        error_sink,
+                    )
+                last_time = estimate_progress(
+                    processed_pages, all_page_nums, start_time, last_time
+                )
+            log_worker_memory(pool, "at end")
+        finally:
+            watchdog.stop()
+    if pool.num_recycled > 0:
+        logger.info(f"Recycled {pool.num_recycled} worker processes")
+    close_timing_log(timing_log)
+    close_cache_stats(wxr, cache_stats)
+    if metrics is not None:
+        metrics.close(out_f)
+    if reorder_buffer is not None:
+        reorder_buffer.log_stats()
+    if checkpoint is not None:
+        checkpoint.save(wxr.config, out_f, error_sink=error_sink)
+        checkpoint.close()
+    if out_shards_dir is not None and out_f is not None:
+        logger.info(f"Concatenating output shards from {out_shards_dir}")
+        concatenate_out_shards(out_shards_dir, out_f)
+    if wxr.config.shard is not None:
+        # Thesaurus words are emitted when merging the shards
+        if wxr.config.shard_manifest_path is not None:
+            write_shard_manifest(
+                wxr.config.shard_manifest_path,
+                wxr.config.shard,
+                shard_page_nums,
+                emitted,
             )
-    if wxr.config.dump_file_lang_code == "en":
-        emit_words_in_thesaurus(wxr, emitted, out_f, human_readable)
+    elif wxr.config.dump_file_lang_code == "en":
+        if out_shards_dir is not None and out_f is None:
+            with open_out_shard(out_shards_dir, "thesaurus") as thesaurus_f:
+                emit_words_in_thesaurus(
+                    wxr, emitted, thesaurus_f, human_readable
+                )
+        else:
+            emit_words_in_thesaurus(wxr, emitted, out_f, human_readable)
     logger.info("Reprocessing wiktionary complete")
 
 
@@ -15,6 +15,8 @@ import logging
 import os
 import pstats
 import sys
+import tempfile
+import time
 from importlib.resources import files
 from pathlib import Path
 from typing import TextIO
@@ -24,21 +26,27 @@ from wikitextprocessor import Wtp
 from wikitextprocessor.dumpparser import analyze_and_overwrite_pages
 
 from .categories import extract_categories
+from .compressed_output import compression_suffix, open_output
 from .config import WiktionaryConfig
+from .diagnostics import DiagnosticsSummary
+from .error_sink import ErrorSink, finalize_error_stream
+from .page_bundles import apply_bundle_config, load_bundle_pages, read_bundle
+from .shards import parse_shard, shard_manifest_path
 from .template_override import template_override_fns
 from .thesaurus import (
     close_thesaurus_db,
     extract_thesaurus_data,
     thesaurus_linkage_number,
 )
+from .validation import DataValidator, parse_validate_mode
 from .wiktionary import (
-    check_json_data,
     extract_namespace,
     parse_page,
     parse_wiktionary,
     reprocess_wiktionary,
     write_json_data,
 )
+from .worker_profile import add_worker_profiles, remove_worker_profiles
 from .wxr_context import WiktextractContext
 from .wxr_logging import logger
 
@@ -79,8 +87,37 @@ def process_single_page(
         extract_thesaurus_data(wxr)
     # Parse the page
     ret = parse_page(wxr, title, text)
+    DataValidator(wxr.config.validate_every).check_page(wxr, ret)
+    for data in ret:
+        write_json_data(data, out_f, human_readable)
+
+
+def replay_bundle(
+    bundle: dict,
+    wxr: WiktextractContext,
+    out_f: TextIO,
+    human_readable: bool,
+) -> None:
+    """Parses the page of a bundle saved with --bundle-dir again, with the
+    pages and settings saved in the bundle."""
+    apply_bundle_config(wxr, bundle)
+    load_bundle_pages(wxr.wtp, bundle)
+    title = bundle["page"]["title"]
+    logger.info(
+        f'Replaying page "{title}" with {len(bundle["pages"])} used pages '
+        f"(saved because: {bundle['reason']})"
+    )
+    start_t = time.time()
+    ret = parse_page(wxr, title, bundle["page"]["body"])
+    dur = time.time() - start_t
+    if bundle["seconds"] is not None:
+        logger.info(
+            f"Parsing took {dur:.1f}s, {bundle['seconds']:.1f}s when saved"
+        )
+    else:
+        logger.info(f"Parsing took {dur:.1f}s")
+    DataValidator(wxr.config.validate_every).check_page(wxr, ret)
     for data in ret:
-        check_json_data(wxr, data)
         write_json_data(data, out_f, human_readable)
 
 
@@ -99,11 +136,171 @@ def main():
         "--out",
         type=str,
         default=None,
-        help="Path where to write output (- for stdout)",
+        help="Path where to write output (- for stdout).  The output is "
+        "compressed if the path ends with .gz, .bz2, .xz or .zst",
+    )
+    parser.add_argument(
+        "--out-shards",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Let each worker process write its output to its own JSONL file "
+        "in this directory (concatenated to --out at the end if also given)",
+    )
+    parser.add_argument(
+        "--ordered",
+        action="store_true",
+        default=False,
+        help="Write output in page title order, so that the output of two "
+        "runs on the same database is identical",
+    )
+    parser.add_argument(
+        "--max-buffered-mb",
+        type=int,
+        default=256,
+        help="Maximum megabytes of output (in UTF-8) buffered for "
+        "reordering with --ordered (default: 256)",
+    )
+    parser.add_argument(
+        "--page-order",
+        choices=["title", "size"],
+        default="title",
+        help="Order in which pages are processed; 'size' processes the "
+        "largest pages first to shorten the tail of the run",
+    )
+    parser.add_argument(
+        "--batch-pages",
+        action="store_true",
+        default=False,
+        help="Send batches of page ids to worker processes, which read the "
+        "pages from the database themselves.  The batch size adapts to the "
+        "time taken per page.",
+    )
+    parser.add_argument(
+        "--timing-stats",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Save the time taken by each page and its sections and Lua "
+        "code in this sqlite file and log the slowest ones at the end",
+    )
+    parser.add_argument(
+        "--max-pages-per-worker",
+        type=int,
+        default=None,
+        metavar="PAGES",
+        help="Replace each worker process after it has processed this many "
+        "pages, freeing the memory used by its caches",
+    )
+    parser.add_argument(
+        "--max-worker-rss",
+        type=int,
+        default=None,
+        metavar="MB",
+        help="Replace worker processes whose resident memory exceeds this "
+        "after finishing their current page",
+    )
+    parser.add_argument(
+        "--shard",
+        type=str,
+        default=None,
+        metavar="I/N",
+        help="Process only the I:th of N size-balanced parts of the pages "
+        "(1 <= I <= N), e.g. on N machines with their own copy of the "
+        "database.  Requires --out; combine the results with "
+        "wiktextract-merge-shards.",
+    )
+    parser.add_argument(
+        "--job-queue",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Run the second phase through a job queue in this sqlite file. "
+        "Without --worker, publishes the pages as jobs, waits until they "
+        "are done and merges the output into --out.  Job output files are "
+        "written to the directory FILE.out.",
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        default=False,
+        help="Process jobs from --job-queue until all jobs are done; any "
+        "number of workers can run on this host or on others sharing the "
+        "filesystem",
+    )
+    parser.add_argument(
+        "--job-size",
+        type=int,
+        default=1000,
+        metavar="PAGES",
+        help="Number of pages per job (default 1000)",
+    )
+    parser.add_argument(
+        "--job-lease",
+        type=float,
+        default=600.0,
+        metavar="SECONDS",
+        help="Time after which a job whose worker has not renewed its lease "
+        "is given to another worker (default 600)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Periodically save the progress of the second phase in this "
+        "sqlite file, so that an interrupted run can be continued with "
+        "--resume (implies --batch-pages, requires --out)",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=float,
+        default=300.0,
+        metavar="SECONDS",
+        help="Time between checkpoints (default 300)",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        default=False,
+        help="Continue an interrupted run from the last checkpoint, skipping "
+        "finished pages and appending to the output file",
     )
     parser.add_argument(
         "--errors", type=str, help="File in which to save error information"
     )
+    parser.add_argument(
+        "--error-stream",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Append error messages to this JSONL file as pages are "
+        "processed instead of keeping them in memory until the end.  "
+        "--errors is then written from this file",
+    )
+    parser.add_argument(
+        "--error-stream-max-mb",
+        type=int,
+        default=None,
+        help="Continue the error stream in FILE.1, FILE.2, ... when the "
+        "current file is larger than this",
+    )
+    parser.add_argument(
+        "--diagnostics-summary",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Instead of keeping every message, count the messages by "
+        "sortid and language and keep a few random examples of each, "
+        "written to this JSON file at the end",
+    )
+    parser.add_argument(
+        "--diagnostics-examples",
+        type=int,
+        default=5,
+        help="Number of examples per sortid in --diagnostics-summary "
+        "(default 5)",
+    )
     parser.add_argument(
         "--dump-file-language-code",
         "--edition",
@@ -254,7 +451,117 @@ def main():
         "--profile",
         action="store_true",
         default=False,
-        help="Enable CPU time profiling",
+        help="Enable CPU time profiling of the main and worker processes",
+    )
+    parser.add_argument(
+        "--profile-dir",
+        type=str,
+        default=None,
+        help="Directory for the profiles of the worker processes and "
+        "their merged profile merged.prof (default: a temporary directory)",
+    )
+    parser.add_argument(
+        "--profile-sample",
+        type=int,
+        default=1,
+        metavar="N",
+        help="With --profile, profile only every Nth task of each worker "
+        "process to reduce the overhead on full dumps",
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Write progress metrics in the Prometheus text format to this "
+        "file periodically (for the node_exporter textfile collector)",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=None,
+        help="Serve progress metrics in the Prometheus text format on "
+        "http://127.0.0.1:PORT/metrics",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=15,
+        help="Seconds between metrics updates (default 15)",
+    )
+    parser.add_argument(
+        "--validate",
+        type=str,
+        default="full",
+        metavar="MODE",
+        help="Check the extracted data in the worker processes: full, "
+        "sample=1/N (every Nth entry) or off (default full)",
+    )
+    parser.add_argument(
+        "--cache-stats",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Write the hit rates, evictions and estimated memory of the "
+        "extractors' caches, summed over the worker processes, to this "
+        "JSON file",
+    )
+    parser.add_argument(
+        "--cache-stats-pages",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="Pages between the cache memory estimates of each worker "
+        "(default 1000)",
+    )
+    parser.add_argument(
+        "--bundle-dir",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Save bundles of pages that are slow, raise an exception or "
+        "kill their worker process in this directory, for --replay",
+    )
+    parser.add_argument(
+        "--bundle-seconds",
+        type=float,
+        default=60,
+        help="With --bundle-dir, save bundles of pages that take longer than "
+        "this many seconds (default 60)",
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        action="append",
+        metavar="BUNDLE",
+        help="Parse the page of a bundle saved with --bundle-dir again, "
+        "without a database (use --profile to profile it).  Can be "
+        "specified multiple times.",
+    )
+    parser.add_argument(
+        "--memory-profile",
+        type=str,
+        default=None,
+        metavar="DIR",
+        help="Trace memory allocations in the worker processes and write "
+        "the allocation sites that grew the most and the sizes of the "
+        "largest caches to a report per worker in this directory",
+    )
+    parser.add_argument(
+        "--memory-profile-pages",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="Pages between the --memory-profile reports of each worker "
+        "(default 1000)",
+    )
+    parser.add_argument(
+        "--no-preload",
+        action="store_true",
+        default=False,
+        help="Don't import the extractor in the main process before "
+        "starting the worker processes (each worker then has its own copy "
+        "of the extractor's tables)",
     )
     parser.add_argument(
         "--categories-file",
@@ -289,6 +596,21 @@ def main():
         default=None,
         help="Print out debug messages when encountering this text",
     )
+    parser.add_argument(
+        "--hung-page-warning",
+        type=float,
+        default=100.0,
+        metavar="SECONDS",
+        help="Log pages that have been processed for longer than this",
+    )
+    parser.add_argument(
+        "--kill-hung-pages",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="Kill and replace worker processes that have been processing "
+        "the same page for longer than this",
+    )
     parser.add_argument("--quiet", default=False, action="store_true")
     parser.add_argument(
         "--search-pattern",
@@ -304,6 +626,74 @@ def main():
     if not args.quiet:
         logger.setLevel(logging.DEBUG)
 
+    if args.ordered and args.out_shards:
+        print("--ordered can't be used with --out-shards")
+        sys.exit(1)
+    if args.ordered and args.page_order != "title":
+        # Pages would arrive in an order that keeps the reorder buffer full
+        print("--ordered can only be used with --page-order title")
+        sys.exit(1)
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            print(e)
+            sys.exit(1)
+        if not args.out or args.out == "-":
+            print("--shard requires --out")
+            sys.exit(1)
+    if args.worker and not args.job_queue:
+        print("--worker requires --job-queue")
+        sys.exit(1)
+    if args.job_queue and (
+        args.out_shards or args.ordered or args.shard or args.checkpoint
+    ):
+        print(
+            "--job-queue can't be used with --out-shards, --ordered, --shard "
+            "or --checkpoint"
+        )
+        sys.exit(1)
+    if args.job_queue and not args.worker and (not args.out or args.out == "-"):
+        print("--job-queue requires --out, except with --worker")
+        sys.exit(1)
+    if args.resume and not args.checkpoint:
+        print("--resume requires --checkpoint")
+        sys.exit(1)
+    if args.checkpoint and (
+        not args.out
+        or args.out == "-"
+        or args.out.startswith("/dev/")
+        or args.out_shards
+    ):
+        # The checkpoint records the size of the output file
+        print("--checkpoint requires --out with a regular file")
+        sys.exit(1)
+    if args.profile_sample < 1:
+        print("--profile-sample must be at least 1")
+        sys.exit(1)
+    if args.memory_profile_pages < 1:
+        print("--memory-profile-pages must be at least 1")
+        sys.exit(1)
+    if args.cache_stats_pages < 1:
+        print("--cache-stats-pages must be at least 1")
+        sys.exit(1)
+    if args.replay and (args.path or args.db_path or args.page):
+        print("--replay can't be used with PATH, --db-path or --page")
+        sys.exit(1)
+    if parse_validate_mode(args.validate) is None:
+        print("--validate must be full, sample=1/N or off")
+        sys.exit(1)
+    if args.diagnostics_summary and (args.error_stream or args.errors):
+        print(
+            "--diagnostics-summary can't be used with --error-stream or "
+            "--errors"
+        )
+        sys.exit(1)
+    if args.checkpoint and compression_suffix(args.out) is not None:
+        print("--checkpoint can't be used with a compressed --out file")
+        sys.exit(1)
+
     if args.debug_cell_text:
         # importing debug_cell_text from wiktextract.inflection
         # does not work because the debug_cell_text here would be
@@ -328,6 +718,15 @@ def main():
         args.inflections = True
         args.descendants = True
 
+    if args.replay:
+        # The pages are parsed with the settings they were saved with
+        bundles = [read_bundle(Path(path)) for path in args.replay]
+        lang_codes = {b["config"]["dump_file_lang_code"] for b in bundles}
+        if len(lang_codes) > 1:
+            print("--replay bundles must be from the same edition")
+            sys.exit(1)
+        args.dump_file_language_code = lang_codes.pop()
+
     # Default to dump file language and Translingual if not specified.
     capture_lang_codes = set()
     if len(args.language_code) > 0:
@@ -355,14 +754,20 @@ def main():
 
     # Open output file.
     out_path = args.out
-    if not out_path and args.pages_dir:
+    if not out_path and (args.pages_dir or args.out_shards or args.worker):
         out_f = None
     elif out_path and out_path != "-":
         if out_path.startswith("/dev/"):
             out_tmp_path = out_path
         else:
             out_tmp_path = out_path + ".tmp"
-        out_f = open(out_tmp_path, "w", buffering=1024 * 1024, encoding="utf-8")
+        if args.resume:
+            out_f = open(
+                out_tmp_path, "a", buffering=1024 * 1024, encoding="utf-8"
+            )
+        else:
+            # Compressed if out_path ends with .gz, .bz2, .xz or .zst
+            out_f = open_output(out_tmp_path, out_path)
     else:
         out_tmp_path = out_path
         out_f = sys.stdout
@@ -384,12 +789,63 @@ def main():
         verbose=args.verbose,
         expand_tables=args.inflection_tables_file,
     )
+    conf.hung_page_warning_seconds = args.hung_page_warning
+    conf.hung_page_kill_seconds = args.kill_hung_pages
+    if args.out_shards:
+        conf.out_shards_dir = Path(args.out_shards)
+    conf.ordered_output = args.ordered
+    conf.max_buffered_bytes = args.max_buffered_mb * 1024 * 1024
+    conf.page_order = args.page_order
+    conf.batch_pages = args.batch_pages or args.checkpoint is not None
+    conf.worker_max_pages = args.max_pages_per_worker
+    if args.timing_stats:
+        conf.timing_stats_path = Path(args.timing_stats)
+    if args.max_worker_rss is not None:
+        conf.worker_max_rss = args.max_worker_rss * 1024 * 1024
+    if args.checkpoint:
+        conf.checkpoint_path = Path(args.checkpoint)
+    conf.checkpoint_interval = args.checkpoint_interval
+    conf.resume = args.resume
+    if args.job_queue:
+        conf.job_queue_path = Path(args.job_queue)
+    conf.job_worker = args.worker
+    conf.job_size = args.job_size
+    conf.job_lease_seconds = args.job_lease
+    if args.profile:
+        if args.profile_dir:
+            conf.profile_dir = Path(args.profile_dir)
+        else:
+            conf.profile_dir = Path(
+                tempfile.mkdtemp(prefix="wiktextract-profile-")
+            )
+        remove_worker_profiles(conf.profile_dir)
+        conf.profile_every = args.profile_sample
+    if args.metrics_textfile:
+        conf.metrics_textfile_path = Path(args.metrics_textfile)
+    conf.metrics_port = args.metrics_port
+    conf.metrics_interval = args.metrics_interval
+    conf.validate_every = parse_validate_mode(args.validate)
+    if args.cache_stats:
+        conf.cache_stats_path = Path(args.cache_stats)
+    conf.cache_stats_pages = args.cache_stats_pages
+    if args.memory_profile:
+        conf.memory_profile_dir = Path(args.memory_profile)
+        conf.memory_profile_dir.mkdir(parents=True, exist_ok=True)
+        conf.memory_profile_pages = args.memory_profile_pages
+    if args.bundle_dir:
+        conf.bundle_dir = Path(args.bundle_dir)
+        conf.bundle_dir.mkdir(parents=True, exist_ok=True)
+    conf.bundle_seconds = args.bundle_seconds
+    conf.preload_extractor = not args.no_preload
+    if shard is not None:
+        conf.shard = shard
+        conf.shard_manifest_path = shard_manifest_path(args.out)
 
-    if not args.path and not args.db_path:
+    if not args.path and not args.db_path and not args.replay:
         print(
             "The PATH argument for wiktionary dump file is normally mandatory."
         )
-        print("Alternatively, --db-path with --page can be used.")
+        print("Alternatively, --db-path with --page, or --replay, can be used.")
         sys.exit(1)
 
     wtp = Wtp(
@@ -401,6 +857,20 @@ def main():
     )
     wxr = WiktextractContext(wtp, conf)
 
+    error_sink = None
+    if args.error_stream:
+        error_sink = ErrorSink(
+            Path(args.error_stream),
+            args.error_stream_max_mb * 1024 * 1024
+            if args.error_stream_max_mb is not None
+            else None,
+            append=args.resume,
+        )
+    elif args.diagnostics_summary:
+        error_sink = DiagnosticsSummary(
+            Path(args.diagnostics_summary), args.diagnostics_examples
+        )
+
     # load redirects if given
     if args.redirects_file:
         with open(args.redirects_file) as f:
@@ -445,6 +915,7 @@ def main():
                 args.override,
                 skip_extract_dump,
                 args.pages_dir,
+                error_sink,
             )
 
         if args.override is not None and args.path is None:
@@ -472,7 +943,17 @@ def main():
             # --errors with single page extraction
             wxr.config.merge_return(wxr.wtp.to_return())
 
-        if not args.path and not args.page and not args.skip_extraction:
+        if args.replay:
+            for bundle in bundles:
+                replay_bundle(bundle, wxr, out_f, args.human_readable)
+            wxr.config.merge_return(wxr.wtp.to_return())
+
+        if (
+            not args.path
+            and not args.page
+            and not args.replay
+            and not args.skip_extraction
+        ):
             # Parse again from the db file
             reprocess_wiktionary(
                 wxr,
@@ -480,6 +961,7 @@ def main():
                 out_f,
                 args.human_readable,
                 search_pattern=args.search_pattern,
+                error_sink=error_sink,
             )
 
     finally:
@@ -502,8 +984,15 @@ def main():
 
     if args.profile:
         pr.disable()
-        ps = pstats.Stats(pr).sort_stats(pstats.SortKey.CUMULATIVE)
-        ps.print_stats()
+        ps = pstats.Stats(pr)
+        num_profiles = add_worker_profiles(ps, conf.profile_dir)  # type: ignore[arg-type]
+        merged_path = conf.profile_dir / "merged.prof"  # type: ignore[operator]
+        ps.dump_stats(merged_path)
+        ps.sort_stats(pstats.SortKey.CUMULATIVE).print_stats()
+        logger.info(
+            f"Merged the profiles of the main process and {num_profiles} "
+            f"worker processes in {merged_path}"
+        )
 
     if out_f is not None and out_path != out_tmp_path:
         try:
@@ -512,7 +1001,13 @@ def main():
             pass
         os.rename(out_tmp_path, out_path)
 
-    if args.errors:
+    if error_sink is not None:
+        # Messages from the first phase and single pages
+        error_sink.drain(wxr.config)
+        error_sink.close()
+        if args.errors and args.error_stream:
+            finalize_error_stream(Path(args.error_stream), Path(args.errors))
+    elif args.errors:
         with open(args.errors, "w", encoding="utf-8") as f:
             json.dump(
                 {
@@ -0,0 +1,459 @@
+# Process pool used for extracting pages in parallel.
+#
+# This is similar to ``multiprocessing.Pool``, but every worker process has
+# its own pipe and is given only one task at a time.  The parent process thus
+# always knows which task each worker is running, so a worker that dies or is
+# killed (e.g. by the hung page watchdog) can be replaced without the whole
+# run waiting forever for a result that will never come.  Workers can also
+# be recycled, i.e. replaced after a number of results or when their memory
+# use grows too large.
+
+import gc
+import multiprocessing
+import os
+import resource
+import sys
+import traceback
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from multiprocessing.connection import Connection, wait
+from multiprocessing.context import BaseContext
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Any
+
+from .worker_profile import WorkerProfiler
+from .wxr_logging import logger
+
+# Message kinds sent from worker processes to the parent
+RESULT_MSG = 0
+ERROR_MSG = 1
+# With stream_results, each result is sent as ITEM_MSG and the end of the
+# task is marked with DONE_MSG
+ITEM_MSG = 2
+DONE_MSG = 3
+# Sent instead of DONE_MSG (or after the result as ITEM_MSG) by a worker
+# that exits because it has reached its limits
+RECYCLE_MSG = 4
+
+
+class LostTask:
+    """Yielded by ``WorkerPool.imap_unordered()`` instead of a result when
+    the worker process running the task exits before returning it.  With
+    ``stream_results``, ``num_results`` results of the task were received
+    before the worker exited."""
+
+    __slots__ = ("task", "pid", "exitcode", "num_results")
+
+    def __init__(
+        self, task: Any, pid: int, exitcode: int | None, num_results: int
+    ):
+        self.task = task
+        self.pid = pid
+        self.exitcode = exitcode
+        self.num_results = num_results
+
+
+class WorkerError(Exception):
+    """Raised in the parent process when the task handler raises an
+    exception in a worker process.  The message contains the traceback
+    from the worker."""
+
+
+def current_rss() -> int:
+    """Returns the resident set size of the current process in bytes, or
+    the peak resident set size where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """Returns the peak resident set size of the current process in
+    bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes except on macOS
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def process_rss(pid: int) -> int | None:
+    """Returns the resident set size of process ``pid`` in bytes, or None
+    if it is not known (e.g. /proc is not available)."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def process_shared_memory(pid: int) -> tuple[int, int] | None:
+    """Returns the shared and the private resident memory of process
+    ``pid`` in bytes, or None if they are not known (/proc/PID/smaps_rollup
+    is only available on Linux).  Pages that a forked worker still shares
+    with the parent count as shared until either process writes them."""
+    shared = private = 0
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("Shared_Clean", "Shared_Dirty"):
+                    shared += int(value.split()[0]) * 1024
+                elif name in ("Private_Clean", "Private_Dirty"):
+                    private += int(value.split()[0]) * 1024
+    except (OSError, ValueError, IndexError):
+        return None
+    return shared, private
+
+
+def recycle_reason(
+    num_results: int, max_results: int | None, max_rss: int | None
+) -> str | None:
+    """Returns why a worker should be recycled, or None."""
+    if max_results is not None and num_results >= max_results:
+        return f"{num_results} results"
+    if max_rss is not None:
+        rss = current_rss()
+        if rss > max_rss:
+            return f"{num_results} results, RSS {rss // 2**20} MiB"
+    return None
+
+
+def worker_main(
+    conn: Connection,
+    handler: Callable[[Any], Any],
+    initializer: Callable[..., None] | None,
+    initargs: tuple,
+    stream_results: bool,
+    max_results: int | None = None,
+    max_rss: int | None = None,
+    profile_dir: Path | None = None,
+    profile_every: int = 1,
+) -> None:
+    """Main loop of a worker process: receives tasks from ``conn`` until
+    it gets ``None`` and sends back the result of calling ``handler`` on
+    each task.  With ``stream_results``, ``handler`` returns an iterable
+    and each of its items is sent as soon as it is produced.
+
+    After ``max_results`` results or when the process uses more than
+    ``max_rss`` bytes, the worker stops (in the middle of a streamed task)
+    and sends RECYCLE_MSG.
+
+    With ``profile_dir``, every ``profile_every``th task is profiled and
+    the profile is saved in ``profile_dir`` when the worker exits."""
+    # The parent process may have disabled the garbage collector while
+    # loading the objects that it shares with forked workers (preload.py)
+    gc.enable()
+    if initializer is not None:
+        initializer(*initargs)
+    profiler = None
+    if profile_dir is not None:
+        profiler = WorkerProfiler(profile_dir, profile_every)
+    num_results = 0
+    reason = None
+    while reason is None:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        if profiler is not None:
+            profiler.start_task()
+        try:
+            if stream_results:
+                results = handler(task)
+                for result in results:
+                    conn.send((ITEM_MSG, result))
+                    num_results += 1
+                    reason = recycle_reason(num_results, max_results, max_rss)
+                    if reason is not None:
+                        break
+                if reason is None:
+                    conn.send((DONE_MSG, None))
+                elif hasattr(results, "close"):
+                    results.close()
+            else:
+                result = handler(task)
+                num_results += 1
+                reason = recycle_reason(num_results, max_results, max_rss)
+                if reason is None:
+                    conn.send((RESULT_MSG, result))
+                else:
+                    conn.send((ITEM_MSG, result))
+        except Exception:
+            conn.send((ERROR_MSG, traceback.format_exc()))
+        if profiler is not None:
+            profiler.end_task()
+    if profiler is not None:
+        profiler.save()
+    if reason is not None:
+        conn.send((RECYCLE_MSG, reason))
+    conn.close()
+
+
+class Worker:
+    __slots__ = ("process", "conn", "task", "busy", "num_results")
+
+    def __init__(self, process: BaseProcess, conn: Connection):
+        self.process = process
+        self.conn = conn
+        self.task: Any = None
+        self.busy = False
+        self.num_results = 0
+
+
+class WorkerPool:
+    """Pool of ``num_processes`` worker processes (default: number of CPUs)
+    calling ``handler`` on tasks.  ``initializer(*initargs)`` is called at
+    the start of every worker process, including the ones started to
+    replace dead workers.  If ``stream_results`` is True, ``handler``
+    returns an iterable of results for each task (see ``worker_main()``).
+
+    Workers are replaced after ``max_results`` results or when they use
+    more than ``max_rss`` bytes of memory.  A streamed task is then
+    stopped after its current result, so such tasks must be sequences with
+    one result per item: the rest of the task is resubmitted.
+
+    With ``profile_dir``, workers save profiles of every ``profile_every``th
+    task there (see worker_profile.py).
+
+    Workers are started with the multiprocessing ``start_method`` ("fork",
+    "spawn", ...), or the platform's default if it is None, and the workers
+    that replace them with ``replacement_start_method`` (by default the
+    same).  Forking is only safe before the parent process starts threads
+    (e.g. the watchdog's), because a forked child inherits the locks held
+    by the other threads without the threads that would release them, so
+    replacements started during a run should use "forkserver".  Locks in
+    ``initargs`` must then be created from the replacement's context, as a
+    lock of the "fork" context can't be passed to other processes."""
+
+    def __init__(
+        self,
+        num_processes: int | None,
+        handler: Callable[[Any], Any],
+        initializer: Callable[..., None] | None = None,
+        initargs: tuple = (),
+        stream_results: bool = False,
+        max_results: int | None = None,
+        max_rss: int | None = None,
+        profile_dir: Path | None = None,
+        profile_every: int = 1,
+        start_method: str | None = None,
+        replacement_start_method: str | None = None,
+    ):
+        self.num_processes = num_processes or os.cpu_count() or 1
+        self.handler = handler
+        self.initializer = initializer
+        self.initargs = initargs
+        self.stream_results = stream_results
+        self.max_results = max_results
+        self.max_rss = max_rss
+        self.profile_dir = profile_dir
+        self.profile_every = profile_every
+        self.context = multiprocessing.get_context(start_method)
+        self.replacement_context = self.context
+        if replacement_start_method is not None:
+            self.replacement_context = multiprocessing.get_context(
+                replacement_start_method
+            )
+        self.num_recycled = 0
+        # Tasks given back with resubmit(), run before new tasks
+        self.resubmitted: deque = deque()
+        self.workers = [
+            self.start_worker(self.context) for _ in range(self.num_processes)
+        ]
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.terminate()
+
+    def start_worker(self, context: BaseContext) -> Worker:
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(  # type: ignore[attr-defined]
+            target=worker_main,
+            args=(
+                child_conn,
+                self.handler,
+                self.initializer,
+                self.initargs,
+                self.stream_results,
+                self.max_results,
+                self.max_rss,
+                self.profile_dir,
+                self.profile_every,
+            ),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return Worker(process, parent_conn)
+
+    def replace_worker(self, worker: Worker) -> None:
+        worker.conn.close()
+        worker.process.join()
+        new_worker = self.start_worker(self.replacement_context)
+        worker.process = new_worker.process
+        worker.conn = new_worker.conn
+        worker.task = None
+        worker.busy = False
+        worker.num_results = 0
+
+    def resubmit(self, task: Any) -> None:
+        """Adds a task to be run by the current ``imap_unordered()`` call
+        before the remaining new tasks."""
+        self.resubmitted.append(task)
+
+    def imap_unordered(
+        self,
+        tasks: Iterable[Any],
+        throttle: Callable[[], bool] | None = None,
+    ) -> Iterator[Any]:
+        """Runs ``handler`` on every task and yields the results in the
+        order they are finished.  A ``LostTask`` is yielded for each task
+        whose worker exited without returning a result; the worker is
+        replaced and the remaining tasks are processed normally.  Tasks
+        given to ``resubmit()`` while iterating are also run.
+
+        No new tasks are given to idle workers while ``throttle()`` returns
+        True and some other worker is still busy."""
+        task_iter = iter(tasks)
+        exhausted = False
+        while True:
+            for worker in self.workers:
+                if worker.busy:
+                    continue
+                if (
+                    throttle is not None
+                    and any(w.busy for w in self.workers)
+                    and throttle()
+                ):
+                    break
+                if len(self.resubmitted) > 0:
+                    task = self.resubmitted.popleft()
+                elif exhausted:
+                    break
+                else:
+                    try:
+                        task = next(task_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                worker.task = task
+                worker.busy = True
+                worker.num_results = 0
+                try:
+                    worker.conn.send(task)
+                except OSError:
+                    # The worker died while idle (e.g. it was killed just
+                    # after returning its previous result)
+                    self.replace_worker(worker)
+                    worker.task = task
+                    worker.busy = True
+                    worker.conn.send(task)
+
+            busy_workers = [w for w in self.workers if w.busy]
+            if not busy_workers:
+                return
+            ready = wait(
+                [w.conn for w in busy_workers]
+                + [w.process.sentinel for w in busy_workers]
+            )
+            for worker in busy_workers:
+                if worker.conn not in ready and (
+                    worker.process.sentinel not in ready
+                ):
+                    continue
+                try:
+                    if not worker.conn.poll():
+                        raise EOFError
+                    kind, value = worker.conn.recv()
+                except (EOFError, OSError):
+                    worker.process.join()
+                    lost = LostTask(
+                        worker.task,
+                        worker.process.pid,  # type: ignore[arg-type]
+                        worker.process.exitcode,
+                        worker.num_results,
+                    )
+                    self.replace_worker(worker)
+                    yield lost
+                    continue
+                if kind == ITEM_MSG:
+                    worker.num_results += 1
+                    yield value
+                    continue
+                if kind == RECYCLE_MSG:
+                    logger.info(
+                        f"Recycling worker process {worker.process.pid} "
+                        f"after {value}"
+                    )
+                    self.num_recycled += 1
+                    if self.stream_results and worker.num_results < len(
+                        worker.task
+                    ):
+                        self.resubmit(worker.task[worker.num_results :])
+                    self.replace_worker(worker)
+                    continue
+                worker.task = None
+                worker.busy = False
+                if kind == ERROR_MSG:
+                    raise WorkerError(value)
+                if kind == RESULT_MSG:
+                    yield value
+
+    def close(self) -> None:
+        """Tells all worker processes to exit and waits for them."""
+        for worker in self.workers:
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+        for worker in self.workers:
+            worker.process.join()
+            worker.conn.close()
+
+    def terminate(self) -> None:
+        """Stops all worker processes immediately."""
+        for worker in self.workers:
+            worker.process.terminate()
+        for worker in self.workers:
+            worker.process.join()
+            worker.conn.close()
+
+
+class BatchSizer:
+    """Chooses the number of items per task from the observed time taken
+    per item, so that a task takes about ``target_seconds``.  Small items
+    are thus sent in large batches, which amortizes the cost of sending
+    tasks and results, while slow items are sent one by one."""
+
+    __slots__ = ("target_seconds", "max_size", "avg_seconds")
+
+    def __init__(self, target_seconds: float = 0.2, max_size: int = 200):
+        self.target_seconds = target_seconds
+        self.max_size = max_size
+        self.avg_seconds: float | None = None
+
+    def add(self, seconds: float) -> None:
+        """Records the time taken by one item."""
+        if self.avg_seconds is None:
+            self.avg_seconds = seconds
+        else:
+            # Exponential moving average that follows changes in page sizes
+            self.avg_seconds += 0.02 * (seconds - self.avg_seconds)
+
+    def size(self) -> int:
+        if self.avg_seconds is None:
+            return 1
+        if self.avg_seconds <= 0:
+            return self.max_size
+        return max(
+            1, min(self.max_size, int(self.target_seconds / self.avg_seconds))
+        )
@@ -0,0 +1,76 @@
+# Profiling of worker processes (wiktwords --profile).
+#
+# The parent process mostly waits for results, so its profile says little
+# about where the time goes.  Every worker process of a ``WorkerPool`` thus
+# runs its own cProfile profiler and saves it in a file when it exits; the
+# files are merged into one ``pstats.Stats`` at the end of the run.
+#
+# cProfile slows down the profiled code a lot, so for full dumps only every
+# Nth task can be profiled ("sampling"), which gives the same hot spots at
+# a fraction of the overhead.  Workers killed by the watchdog lose their
+# profile.
+
+import cProfile
+import os
+import pstats
+import tempfile
+from pathlib import Path
+
+PROFILE_PREFIX = "worker-"
+PROFILE_SUFFIX = ".prof"
+
+
+class WorkerProfiler:
+    """Profiles every ``sample_every``th task of a worker process."""
+
+    __slots__ = ("profile_dir", "sample_every", "num_tasks", "profile")
+
+    def __init__(self, profile_dir: Path, sample_every: int = 1):
+        self.profile_dir = profile_dir
+        self.sample_every = sample_every
+        self.num_tasks = 0
+        self.profile: cProfile.Profile | None = None
+
+    def start_task(self) -> None:
+        if self.num_tasks % self.sample_every == 0:
+            if self.profile is None:
+                self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.num_tasks += 1
+
+    def end_task(self) -> None:
+        if self.profile is not None:
+            self.profile.disable()
+
+    def save(self) -> None:
+        if self.profile is None:
+            return
+        # Unique even if the pid of an exited worker is reused
+        fd, path = tempfile.mkstemp(
+            PROFILE_SUFFIX,
+            f"{PROFILE_PREFIX}{os.getpid()}-",
+            self.profile_dir,
+        )
+        os.close(fd)
+        self.profile.dump_stats(path)
+
+
+def worker_profile_paths(profile_dir: Path) -> list[Path]:
+    return sorted(profile_dir.glob(f"{PROFILE_PREFIX}*{PROFILE_SUFFIX}"))
+
+
+def remove_worker_profiles(profile_dir: Path) -> None:
+    """Creates ``profile_dir`` if needed and removes the profiles of an
+    earlier run."""
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    for path in worker_profile_paths(profile_dir):
+        path.unlink()
+
+
+def add_worker_profiles(stats: pstats.Stats, profile_dir: Path) -> int:
+    """Adds the profiles saved by worker processes in ``profile_dir`` to
+    ``stats``.  Returns the number of profiles."""
+    paths = worker_profile_paths(profile_dir)
+    for path in paths:
+        stats.add(str(path))
+    return len(paths)
@@ -4,6 +4,7 @@ import sqlite3
 from wikitextprocessor import Wtp
 
 from .config import WiktionaryConfig
+from .page_timing import PageTimer
 
 
 class WiktextractContext:
@@ -15,6 +16,7 @@ class WiktextractContext:
         "pos",
         "thesaurus_db_path",
         "thesaurus_db_conn",
+        "page_timer",
     )
 
     def __init__(self, wtp: Wtp, config: WiktionaryConfig):
@@ -25,6 +27,8 @@ class WiktextractContext:
         self.lang = None
         self.word = None
         self.pos = None
+        # set in worker processes when page timing is on
+        self.page_timer: PageTimer | None = None
         self.thesaurus_db_path = wtp.db_path.with_stem(  # type: ignore[union-attr]
             f"{wtp.db_path.stem}_thesaurus"  # type: ignore[union-attr]
         )
@@ -0,0 +1,32 @@
+from unittest import TestCase
+
+from wiktextract.bench import compare_results, percentile
+
+
+class TestBench(TestCase):
+    def test_percentile(self):
+        values = [float(x) for x in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([3.0], 99), 3.0)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_compare_results(self):
+        baseline = {
+            "en": {"pages_per_second": 100.0, "p50_ms": 10.0, "p99_ms": 50.0},
+            "fr": {"pages_per_second": 100.0},
+        }
+        results = {
+            "en": {"pages_per_second": 95.0, "p50_ms": 12.0, "p99_ms": 40.0},
+            "fr": {"pages_per_second": 80.0},
+            "de": {"pages_per_second": 1.0},
+        }
+        regressions = compare_results(results, baseline, 0.1)
+        self.assertEqual(
+            regressions,
+            [
+                "en: p50_ms 10 -> 12 (+20.0%)",
+                "fr: pages_per_second 100 -> 80 (-20.0%)",
+            ],
+        )
+        self.assertEqual(compare_results(results, baseline, 0.25), [])
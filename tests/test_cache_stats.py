@@ -0,0 +1,77 @@
+import functools
+import json
+import sys
+import tempfile
+import types
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from wiktextract.cache_stats import CacheReporter, CacheStats, cache_bytes
+
+
+class TestCacheStats(TestCase):
+    def test_reporter(self):
+        @functools.lru_cache(2)
+        def parse_title(x):
+            return ["title"] * x
+
+        for x in (1, 2, 1, 3):
+            parse_title(x)
+        module = types.ModuleType("inflection")
+        module.parse_title = parse_title
+        reporter = CacheReporter(2)
+        with patch.dict(
+            sys.modules, {"wiktextract.extractor.en.inflection": module}
+        ):
+            first = reporter.end_page()
+            second = reporter.end_page()
+        # hits, misses, maxsize, currsize
+        self.assertEqual(first["caches"], {"parse_title": (1, 3, 2, 2)})
+        self.assertNotIn("bytes", first)
+        self.assertGreater(second["bytes"]["parse_title"], 0)
+
+    def test_cache_bytes(self):
+        @functools.lru_cache(None)
+        def f(x):
+            return "x" * x
+
+        f(1)
+        small = cache_bytes(f)
+        f(100_000)
+        self.assertGreater(cache_bytes(f) - small, 100_000)
+
+    def test_totals(self):
+        stats = CacheStats()
+        stats.add({"pid": 1, "caches": {"decode_tags": (1, 1, 10, 1)}})
+        # Later reports of a worker replace its earlier ones
+        stats.add(
+            {
+                "pid": 1,
+                "caches": {"decode_tags": (30, 20, 10, 10)},
+                "bytes": {"decode_tags": 1000},
+            }
+        )
+        stats.add({"pid": 2, "caches": {"decode_tags": (10, 5, 10, 5)}})
+        totals = stats.totals()
+        self.assertEqual(
+            totals,
+            {
+                "decode_tags": {
+                    "workers": 2,
+                    "maxsize": 10,
+                    "hits": 40,
+                    "misses": 25,
+                    "evictions": 10,
+                    "entries": 15,
+                    "full_workers": 1,
+                    "bytes": 1000,
+                    "hit_rate": 40 / 65,
+                }
+            },
+        )
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "caches.json"
+            stats.write(path)
+            with path.open(encoding="utf-8") as f:
+                self.assertEqual(json.load(f), totals)
@@ -0,0 +1,94 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from wiktextract.checkpoint import Checkpoint
+from wiktextract.config import WiktionaryConfig
+
+
+class TestCheckpoint(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp_dir.name) / "checkpoint.db"
+        self.out_path = Path(self.tmp_dir.name) / "out.jsonl"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def error(self, msg: str) -> dict:
+        return {
+            "msg": msg,
+            "trace": "",
+            "title": "foo",
+            "section": None,
+            "subsection": None,
+            "called_from": "test",
+            "path": [],
+        }
+
+    def test_save_and_restore(self):
+        config = WiktionaryConfig()
+        checkpoint = Checkpoint(self.db_path)
+        with self.out_path.open("w", encoding="utf-8") as out_f:
+            out_f.write("page 1\n")
+            checkpoint.add_page(0, 1, [("foo", "en", "noun")])
+            config.errors.append(self.error("error 1"))
+            checkpoint.save(config, out_f)
+            out_f.write("page 2\n")
+            checkpoint.add_page(0, 2, [("bar", "en", "verb")])
+            config.errors.append(self.error("error 2"))
+            checkpoint.save(config, out_f)
+            # Not saved in a checkpoint
+            out_f.write("page 3\n")
+            checkpoint.add_page(0, 3, [])
+        checkpoint.close()
+
+        config = WiktionaryConfig()
+        emitted = set()
+        checkpoint = Checkpoint(self.db_path)
+        with self.out_path.open("a", encoding="utf-8") as out_f:
+            checkpoint.restore(config, emitted, out_f)
+            out_f.write("page 3\n")
+            checkpoint.save(config, out_f)
+        self.assertEqual(
+            self.out_path.read_text(encoding="utf-8"),
+            "page 1\npage 2\npage 3\n",
+        )
+        self.assertEqual(
+            [e["msg"] for e in config.errors], ["error 1", "error 2"]
+        )
+        self.assertEqual(
+            emitted, {("foo", "en", "noun"), ("bar", "en", "verb")}
+        )
+        self.assertEqual(checkpoint.num_done_pages(), 2)
+        self.assertEqual(checkpoint.done_pages(), bytearray([0, 1, 1]))
+        # Errors are only saved once
+        self.assertEqual(checkpoint.saved_messages["errors"], 2)
+        checkpoint.clear()
+        self.assertEqual(checkpoint.num_done_pages(), 0)
+        checkpoint.close()
+
+    def test_ordered_output(self):
+        # Pages still in the reorder buffer are not done
+        config = WiktionaryConfig()
+        checkpoint = Checkpoint(self.db_path)
+        with self.out_path.open("w", encoding="utf-8") as out_f:
+            checkpoint.add_page(2, 12, [])
+            checkpoint.add_page(0, 10, [])
+            checkpoint.save(config, out_f, next_seq=1)
+            self.assertEqual(checkpoint.done_pages()[10:], bytearray([1]))
+            checkpoint.add_page(1, 11, [])
+            checkpoint.save(config, out_f, next_seq=3)
+        self.assertEqual(checkpoint.done_pages()[10:], bytearray([1, 1, 1]))
+        checkpoint.close()
+
+    def test_truncated_output(self):
+        config = WiktionaryConfig()
+        checkpoint = Checkpoint(self.db_path)
+        with self.out_path.open("w", encoding="utf-8") as out_f:
+            out_f.write("page 1\n")
+            checkpoint.save(config, out_f)
+        with self.out_path.open("w", encoding="utf-8") as out_f:
+            with self.assertRaises(RuntimeError):
+                checkpoint.restore(config, set(), out_f)
+        checkpoint.close()
@@ -0,0 +1,96 @@
+import gzip
+import importlib.util
+import tempfile
+from pathlib import Path
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+
+from wiktextract.compressed_output import (
+    CompressedWriter,
+    compression_suffix,
+    open_input,
+    open_output,
+)
+
+
+class TestCompressedOutput(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_and_read(self, name: str) -> str:
+        path = self.tmp_path / name
+        lines = [f'{{"word": "sana{i}", "pos": "ä"}}\n' for i in range(10000)]
+        # Small chunks so that many of them go through the queue
+        with patch("wiktextract.compressed_output.CHUNK_SIZE", 1000):
+            with open_output(path) as f:
+                for line in lines:
+                    f.write(line)
+                f.flush()
+        with open_input(path) as f:
+            self.assertEqual(f.read(), "".join(lines))
+        return path.read_bytes()
+
+    def test_compression_suffix(self):
+        self.assertEqual(compression_suffix("out.jsonl.gz"), ".gz")
+        self.assertEqual(compression_suffix("out.jsonl.tmp"), None)
+        self.assertEqual(compression_suffix("out.jsonl"), None)
+
+    def test_uncompressed(self):
+        data = self.write_and_read("out.jsonl")
+        self.assertTrue(data.startswith(b'{"word"'))
+
+    def test_gzip(self):
+        data = self.write_and_read("out.jsonl.gz")
+        self.assertTrue(data.startswith(b"\x1f\x8b"))
+
+    def test_bz2(self):
+        data = self.write_and_read("out.jsonl.bz2")
+        self.assertTrue(data.startswith(b"BZh"))
+
+    def test_xz(self):
+        data = self.write_and_read("out.jsonl.xz")
+        self.assertTrue(data.startswith(b"\xfd7zXZ"))
+
+    @skipIf(
+        importlib.util.find_spec("zstandard") is None,
+        "zstandard is not installed",
+    )
+    def test_zstd(self):
+        data = self.write_and_read("out.jsonl.zst")
+        self.assertTrue(data.startswith(b"\x28\xb5\x2f\xfd"))
+
+    def test_temporary_file(self):
+        # The temporary file is compressed based on the final name
+        path = self.tmp_path / "out.jsonl.gz.tmp"
+        with open_output(path, self.tmp_path / "out.jsonl.gz") as f:
+            f.write("foo\n")
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(f.read(), "foo\n")
+
+    def test_thread_error(self):
+        f = CompressedWriter(self.tmp_path / "out.jsonl.gz", ".gz")
+        f.compressed_f.close()
+        f.write("foo\n")
+        with self.assertRaises(ValueError):
+            f.flush()
+        with self.assertRaises(ValueError):
+            f.write("bar\n")
+        with self.assertRaises(ValueError):
+            f.close()
+
+    def test_thread_started_on_write(self):
+        path = self.tmp_path / "out.jsonl.gz"
+        with CompressedWriter(path, ".gz") as f:
+            f.write("foo\n")
+            self.assertIsNone(f.thread)
+            f.flush()
+            self.assertIsNotNone(f.thread)
+        with CompressedWriter(self.tmp_path / "empty.jsonl.gz", ".gz") as f:
+            pass
+        self.assertIsNone(f.thread)
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(f.read(), "foo\n")
@@ -0,0 +1,76 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from wiktextract.config import WiktionaryConfig
+from wiktextract.diagnostics import DiagnosticsSummary
+
+
+class TestDiagnostics(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.summary_path = Path(self.tmp_dir.name) / "summary.json"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def debug(self, i: int, sortid: str, lang: str) -> dict:
+        return {
+            "msg": f"message {i}",
+            "trace": "",
+            "title": f"page {i}",
+            "section": lang,
+            "subsection": "Noun",
+            "called_from": sortid,
+            "path": [],
+        }
+
+    def test_summary(self):
+        config = WiktionaryConfig()
+        diagnostics = DiagnosticsSummary(self.summary_path, num_examples=3)
+        for i in range(1000):
+            config.debugs.append(
+                self.debug(i, "page/1", "English" if i % 4 else "Finnish")
+            )
+        config.debugs.append(self.debug(1000, "page/2", "English"))
+        config.errors.append(self.debug(1001, "page/2", "English"))
+        diagnostics.drain(config)
+        self.assertEqual(config.debugs, [])
+        diagnostics.close()
+        with self.summary_path.open(encoding="utf-8") as f:
+            summary = json.load(f)
+        self.assertEqual(
+            [(x["sortid"], x["count"]) for x in summary["debugs"]],
+            [("page/1", 1000), ("page/2", 1)],
+        )
+        self.assertEqual(
+            summary["debugs"][0]["languages"], {"English": 750, "Finnish": 250}
+        )
+        self.assertEqual(len(summary["debugs"][0]["examples"]), 3)
+        self.assertEqual(
+            summary["debugs"][0]["examples"][0].keys(),
+            {"msg", "title", "section", "subsection"},
+        )
+        self.assertEqual(summary["errors"][0]["count"], 1)
+        self.assertEqual(summary["warnings"], [])
+
+    def test_reservoir_sampling(self):
+        # Later messages are sampled too, not only the first ones
+        diagnostics = DiagnosticsSummary(self.summary_path, num_examples=10)
+        diagnostics.add(
+            "debugs", (self.debug(i, "page/1", "English") for i in range(1000))
+        )
+        examples = diagnostics.stats["debugs", "page/1"].examples
+        self.assertEqual(len(examples), 10)
+        self.assertTrue(any(int(x["msg"].split()[1]) >= 500 for x in examples))
+
+    def test_checkpoint_state(self):
+        diagnostics = DiagnosticsSummary(self.summary_path)
+        diagnostics.add("debugs", [self.debug(0, "page/1", "English")])
+        state = json.loads(json.dumps(diagnostics.checkpoint_state()))
+        restored = DiagnosticsSummary(self.summary_path)
+        restored.restore_checkpoint_state(state)
+        self.assertEqual(restored.summary(), diagnostics.summary())
+        restored.restore_checkpoint_state(None)
+        self.assertEqual(restored.stats, {})
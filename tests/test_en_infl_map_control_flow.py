@@ -30,7 +30,7 @@ class InflTests(unittest.TestCase):
 
     def xexpand_header(self, text, i_map, lang="English", pos="verb",
                        base_tags=[],):
-        with patch('wiktextract.extractor.en.inflection.infl_map', i_map):
+        with patch('wiktextract.lazy_tables.en_tables.infl_map', i_map):
             ret = expand_header(self.wxr, self.tablecontext,
                                 "foobar", lang,
                                 pos, "foo", base_tags)
@@ -0,0 +1,41 @@
+import gzip
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from wiktextract.extractor.en.brown_words import (
+    load_brown_words,
+    read_brown_words,
+)
+
+
+class TestEnglishWords(TestCase):
+    def test_read_brown_words(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "brown_words.txt.gz"
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                f.write("'s\nThe\nfox\n")
+            self.assertEqual(read_brown_words(path), {"'s", "The", "fox"})
+
+    def test_read_empty_file(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "brown_words.txt.gz"
+            with gzip.open(path, "wt", encoding="utf-8") as f:
+                f.write("")
+            self.assertEqual(read_brown_words(path), set())
+
+    def test_missing_file_reads_corpus(self):
+        with (
+            tempfile.TemporaryDirectory() as tmp_dir,
+            patch(
+                "wiktextract.extractor.en.brown_words.BROWN_WORDS_PATH",
+                Path(tmp_dir) / "brown_words.txt.gz",
+            ),
+            patch(
+                "wiktextract.extractor.en.brown_words.corpus_brown_words",
+                return_value={"fox"},
+            ),
+            self.assertLogs("wiktextract", "WARNING"),
+        ):
+            self.assertEqual(load_brown_words(), {"fox"})
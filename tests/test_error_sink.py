@@ -0,0 +1,133 @@
+import json
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from wiktextract.checkpoint import Checkpoint
+from wiktextract.config import WiktionaryConfig
+from wiktextract.error_sink import (
+    ErrorSink,
+    MessageSink,
+    error_stream_paths,
+    finalize_error_stream,
+    read_error_stream,
+)
+
+
+class TestErrorSink(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self.tmp_dir.name)
+        self.stream_path = self.tmp_path / "errors.jsonl"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def error(self, msg: str) -> dict:
+        return {
+            "msg": msg,
+            "trace": "",
+            "title": "föö",
+            "section": None,
+            "subsection": None,
+            "called_from": "test",
+            "path": [],
+        }
+
+    def test_drain_and_finalize(self):
+        config = WiktionaryConfig()
+        config.errors.append(self.error("error 1"))
+        config.debugs.append(self.error("debug 1"))
+        sink = ErrorSink(self.stream_path)
+        sink.drain(config)
+        self.assertEqual(config.errors, [])
+        self.assertEqual(config.debugs, [])
+        config.errors.append(self.error("error 2"))
+        sink.drain(config)
+        sink.close()
+        self.assertEqual(
+            [(kind, msg["msg"]) for kind, msg in read_error_stream(sink.path)],
+            [
+                ("errors", "error 1"),
+                ("debugs", "debug 1"),
+                ("errors", "error 2"),
+            ],
+        )
+        errors_path = self.tmp_path / "errors.json"
+        finalize_error_stream(self.stream_path, errors_path)
+        # Same as the file written without --error-stream
+        self.assertEqual(
+            errors_path.read_text(encoding="utf-8"),
+            json.dumps(
+                {
+                    "errors": [self.error("error 1"), self.error("error 2")],
+                    "warnings": [],
+                    "debugs": [self.error("debug 1")],
+                },
+                sort_keys=True,
+            ),
+        )
+
+    def test_rotation(self):
+        sink = ErrorSink(self.stream_path, max_bytes=200)
+        for i in range(10):
+            sink.add("warnings", [self.error(f"warning {i}")])
+        sink.close()
+        paths = error_stream_paths(self.stream_path)
+        self.assertEqual(len(paths), 5)
+        self.assertEqual(paths[1].name, "errors.jsonl.1")
+        self.assertEqual(
+            [msg["msg"] for _, msg in read_error_stream(self.stream_path)],
+            [f"warning {i}" for i in range(10)],
+        )
+        # A new stream removes the files of the old one
+        ErrorSink(self.stream_path).close()
+        self.assertEqual(error_stream_paths(self.stream_path), [sink.path])
+
+    def test_truncate(self):
+        sink = ErrorSink(self.stream_path)
+        sink.add("errors", [self.error("error 1")])
+        position = sink.position()
+        sink.add("errors", [self.error("error 2")])
+        sink.truncate(*position)
+        self.assertEqual(sink.position(), position)
+        sink.add("errors", [self.error("error 3")])
+        sink.close()
+        self.assertEqual(
+            [msg["msg"] for _, msg in read_error_stream(self.stream_path)],
+            ["error 1", "error 3"],
+        )
+
+    def test_checkpoint(self):
+        config = WiktionaryConfig()
+        checkpoint = Checkpoint(self.tmp_path / "checkpoint.db")
+        sink = ErrorSink(self.stream_path, max_bytes=200)
+        with (self.tmp_path / "out.jsonl").open("w") as out_f:
+            config.errors.append(self.error("error 1"))
+            checkpoint.save(config, out_f, error_sink=sink)
+            for i in range(2, 5):
+                config.errors.append(self.error(f"error {i}"))
+                sink.drain(config)
+        sink.close()
+        checkpoint.close()
+
+        checkpoint = Checkpoint(self.tmp_path / "checkpoint.db")
+        sink = ErrorSink(self.stream_path, max_bytes=200, append=True)
+        with (self.tmp_path / "out.jsonl").open("a") as out_f:
+            checkpoint.restore(config, set(), out_f, sink)
+        config.errors.append(self.error("error 5"))
+        sink.drain(config)
+        sink.close()
+        checkpoint.close()
+        self.assertEqual(
+            [msg["msg"] for _, msg in read_error_stream(self.stream_path)],
+            ["error 1", "error 5"],
+        )
+
+    def test_incomplete_sink(self):
+        class AddOnlySink(MessageSink):
+            def add(self, kind, messages):
+                pass
+
+        with self.assertRaises(TypeError):
+            AddOnlySink()
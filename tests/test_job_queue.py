@@ -0,0 +1,124 @@
+import multiprocessing
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from unittest import TestCase
+
+from wiktextract.job_queue import JobQueue, LeaseRenewer, job_output_path
+
+
+def claim_jobs(queue_path: Path, owner: str) -> None:
+    queue = JobQueue(queue_path)
+    while True:
+        job = queue.claim(owner, 60)
+        if job is None:
+            break
+        job_id, page_ids = job
+        time.sleep(0.01)
+        queue.complete(job_id, owner, [(f"w{page_ids[0]}", "en", "noun")], {})
+    queue.close()
+
+
+class TestJobQueue(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.queue_path = Path(self.tmp_dir.name) / "jobs.db"
+        self.queue = JobQueue(self.queue_path)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp_dir.cleanup()
+
+    def publish(self, num_jobs: int) -> None:
+        self.queue.publish(array("q", [i, i + 1000]) for i in range(num_jobs))
+
+    def test_claim_and_complete(self):
+        self.assertFalse(self.queue.all_done())
+        self.assertIsNone(self.queue.claim("a", 60))
+        self.publish(2)
+        self.assertTrue(self.queue.is_published())
+        job_id, page_ids = self.queue.claim("a", 60)
+        self.assertEqual(list(page_ids), [0, 1000])
+        self.assertEqual(self.queue.job_counts(), (1, 1, 0))
+        self.assertTrue(self.queue.renew(job_id, "a", 60))
+        self.assertFalse(self.queue.renew(job_id, "b", 60))
+        self.assertTrue(
+            self.queue.complete(
+                job_id, "a", [("foo", "en", "noun")], {"errors": [{"msg": 1}]}
+            )
+        )
+        self.assertFalse(self.queue.renew(job_id, "a", 60))
+        job_id, _ = self.queue.claim("b", 60)
+        self.assertTrue(self.queue.complete(job_id, "b", [], {}))
+        self.assertTrue(self.queue.all_done())
+        self.assertEqual(self.queue.done_job_ids(), [1, 2])
+        self.assertEqual(
+            list(self.queue.emitted_keys()), [("foo", "en", "noun")]
+        )
+        self.assertEqual(list(self.queue.messages("errors")), [{"msg": 1}])
+
+    def test_expired_lease(self):
+        self.publish(1)
+        job_id, _ = self.queue.claim("a", -1)
+        # The lease of "a" has expired, so "b" steals the job
+        self.assertEqual(self.queue.claim("b", 60)[0], job_id)
+        self.assertFalse(self.queue.renew(job_id, "a", 60))
+        self.assertFalse(self.queue.complete(job_id, "a", [], {}))
+        self.assertIsNone(self.queue.claim("c", 60))
+        self.assertTrue(self.queue.complete(job_id, "b", [], {}))
+
+    def test_outputs(self):
+        self.publish(2)
+        job_id, _ = self.queue.claim("a", 60)
+        self.assertTrue(self.queue.complete(job_id, "a", [], {}, "a.jsonl"))
+        job_id, _ = self.queue.claim("b", -1)
+        self.queue.claim("c", 60)
+        # "b" lost its lease, so its output isn't used
+        self.assertFalse(self.queue.complete(job_id, "b", [], {}, "b.jsonl"))
+        self.assertEqual(self.queue.done_job_outputs(), ["a.jsonl"])
+        self.assertTrue(self.queue.complete(job_id, "c", [], {}, "c.jsonl"))
+        self.assertEqual(self.queue.done_job_outputs(), ["a.jsonl", "c.jsonl"])
+        self.assertNotEqual(
+            job_output_path(self.queue_path, job_id, "host:1"),
+            job_output_path(self.queue_path, job_id, "host:2"),
+        )
+
+    def test_lease_renewer(self):
+        self.publish(1)
+        job_id, _ = self.queue.claim("a", 0.3)
+        renewer = LeaseRenewer(self.queue_path, job_id, "a", 0.3)
+        renewer.start()
+        # Longer than the lease, which the thread renews meanwhile
+        time.sleep(0.6)
+        self.assertIsNone(self.queue.claim("b", 60))
+        self.assertTrue(renewer.stop())
+        time.sleep(0.4)
+        self.assertEqual(self.queue.claim("b", 60)[0], job_id)
+
+    def test_lease_renewer_lost(self):
+        self.publish(1)
+        job_id, _ = self.queue.claim("a", -1)
+        self.queue.claim("b", 60)
+        renewer = LeaseRenewer(self.queue_path, job_id, "a", 0.03)
+        renewer.start()
+        renewer.thread.join()
+        self.assertFalse(renewer.stop())
+
+    def test_worker_processes(self):
+        self.publish(50)
+        processes = [
+            multiprocessing.Process(
+                target=claim_jobs, args=(self.queue_path, f"worker{i}")
+            )
+            for i in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertTrue(self.queue.all_done())
+        # Every job was done exactly once
+        for (attempts,) in self.queue.conn.execute("SELECT attempts FROM jobs"):
+            self.assertEqual(attempts, 1)
+        self.assertEqual(len(list(self.queue.emitted_keys())), 50)
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+from wiktextract.lazy_tables import EN_TABLES, LazyTables
+
+# Loose enough for slow CI machines, but an import that loads the tables
+# or NLTK again takes longer
+IMPORT_BUDGET_SECONDS = 5.0
+
+IMPORT_EXTRACTOR = """
+import sys
+import time
+
+start = time.perf_counter()
+import wiktextract.extractor.en.page
+seconds = time.perf_counter() - start
+from wiktextract.lazy_tables import en_tables
+
+print(seconds)
+print(len(en_tables.loaded()))
+for name in sys.modules:
+    print(name)
+"""
+
+
+class TestLazyTables(TestCase):
+    def test_load_on_access(self):
+        tables = LazyTables({"loads": ("json", "loads")})
+        self.assertEqual(tables.loaded(), [])
+        self.assertEqual(tables.loads("[1]"), [1])
+        self.assertEqual(tables.loaded(), ["loads"])
+        with self.assertRaises(AttributeError):
+            tables.dumps
+
+    def test_extractor_import(self):
+        # In a new interpreter, so that modules imported by other tests
+        # don't count
+        result = subprocess.run(
+            [sys.executable, "-c", IMPORT_EXTRACTOR],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        seconds, num_loaded, *modules = result.stdout.split()
+        self.assertLess(float(seconds), IMPORT_BUDGET_SECONDS)
+        self.assertEqual(num_loaded, "0")
+        for module_name, _ in EN_TABLES.values():
+            self.assertNotIn(module_name, modules)
+        self.assertNotIn("nltk", modules)
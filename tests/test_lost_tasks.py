@@ -0,0 +1,48 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from wikitextprocessor import Wtp
+
+from wiktextract.config import WiktionaryConfig
+from wiktextract.wiktionary import handle_lost_task
+from wiktextract.worker_pool import LostTask
+from wiktextract.wxr_context import WiktextractContext
+
+
+class TestLostTasks(TestCase):
+    def setUp(self) -> None:
+        self.wxr = WiktextractContext(
+            Wtp(lang_code="en"), WiktionaryConfig(dump_file_lang_code="en")
+        )
+        for title in ["a", "b", "c"]:
+            self.wxr.wtp.add_page(title, 0, "==English==")
+        self.batch = [
+            (seq, page_id)
+            for seq, (page_id,) in enumerate(
+                self.wxr.wtp.db_conn.execute(
+                    "SELECT rowid FROM pages ORDER BY title"
+                )
+            )
+        ]
+        self.pool = Mock()
+
+    def tearDown(self) -> None:
+        self.wxr.wtp.close_db_conn()
+
+    def test_lost_batch(self):
+        # Worker mode sends batches whether or not batch_pages is set
+        self.wxr.config.batch_pages = False
+        lost = LostTask(self.batch, 1, -9, 1)
+        handle_lost_task(self.wxr, self.pool, lost, None, None, True)
+        self.assertEqual(len(self.wxr.config.errors), 1)
+        self.assertEqual(self.wxr.config.errors[0]["title"], "b")
+        self.pool.resubmit.assert_called_once_with(self.batch[2:])
+
+    def test_lost_after_last_result(self):
+        # The worker died after returning the results of the whole batch
+        lost = LostTask(self.batch, 1, -9, len(self.batch))
+        self.assertFalse(
+            handle_lost_task(self.wxr, self.pool, lost, None, None, True)
+        )
+        self.assertEqual(self.wxr.config.errors, [])
+        self.pool.resubmit.assert_not_called()
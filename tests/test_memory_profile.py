@@ -0,0 +1,53 @@
+import functools
+import json
+import sys
+import tempfile
+import tracemalloc
+import types
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from wiktextract.memory_profile import MemoryProfiler, cache_sizes
+
+
+class TestMemoryProfile(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.was_tracing = tracemalloc.is_tracing()
+
+    def tearDown(self):
+        if not self.was_tracing:
+            tracemalloc.stop()
+        self.tmp_dir.cleanup()
+
+    def test_report(self):
+        profiler = MemoryProfiler(Path(self.tmp_dir.name), 2, top=5)
+        leak = []
+        for _ in range(4):
+            leak.append(bytearray(1_000_000))
+            profiler.end_page()
+        self.assertEqual(profiler.num_pages, 4)
+        with profiler.report_path.open(encoding="utf-8") as f:
+            reports = [json.loads(line) for line in f]
+        self.assertEqual([r["pages"] for r in reports], [2, 4])
+        # The growth of the list is the top allocation site
+        top = reports[1]["top"][0]
+        self.assertTrue(top["site"].startswith(__file__ + ":"))
+        self.assertGreaterEqual(top["size_diff"], 2_000_000)
+        self.assertLessEqual(len(reports[1]["top"]), 5)
+
+    def test_cache_sizes(self):
+        @functools.lru_cache(10)
+        def decode_tags(x):
+            return x
+
+        decode_tags(1)
+        decode_tags(2)
+        module = types.ModuleType("form_descriptions")
+        module.decode_tags = decode_tags
+        with patch.dict(
+            sys.modules,
+            {"wiktextract.extractor.en.form_descriptions": module},
+        ):
+            self.assertEqual(cache_sizes().get("decode_tags"), 2)
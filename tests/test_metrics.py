@@ -0,0 +1,80 @@
+import socket
+import tempfile
+import urllib.request
+from pathlib import Path
+from unittest import TestCase
+
+from wiktextract.cache_stats import CacheStats
+from wiktextract.metrics import ProgressMetrics
+from wiktextract.worker_pool import WorkerPool
+
+
+def double(x: int) -> int:
+    return 2 * x
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TestMetrics(TestCase):
+    def test_textfile(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            textfile_path = Path(tmp_dir) / "wiktextract.prom"
+            out_path = Path(tmp_dir) / "out.jsonl"
+            metrics = ProgressMetrics(textfile_path, interval=0)
+            metrics.pages_selected = 10
+            metrics.add_page(3, {"errors": [{}], "debugs": [{}, {}]})
+            metrics.add_lost_page()
+            with (
+                WorkerPool(2, double) as pool,
+                out_path.open("w") as out_f,
+            ):
+                out_f.write("x" * 100)
+                out_f.flush()
+                metrics.maybe_export(pool, out_f)
+            text = textfile_path.read_text()
+        lines = set(text.splitlines())
+        for line in (
+            "wiktextract_pages_selected 10",
+            "wiktextract_pages_processed_total 2",
+            "wiktextract_pages_pending 8",
+            "wiktextract_entries_total 3",
+            'wiktextract_messages_total{kind="errors"} 2',
+            'wiktextract_messages_total{kind="debugs"} 2',
+            "wiktextract_lost_pages_total 1",
+            "wiktextract_output_bytes 100",
+            "wiktextract_busy_workers 0",
+            "wiktextract_resubmitted_tasks 0",
+            "# TYPE wiktextract_pages_processed_total counter",
+        ):
+            self.assertIn(line, lines)
+        self.assertIn("wiktextract_worker_rss_bytes{pid=", text)
+
+    def test_http(self):
+        port = free_port()
+        metrics = ProgressMetrics(port=port)
+        try:
+            metrics.add_page(1, {})
+            metrics.export()
+            with urllib.request.urlopen(
+                f"http://127.0.0.1:{port}/metrics"
+            ) as response:
+                text = response.read().decode("utf-8")
+        finally:
+            metrics.close()
+        self.assertIn("wiktextract_pages_processed_total 1\n", text)
+
+    def test_cache_metrics(self):
+        cache_stats = CacheStats()
+        cache_stats.add({"pid": 1, "caches": {"decode_tags": (3, 1, 10, 1)}})
+        metrics = ProgressMetrics(cache_stats=cache_stats)
+        lines = set(metrics.render().splitlines())
+        self.assertIn(
+            'wiktextract_cache_hits_total{cache="decode_tags"} 3', lines
+        )
+        self.assertIn(
+            'wiktextract_cache_hit_rate{cache="decode_tags"} 0.75', lines
+        )
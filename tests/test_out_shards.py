@@ -0,0 +1,26 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+from wiktextract.out_shards import (
+    concatenate_out_shards,
+    open_out_shard,
+    out_shard_paths,
+    remove_out_shards,
+)
+
+
+class OutShardsTests(unittest.TestCase):
+    def test_concatenate(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_dir = Path(tmp_dir) / "shards"
+            remove_out_shards(out_dir)
+            for name, line in (("2", "b"), ("1", "a")):
+                with open_out_shard(out_dir, name) as f:
+                    f.write(f'{{"word": "{line}"}}\n')
+            out_f = io.StringIO()
+            concatenate_out_shards(out_dir, out_f)
+            self.assertEqual(out_f.getvalue(), '{"word": "a"}\n{"word": "b"}\n')
+            remove_out_shards(out_dir)
+            self.assertEqual(out_shard_paths(out_dir), [])
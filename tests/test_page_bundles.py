@@ -0,0 +1,103 @@
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from wikitextprocessor import Page, Wtp
+
+from wiktextract.config import WiktionaryConfig
+from wiktextract.page_bundles import (
+    PageRecorder,
+    apply_bundle_config,
+    collect_pages,
+    load_bundle_pages,
+    read_bundle,
+    save_bundle,
+)
+from wiktextract.wxr_context import WiktextractContext
+
+
+class TestPageBundles(TestCase):
+    def setUp(self) -> None:
+        self.wxr = WiktextractContext(
+            Wtp(lang_code="en"), WiktionaryConfig(dump_file_lang_code="en")
+        )
+        wtp = self.wxr.wtp
+        wtp.add_page("Template:en-noun", 10, "{{head|en|noun}}")
+        wtp.add_page("Template:head", 10, "{{#invoke:headword|show}}")
+        wtp.add_page("Template:unused", 10, "unused")
+        wtp.add_page(
+            "Module:headword",
+            828,
+            'local data = mw.loadData("Module:headword/data")\n'
+            'local m_str = require("string")',
+            model="Scribunto",
+        )
+        wtp.add_page(
+            "Module:headword/data", 828, "return {}", model="Scribunto"
+        )
+        self.page = Page(
+            "test", 0, body="==English==\n{{en-noun}}\n{{#if:x|{{PAGENAME}}}}"
+        )
+
+    def tearDown(self) -> None:
+        self.wxr.wtp.close_db_conn()
+
+    def test_collect_pages(self):
+        pages = collect_pages(self.wxr.wtp, self.page)
+        self.assertEqual(
+            sorted(pages),
+            [
+                "Module:headword",
+                "Module:headword/data",
+                "Template:en-noun",
+                "Template:head",
+            ],
+        )
+
+    def test_recorded_pages(self):
+        recorder = PageRecorder(self.wxr.wtp)
+        self.wxr.wtp.get_page("Template:unused", 10)
+        pages = collect_pages(self.wxr.wtp, self.page, recorder.pages)
+        self.assertIn("Template:unused", pages)
+        recorder.start_page()
+        self.assertEqual(recorder.pages, {})
+
+    def test_replay(self):
+        self.wxr.config.capture_language_codes = {"fi", "en"}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.wxr.config.bundle_dir = Path(tmp_dir)
+            path = save_bundle(self.wxr, self.page, "slow", seconds=75.0)
+            bundle = read_bundle(path)
+        self.assertEqual(bundle["reason"], "slow")
+        self.assertEqual(bundle["page"]["body"], self.page.body)
+        self.assertEqual(len(bundle["pages"]), 4)
+        self.assertEqual(
+            bundle["config"]["capture_language_codes"], ["en", "fi"]
+        )
+
+        wxr = WiktextractContext(
+            Wtp(lang_code="en"), WiktionaryConfig(dump_file_lang_code="en")
+        )
+        try:
+            apply_bundle_config(wxr, bundle)
+            load_bundle_pages(wxr.wtp, bundle)
+            self.assertEqual(wxr.config.capture_language_codes, {"en", "fi"})
+            module = wxr.wtp.get_page("Module:headword", 828)
+            self.assertEqual(module.model, "Scribunto")
+            self.assertIsNone(wxr.wtp.get_page("Template:unused", 10))
+        finally:
+            wxr.wtp.close_db_conn()
+
+    def test_save_error(self):
+        with (
+            tempfile.TemporaryDirectory() as tmp_dir,
+            patch(
+                "wiktextract.page_bundles.collect_pages",
+                side_effect=ValueError("bad page"),
+            ),
+            self.assertLogs("wiktextract", "ERROR"),
+        ):
+            self.wxr.config.bundle_dir = Path(tmp_dir)
+            self.assertIsNone(save_bundle(self.wxr, self.page, "exception"))
+            self.assertEqual(list(Path(tmp_dir).iterdir()), [])
@@ -0,0 +1,41 @@
+from unittest import TestCase
+
+from wikitextprocessor import Wtp
+
+from wiktextract.page_queries import get_pages_by_ids, select_page_sizes
+
+
+class TestPageQueries(TestCase):
+    def setUp(self):
+        self.wtp = Wtp()
+        self.wtp.add_page("b", 0, "bb")
+        self.wtp.add_page("a", 0, "aaa")
+        self.wtp.add_page("c", 0, "c")
+        self.wtp.add_page("Template:d", 10, "dddd")
+        self.wtp.db_conn.commit()
+
+    def tearDown(self):
+        self.wtp.close_db_conn()
+
+    def titles(self, page_ids) -> list[str]:
+        return [
+            page.title for page in get_pages_by_ids(self.wtp.db_conn, page_ids)
+        ]
+
+    def test_title_order(self):
+        page_ids, sizes = select_page_sizes(self.wtp.db_conn, [0])
+        self.assertEqual(self.titles(page_ids), ["a", "b", "c"])
+        self.assertEqual(list(sizes), [3, 2, 1])
+
+    def test_largest_first(self):
+        page_ids, sizes = select_page_sizes(
+            self.wtp.db_conn, [0, 10], largest_first=True
+        )
+        self.assertEqual(self.titles(page_ids), ["Template:d", "a", "b", "c"])
+        self.assertEqual(list(sizes), [4, 3, 2, 1])
+
+    def test_search_pattern(self):
+        page_ids, _ = select_page_sizes(
+            self.wtp.db_conn, [0], search_pattern="%b%"
+        )
+        self.assertEqual(self.titles(page_ids), ["b"])
@@ -0,0 +1,49 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+
+from wiktextract.page_timing import PageTimer, PageTimingLog, time_section
+
+
+class FakeContext:
+    def __init__(self, page_timer):
+        self.page_timer = page_timer
+
+
+class TestPageTiming(TestCase):
+    def test_time_section(self):
+        timer = PageTimer()
+        wxr = FakeContext(timer)
+        for _ in range(2):
+            with time_section(wxr, "pos"):
+                time.sleep(0.01)
+        self.assertGreaterEqual(timer.sections["pos"], 0.02)
+        timer.start_page()
+        self.assertEqual(timer.result("dog", 1.5)["sections"], {})
+        self.assertEqual(timer.result("dog", 1.5)["total"], 1.5)
+
+    def test_timing_off(self):
+        with time_section(FakeContext(None), "pos"):
+            pass
+
+    def test_timing_log(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            timing_log = PageTimingLog(Path(tmp_dir) / "timing.db")
+            for title, total in (("cat", 2.0), ("dog", 5.0)):
+                timing_log.add(
+                    {
+                        "title": title,
+                        "total": total,
+                        "lua": 1.0,
+                        "sections": {"pos": total / 2, "wtp.parse": 0.5},
+                    }
+                )
+            with self.assertLogs("wiktextract", "INFO") as logs:
+                timing_log.log_report(limit=1)
+            timing_log.close()
+        output = "\n".join(logs.output)
+        self.assertIn("2 pages, 7s in total, 2s in Lua", output)
+        # Only the slowest page and section are listed
+        self.assertIn("dog", output)
+        self.assertNotIn("cat", output)
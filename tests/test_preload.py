@@ -0,0 +1,88 @@
+import gc
+import multiprocessing
+import os
+import sys
+from unittest import TestCase, skipIf
+
+from wiktextract.preload import (
+    freeze_objects,
+    log_worker_memory,
+    worker_start_methods,
+)
+from wiktextract.watchdog import PageWatchdog
+from wiktextract.worker_pool import WorkerPool, process_shared_memory
+
+
+def identity(x: int) -> int:
+    return x
+
+
+def init_watched_worker(watchdog: PageWatchdog) -> None:
+    watched_identity.watchdog = watchdog
+    watchdog.attach()
+
+
+def watched_identity(x: int) -> int:
+    watched_identity.watchdog.start_page(str(x))
+    watched_identity.watchdog.end_page()
+    return x
+
+
+class TestPreload(TestCase):
+    def tearDown(self) -> None:
+        gc.unfreeze()
+
+    def test_freeze(self):
+        self.assertGreater(freeze_objects(), 0)
+        self.assertEqual(gc.get_freeze_count(), freeze_objects())
+
+    def test_start_methods(self):
+        if sys.platform == "linux":
+            self.assertEqual(worker_start_methods(), ("fork", "forkserver"))
+        elif sys.platform == "darwin":
+            self.assertEqual(worker_start_methods(), (None, None))
+
+    def test_replace_watched_worker(self):
+        # Replacements of the default start method get the watchdog too
+        start_method, replacement_start_method = worker_start_methods()
+        watchdog = PageWatchdog(
+            4, context=multiprocessing.get_context(replacement_start_method)
+        )
+        with WorkerPool(
+            1,
+            watched_identity,
+            init_watched_worker,
+            (watchdog,),
+            max_results=2,
+            start_method=start_method,
+            replacement_start_method=replacement_start_method,
+        ) as pool:
+            results = list(pool.imap_unordered(range(5)))
+            self.assertEqual(pool.num_recycled, 2)
+            if replacement_start_method is not None:
+                self.assertEqual(
+                    pool.workers[0].process._start_method,
+                    replacement_start_method,
+                )
+        self.assertEqual(sorted(results), [0, 1, 2, 3, 4])
+
+    @skipIf(
+        not os.path.exists("/proc/self/smaps_rollup"),
+        "/proc/PID/smaps_rollup is not available",
+    )
+    def test_worker_memory(self):
+        shared, private = process_shared_memory(os.getpid())
+        self.assertGreater(private, 0)
+        freeze_objects()
+        with WorkerPool(2, identity, start_method="fork") as pool:
+            self.assertEqual(
+                sorted(pool.imap_unordered(range(4))), [0, 1, 2, 3]
+            )
+            shared, private = process_shared_memory(pool.workers[0].process.pid)
+            # A forked worker shares most of its memory with this process
+            self.assertGreater(shared, private)
+            with self.assertLogs("wiktextract", "INFO") as logs:
+                log_worker_memory(pool, "at end")
+        self.assertEqual(len(logs.output), 3)
+        self.assertIn("MiB shared", logs.output[0])
+        self.assertIn("in total", logs.output[2])
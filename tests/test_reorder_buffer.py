@@ -0,0 +1,35 @@
+import io
+import unittest
+
+from wiktextract.reorder_buffer import ReorderBuffer
+
+
+class ReorderBufferTests(unittest.TestCase):
+    def test_order(self):
+        out_f = io.StringIO()
+        buffer = ReorderBuffer(out_f, 100)
+        for seq, text in ((2, "c\n"), (0, "a\n"), (3, ""), (1, "b\n")):
+            buffer.add(seq, text)
+        self.assertEqual(out_f.getvalue(), "a\nb\nc\n")
+        self.assertEqual(buffer.next_seq, 4)
+        self.assertEqual(buffer.size, 0)
+
+    def test_full(self):
+        buffer = ReorderBuffer(io.StringIO(), 4)
+        buffer.add(1, "abc\n")
+        self.assertTrue(buffer.is_full())
+        buffer.add(0, "")
+        self.assertFalse(buffer.is_full())
+        self.assertEqual(buffer.peak_size, 4)
+        self.assertEqual(buffer.full_count, 1)
+
+    def test_size_in_bytes(self):
+        buffer = ReorderBuffer(io.StringIO(), 6)
+        buffer.add(1, "äö\n")
+        self.assertEqual(buffer.size, 5)
+        self.assertFalse(buffer.is_full())
+        buffer.add(2, "€")
+        self.assertEqual(buffer.size, 8)
+        self.assertTrue(buffer.is_full())
+        buffer.add(0, "")
+        self.assertEqual(buffer.size, 0)
@@ -0,0 +1,104 @@
+import io
+import json
+import tempfile
+from array import array
+from pathlib import Path
+from unittest import TestCase
+
+from wikitextprocessor import Wtp
+
+from wiktextract.config import WiktionaryConfig
+from wiktextract.shards import (
+    merge_error_files,
+    merge_shards,
+    parse_shard,
+    shard_manifest_path,
+    shard_page_ids,
+    write_shard_manifest,
+)
+from wiktextract.thesaurus import (
+    ThesaurusTerm,
+    close_thesaurus_db,
+    insert_thesaurus_term,
+)
+from wiktextract.wxr_context import WiktextractContext
+
+
+class TestShards(TestCase):
+    def setUp(self):
+        self.wxr = WiktextractContext(Wtp(), WiktionaryConfig())
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.wxr.wtp.close_db_conn()
+        close_thesaurus_db(
+            self.wxr.thesaurus_db_path, self.wxr.thesaurus_db_conn
+        )
+        self.tmp_dir.cleanup()
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("3/8"), (3, 8))
+        for value in ("0/8", "9/8", "3", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+    def test_shard_page_ids(self):
+        sizes = array("q", [100000, 90000, 50000] + [10] * 97)
+        page_ids = array("q", range(1, 101))
+        shards = [shard_page_ids(page_ids, sizes, i, 3) for i in (1, 2, 3)]
+        self.assertEqual(
+            sorted(x for ids in shards for x in ids), list(page_ids)
+        )
+        # The three large pages go to different shards and the small pages
+        # are spread to balance the totals
+        for i, ids in enumerate(shards):
+            self.assertEqual(ids[0], i + 1)
+            self.assertGreater(len(ids), 10)
+        self.assertEqual(shards[0], shard_page_ids(page_ids, sizes, 1, 3))
+
+    def test_merge_shards(self):
+        tmp_dir = Path(self.tmp_dir.name)
+        out_paths = []
+        for shard, word in ((2, "dog"), (1, "cat")):
+            out_path = tmp_dir / f"out{shard}.jsonl"
+            out_path.write_text(json.dumps({"word": word}) + "\n")
+            write_shard_manifest(
+                shard_manifest_path(out_path),
+                (shard, 2),
+                1,
+                {(word, "en", "noun")},
+            )
+            out_paths.append(out_path)
+        for entry in ("cat", "mouse"):
+            insert_thesaurus_term(
+                self.wxr.thesaurus_db_conn,
+                ThesaurusTerm(entry, "en", "noun", "synonyms", "feline"),
+            )
+        out_f = io.StringIO()
+        merge_shards(self.wxr, out_paths, out_f)
+        words = [
+            json.loads(line)["word"] for line in out_f.getvalue().splitlines()
+        ]
+        self.assertEqual(words, ["cat", "dog", "mouse"])
+
+    def test_missing_shard(self):
+        out_path = Path(self.tmp_dir.name) / "out.jsonl"
+        out_path.write_text("")
+        write_shard_manifest(shard_manifest_path(out_path), (1, 2), 0, set())
+        with self.assertRaises(ValueError):
+            merge_shards(self.wxr, [out_path], io.StringIO())
+
+    def test_merge_error_files(self):
+        tmp_dir = Path(self.tmp_dir.name)
+        paths = []
+        for i in range(2):
+            path = tmp_dir / f"errors{i}.json"
+            path.write_text(
+                json.dumps({"errors": [i], "warnings": [], "debugs": [i]})
+            )
+            paths.append(path)
+        merge_error_files(paths, tmp_dir / "errors.json")
+        self.assertEqual(
+            json.loads((tmp_dir / "errors.json").read_text()),
+            {"errors": [0, 1], "warnings": [], "debugs": [0, 1]},
+        )
@@ -0,0 +1,67 @@
+import io
+import xml.etree.ElementTree as ET
+from collections import Counter
+from unittest import TestCase
+
+from wiktextract.synthetic_dump import (
+    NAMED_TEMPLATES,
+    DumpGenerator,
+    make_word,
+    write_dump,
+)
+
+NS = "{http://www.mediawiki.org/xml/export-0.10/}"
+
+
+def generate(**kwargs) -> str:
+    out_f = io.StringIO()
+    write_dump(DumpGenerator(**kwargs), out_f)
+    return out_f.getvalue()
+
+
+class TestSyntheticDump(TestCase):
+    def test_pages(self):
+        text = generate(
+            num_pages=30, num_templates=4, num_modules=2, num_thesaurus=10
+        )
+        root = ET.fromstring(text)
+        namespaces = Counter(
+            int(page.find(f"{NS}ns").text) for page in root.iter(f"{NS}page")
+        )
+        self.assertEqual(namespaces[0], 30)
+        self.assertEqual(namespaces[110], 10)
+        self.assertEqual(namespaces[10], len(NAMED_TEMPLATES) + 4)
+        self.assertEqual(namespaces[828], 3)
+        titles = [
+            page.find(f"{NS}title").text for page in root.iter(f"{NS}page")
+        ]
+        self.assertEqual(len(titles), len(set(titles)))
+        main_texts = [
+            page.find(f"{NS}revision/{NS}text").text
+            for page in root.iter(f"{NS}page")
+            if page.find(f"{NS}ns").text == "0"
+        ]
+        for page_text in main_texts:
+            self.assertRegex(page_text, r"^==[A-Z]\w+==\n")
+            self.assertIn("{{head|", page_text)
+
+    def test_language_mix(self):
+        text = generate(num_pages=20, langs="fi", pos="verb", max_langs=3)
+        self.assertIn("==Finnish==", text)
+        self.assertNotIn("==English==", text)
+        self.assertIn("===Verb===", text)
+        self.assertNotIn("===Noun===", text)
+
+    def test_deterministic(self):
+        self.assertEqual(generate(num_pages=10), generate(num_pages=10))
+        self.assertNotEqual(
+            generate(num_pages=10), generate(num_pages=10, seed=1)
+        )
+
+    def test_unknown_language(self):
+        with self.assertRaises(ValueError):
+            DumpGenerator(10, langs="en:1,xx:2")
+
+    def test_make_word(self):
+        words = {make_word(n) for n in range(10000)}
+        self.assertEqual(len(words), 10000)
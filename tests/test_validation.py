@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+from wikitextprocessor import Wtp
+
+from wiktextract.config import WiktionaryConfig
+from wiktextract.validation import (
+    DataValidator,
+    entry_check,
+    parse_validate_mode,
+)
+from wiktextract.wxr_context import WiktextractContext
+
+
+def entry(**fields) -> dict:
+    dt = {
+        "word": "foo",
+        "lang": "English",
+        "lang_code": "en",
+        "pos": "noun",
+        "senses": [{"glosses": ["a foo"]}],
+    }
+    dt.update(fields)
+    return dt
+
+
+class TestValidation(TestCase):
+    def setUp(self):
+        self.wxr = WiktextractContext(
+            Wtp(lang_code="en"), WiktionaryConfig(dump_file_lang_code="en")
+        )
+
+    def tearDown(self):
+        self.wxr.wtp.close_db_conn()
+
+    def errors(self, dt: dict) -> list[str]:
+        errors: list[str] = []
+        entry_check("en")(dt, errors)
+        return errors
+
+    def test_valid(self):
+        self.assertEqual(
+            self.errors(
+                entry(
+                    tags=["countable"],
+                    forms=[
+                        {"form": "foos", "tags": ["plural"]},
+                        {"form": "", "tags": ["table-tags"]},
+                    ],
+                    translations=[{"word": "Foo", "code": "de"}],
+                    head_templates=[
+                        {"name": "en-noun", "args": {}, "expansion": ""}
+                    ],
+                )
+            ),
+            [],
+        )
+
+    def test_errors(self):
+        errors = self.errors(
+            entry(
+                senses=[{"glosses": [""], "synonyms": [{"word": 1}]}],
+                translations=[{"word": "Foo"}],
+                etymology_number="1",
+                sounds="ipa",
+                forms=[{"tags": ["not-a-tag"]}],
+            )
+        )
+        self.assertEqual(len(errors), 7)
+        self.assertTrue(errors[0].startswith("'etymology_number' must"))
+        self.assertTrue(errors[1].startswith("invalid tag 'not-a-tag'"))
+        self.assertTrue(errors[2].startswith("'form' should be"))
+        self.assertTrue(errors[3].startswith("'glosses' should be a list"))
+        self.assertTrue(errors[4].startswith("'word' should be a non-empty"))
+        self.assertTrue(errors[5].startswith("'sounds' should be a list"))
+        self.assertTrue(errors[6].startswith('"translations" items'))
+
+    def test_missing_senses(self):
+        self.assertEqual(len(self.errors(entry(senses=[]))), 1)
+
+    def test_sample(self):
+        validator = DataValidator(3)
+        validator.check_page(self.wxr, [entry(senses=[])] * 7)
+        # Entries 0, 3 and 6
+        self.assertEqual(len(self.wxr.config.debugs), 3)
+        self.assertTrue(
+            self.wxr.config.debugs[0]["msg"].startswith("foo/English/noun: ")
+        )
+
+    def test_off(self):
+        DataValidator(0).check_page(self.wxr, [{}])
+        self.assertEqual(self.wxr.config.debugs, [])
+
+    def test_parse_validate_mode(self):
+        self.assertEqual(parse_validate_mode("full"), 1)
+        self.assertEqual(parse_validate_mode("off"), 0)
+        self.assertEqual(parse_validate_mode("sample=1/100"), 100)
+        self.assertIsNone(parse_validate_mode("sample=1/0"))
+        self.assertIsNone(parse_validate_mode("some"))
@@ -0,0 +1,199 @@
+import os
+import pstats
+import signal
+import tempfile
+import time
+import unittest
+from collections.abc import Iterator
+from pathlib import Path
+
+from wiktextract.watchdog import PageWatchdog
+from wiktextract.worker_pool import (
+    BatchSizer,
+    LostTask,
+    WorkerError,
+    WorkerPool,
+)
+from wiktextract.worker_profile import (
+    WorkerProfiler,
+    add_worker_profiles,
+    worker_profile_paths,
+)
+
+
+def square(x: int) -> int:
+    if x == 13:
+        os.kill(os.getpid(), signal.SIGKILL)
+    if x == 14:
+        raise ValueError("bad task")
+    return x * x
+
+
+def squares(xs: list[int]) -> Iterator[int]:
+    for x in xs:
+        yield square(x)
+
+
+def init_watched_worker(watchdog: PageWatchdog) -> None:
+    watched_sleep.watchdog = watchdog
+    watchdog.attach()
+
+
+def watched_sleep(title: str) -> str:
+    watched_sleep.watchdog.start_page(title)
+    time.sleep(60 if title == "hangs" else 0.01)
+    watched_sleep.watchdog.end_page()
+    return title
+
+
+class WorkerPoolTests(unittest.TestCase):
+    def test_results(self):
+        with WorkerPool(3, square) as pool:
+            results = list(pool.imap_unordered(range(10)))
+        self.assertEqual(sorted(results), [x * x for x in range(10)])
+
+    def test_start_method(self):
+        with WorkerPool(2, square, start_method="spawn") as pool:
+            results = list(pool.imap_unordered(range(5)))
+            self.assertEqual(pool.workers[0].process._start_method, "spawn")
+        self.assertEqual(sorted(results), [x * x for x in range(5)])
+
+    def test_replacement_start_method(self):
+        with WorkerPool(
+            1, square, start_method="fork", replacement_start_method="spawn"
+        ) as pool:
+            results = list(pool.imap_unordered([13, 2]))
+            # The worker killed by task 13 was replaced
+            self.assertEqual(pool.workers[0].process._start_method, "spawn")
+        self.assertIsInstance(results[0], LostTask)
+        self.assertEqual(results[1:], [4])
+
+    def test_throttle(self):
+        # With throttling always on, only one task runs at a time
+        with WorkerPool(3, square) as pool:
+            running = []
+            results = []
+            for result in pool.imap_unordered(range(5), lambda: True):
+                running.append(sum(w.busy for w in pool.workers))
+                results.append(result)
+        self.assertEqual(results, [x * x for x in range(5)])
+        self.assertEqual(running, [0] * 5)
+
+    def test_dead_worker_is_replaced(self):
+        with WorkerPool(2, square) as pool:
+            results = list(pool.imap_unordered(range(14)))
+            self.assertEqual(len(pool.workers), 2)
+            self.assertTrue(all(w.process.is_alive() for w in pool.workers))
+        lost = [r for r in results if isinstance(r, LostTask)]
+        self.assertEqual(len(lost), 1)
+        self.assertEqual(lost[0].task, 13)
+        self.assertEqual(lost[0].exitcode, -signal.SIGKILL)
+        self.assertEqual(len(results), 14)
+
+    def test_stream_results(self):
+        with WorkerPool(2, squares, stream_results=True) as pool:
+            results = []
+            for result in pool.imap_unordered([[1, 2], [11, 12, 13, 15]]):
+                if isinstance(result, LostTask):
+                    # 13 killed the worker after 11 and 12 were returned
+                    self.assertEqual(result.num_results, 2)
+                    pool.resubmit(result.task[result.num_results + 1 :])
+                else:
+                    results.append(result)
+        self.assertEqual(sorted(results), [1, 4, 121, 144, 225])
+
+    def test_recycle(self):
+        with WorkerPool(1, square, max_results=3) as pool:
+            first_pids = {w.process.pid for w in pool.workers}
+            results = list(pool.imap_unordered(range(10)))
+            self.assertEqual(pool.num_recycled, 3)
+            self.assertTrue(
+                first_pids.isdisjoint(w.process.pid for w in pool.workers)
+            )
+        self.assertEqual(sorted(results), [x * x for x in range(10)])
+
+    def test_recycle_stream(self):
+        # Any process uses more than one byte, so workers are recycled
+        # after every result and the rest of each task is resubmitted
+        with WorkerPool(1, squares, stream_results=True, max_rss=1) as pool:
+            results = list(pool.imap_unordered([[1, 2, 3], [4, 5]]))
+            self.assertEqual(pool.num_recycled, 5)
+        self.assertEqual(sorted(results), [1, 4, 9, 16, 25])
+
+    def test_profile(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            profile_dir = Path(tmp_dir)
+            # Recycled workers save their profiles too
+            with WorkerPool(
+                1, square, max_results=5, profile_dir=profile_dir
+            ) as pool:
+                list(pool.imap_unordered(range(12)))
+            self.assertEqual(len(worker_profile_paths(profile_dir)), 3)
+            stats = pstats.Stats()
+            self.assertEqual(add_worker_profiles(stats, profile_dir), 3)
+            calls = sum(
+                stat[1]
+                for func, stat in stats.stats.items()  # type: ignore[attr-defined]
+                if func[2] == "square"
+            )
+            self.assertEqual(calls, 12)
+
+    def test_profile_sample(self):
+        calls = []
+        profiler = WorkerProfiler(Path("."), sample_every=3)
+        for x in range(7):
+            profiler.start_task()
+            square(x)
+            profiler.end_task()
+        profiler.profile.create_stats()
+        for func, stat in profiler.profile.stats.items():
+            if func[2] == "square":
+                calls.append(stat[1])
+        # Tasks 0, 3 and 6
+        self.assertEqual(calls, [3])
+
+    def test_exception(self):
+        with self.assertRaises(WorkerError):
+            with WorkerPool(2, square) as pool:
+                list(pool.imap_unordered([14]))
+
+
+class BatchSizerTests(unittest.TestCase):
+    def test_size(self):
+        sizer = BatchSizer(1.0, 100)
+        self.assertEqual(sizer.size(), 1)
+        sizer.add(0.1)
+        self.assertEqual(sizer.size(), 10)
+        sizer.add(5.0)
+        self.assertEqual(sizer.size(), 5)
+        for _ in range(1000):
+            sizer.add(0.001)
+        self.assertEqual(sizer.size(), 100)
+
+
+class WatchdogTests(unittest.TestCase):
+    def test_slots(self):
+        watchdog = PageWatchdog(2)
+        watchdog.attach()
+        self.assertEqual(watchdog.active_pages(), [])
+        watchdog.start_page("foo")
+        pages = watchdog.active_pages()
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(pages[0][:2], (os.getpid(), "foo"))
+        watchdog.end_page()
+        self.assertEqual(watchdog.active_pages(), [])
+
+    def test_kill_hung_page(self):
+        watchdog = PageWatchdog(4, 0.5, 1.0, 0.1)
+        with WorkerPool(
+            2, watched_sleep, init_watched_worker, (watchdog,)
+        ) as pool:
+            watchdog.start()
+            try:
+                results = list(pool.imap_unordered(["a", "hangs", "b"]))
+            finally:
+                watchdog.stop()
+        self.assertEqual(len(results), 3)
+        lost = [r for r in results if isinstance(r, LostTask)]
+        self.assertEqual(len(lost), 1)
+        self.assertEqual(lost[0].task, "hangs")
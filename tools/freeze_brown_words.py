@@ -0,0 +1,33 @@
+# This script saves the words of the NLTK Brown corpus in
+# src/wiktextract/data/en/brown_words.txt.gz, from which the English
+# extractor reads its vocabulary (see extractor/en/brown_words.py).  The
+# corpus is downloaded if it isn't installed.  Run it at the project root
+# folder when updating NLTK; the file is the same for the same corpus.
+
+import gzip
+from pathlib import Path
+
+import nltk
+from nltk.corpus import brown
+
+
+def main() -> None:
+    out_path = Path("src/wiktextract/data/en/brown_words.txt.gz")
+    try:
+        nltk.data.find("corpora/brown.zip")
+    except LookupError:
+        nltk.download("brown", quiet=True)
+    words = set(brown.words())
+    assert all(w and "\n" not in w for w in words)
+    data = "\n".join(sorted(words)).encode("utf-8")
+    # mtime=0 leaves the time out of the gzip header
+    with (
+        out_path.open("wb") as f,
+        gzip.GzipFile(filename="", mode="wb", fileobj=f, mtime=0) as gz_f,
+    ):
+        gz_f.write(data)
+    print(f"Saved {len(words)} words in {out_path}")
+
+
+if __name__ == "__main__":
+    main()